@@ -4,13 +4,26 @@
 """ Command-Line interface for interacting with Turing Machines and Grammars for primality check """
 
 import argparse
+import os
+import pathlib
+import struct
+import zlib
 from datetime import timedelta
 from timeit import default_timer as timer
-from typing import Tuple, List, Union
+from typing import Dict, Optional, Tuple, List, Union
 
 from pyformlang import cfg
 
+from src.budget import Budget
+from src.budget import Outcome
+from src.budget import Verdict
+from src.checkpoint import Checkpoint
+from src.compiled_grammar import DEFAULT_WEIGHT
+from src.compiled_grammar import SEARCHES
 from src.context_sensitive_grammar import ContextSensitiveGrammar
+from src.heuristics import HEURISTICS
+from src.lazy_grammar import LazyGrammar
+from src.linear_bounded_automaton import LinearBoundedAutomaton
 from src.my_production import Production
 from src.turing_machine import TuringMachine
 from src.unrestricted_grammar import UnrestrictedGrammar
@@ -22,6 +35,9 @@ def print_trace(
 ):
     """ Print word output trace """
 
+    if isinstance(grammar, LazyGrammar):
+        raise ValueError('A lazy grammar does not store its productions, its trace can not be numbered')
+
     productions, sentences = res
     output: List[Tuple[str, str, str]] = list()
     for i in range(len(productions)):
@@ -48,6 +64,39 @@ def print_trace(
         )
 
 
+def verdict_str(res: Outcome) -> str:
+    """ Returns printable verdict of a check """
+
+    if res.verdict is Verdict.UNKNOWN:
+        return f'Unknown after {res.steps} steps'
+    return f'{res.verdict is Verdict.ACCEPT}'
+
+
+def checkpoint_args(checkpoint: Optional[str], suffix: str, word: str) -> Dict[str, str]:
+    """ Returns checkpoint arguments of a machine check,
+        a saved run is continued only if it was started on the same word, else it is overwritten """
+
+    if checkpoint is None:
+        return dict()
+    path = f'{checkpoint}.{suffix}'
+    if os.path.exists(path):
+        try:
+            saved = Checkpoint.from_file(path)
+        except (ValueError, OSError, struct.error, zlib.error):
+            saved = None
+        if saved is not None and saved.word == list(word):
+            return {'checkpoint': path, 'resume_from': path}
+    return {'checkpoint': path}
+
+
+def checkpoint_done(checkpoint: Optional[str], suffix: str, res: Outcome):
+    """ Removes the saved run of a machine check which ended with a verdict """
+
+    path = f'{checkpoint}.{suffix}'
+    if checkpoint is not None and res.verdict is not Verdict.UNKNOWN and os.path.exists(path):
+        os.remove(path)
+
+
 def main():
     """ Command-Line tool for interacting with Turing Machines and Grammars for primality check """
 
@@ -89,6 +138,57 @@ def main():
         , type=str
         , required=True
     )
+    parser.add_argument(
+        '--max_steps'
+        , help='Maximum number of steps of every check'
+        , type=int
+    )
+    parser.add_argument(
+        '--max_time'
+        , help='Maximum number of seconds of every check'
+        , type=float
+    )
+    parser.add_argument(
+        '--search'
+        , help='Search strategy of grammar checks'
+        , choices=SEARCHES
+        , default='forward'
+    )
+    parser.add_argument(
+        '--heuristic'
+        , help='Heuristic of best_first and astar grammar searches'
+        , choices=list(HEURISTICS)
+        , default='length'
+    )
+    parser.add_argument(
+        '--weight'
+        , help='Weight of the heuristic in astar grammar search, '
+               'a weight about 1 is breadth-like and slower than forward search'
+        , type=float
+        , default=DEFAULT_WEIGHT
+    )
+    parser.add_argument(
+        '--canonical'
+        , help='Follow only canonical derivations in forward and bidirectional grammar searches'
+        , action='store_true'
+    )
+    parser.add_argument(
+        '--workers'
+        , help='Number of worker processes of sharded grammar search, the number of processors by default'
+        , type=int
+    )
+    parser.add_argument(
+        '--spill_dir'
+        , help='Directory to keep the visited and pending sentences of forward grammar search in'
+        , type=pathlib.Path
+    )
+    parser.add_argument(
+        '--checkpoint'
+        , help='Save machine checks to CHECKPOINT.tm and CHECKPOINT.lba on exceeded limits or SIGTERM '
+               + 'and continue them from these files if they were saved on the same word, '
+               + 'the files of checks which ended are removed'
+        , type=str
+    )
 
     args = parser.parse_args()
 
@@ -102,13 +202,17 @@ def main():
                      + "-ug/--unrestricted_grammar required"
                      )
 
+    budget = None
+    if args.max_steps is not None or args.max_time is not None:
+        budget = Budget(max_steps=args.max_steps, max_time=args.max_time)
+
     turing_machine = None
     if args.turing_machine is True:
         turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
 
     linear_bounded_automaton = None
     if args.linear_bounded_automaton is True:
-        linear_bounded_automaton = TuringMachine.from_txt('resources/primality_check_lba.txt')
+        linear_bounded_automaton = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
 
     context_sensitive_grammar = None
     if args.context_sensitive_grammar is True:
@@ -120,37 +224,56 @@ def main():
 
     if turing_machine is not None:
         start = timer()
-        res = turing_machine.accepts(args.word)
+        res = turing_machine.run(args.word, budget, **checkpoint_args(args.checkpoint, 'tm', args.word))
+        checkpoint_done(args.checkpoint, 'tm', res)
         end = timer()
         result_time = timedelta(seconds=end - start)
-        print(f'Check by Turing Machine: {res} is done in {result_time} seconds')
+        print(f'Check by Turing Machine: {verdict_str(res)} is done in {result_time} seconds')
 
     if linear_bounded_automaton is not None:
         start = timer()
-        res = linear_bounded_automaton.accepts("$" + args.word + "#")
+        lba_word = "$" + args.word + "#"
+        res = linear_bounded_automaton.run(lba_word, budget, **checkpoint_args(args.checkpoint, 'lba', lba_word))
+        checkpoint_done(args.checkpoint, 'lba', res)
         end = timer()
         result_time = timedelta(seconds=end - start)
-        print(f'Check by Linear Bounded Automaton: {res} is done in {result_time} seconds')
+        print(f'Check by Linear Bounded Automaton: {verdict_str(res)} is done in {result_time} seconds')
 
     if context_sensitive_grammar is not None:
         start = timer()
-        res = context_sensitive_grammar.accepts(args.word)
+        res = context_sensitive_grammar.run(
+            args.word
+            , budget
+            , args.search
+            , args.heuristic
+            , args.weight
+            , args.workers
+            , args.spill_dir
+            , args.canonical
+        )
         end = timer()
-        result = res != tuple()
         result_time = timedelta(seconds=end - start)
-        print(f'Check by Context Sensitive Grammar: {result} is done in {result_time} seconds')
-        if result:
-            print_trace(res, context_sensitive_grammar)
+        print(f'Check by Context Sensitive Grammar: {verdict_str(res)} is done in {result_time} seconds')
+        if res.verdict is Verdict.ACCEPT:
+            print_trace(res.trace, context_sensitive_grammar)
 
     if unrestricted_grammar is not None:
         start = timer()
-        res = unrestricted_grammar.accepts(args.word)
+        res = unrestricted_grammar.run(
+            args.word
+            , budget
+            , args.search
+            , args.heuristic
+            , args.weight
+            , args.workers
+            , args.spill_dir
+            , args.canonical
+        )
         end = timer()
-        result = res != tuple()
         result_time = timedelta(seconds=end - start)
-        print(f'Check by Unrestricted Grammar: {result} is done in {result_time} seconds')
-        if result:
-            print_trace(res, unrestricted_grammar)
+        print(f'Check by Unrestricted Grammar: {verdict_str(res)} is done in {result_time} seconds')
+        if res.verdict is Verdict.ACCEPT:
+            print_trace(res.trace, unrestricted_grammar)
 
 
 if __name__ == '__main__':
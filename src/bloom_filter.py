@@ -0,0 +1,50 @@
+""" Bloom filter of byte strings module """
+
+import hashlib
+import math
+from typing import Iterator
+
+
+class BloomFilter:
+    """ Class representing a set of byte strings which may answer a false positive but never a false negative
+        A key sets hashes bits of a bit array, the positions are derived from one blake2b digest
+        by double hashing """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Constructor of BloomFilter instance
+        size - the number of bits
+        hashes - the number of bits set by a key
+        bits - the bit array
+        :param capacity: The expected number of keys, the rate of false positives grows past it
+        :param error_rate: The rate of false positives at the capacity
+        """
+
+        self.size: int = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes: int = max(1, round(self.size / capacity * math.log(2)))
+        self.bits: bytearray = bytearray((self.size + 7) // 8)
+
+    def __positions(self, key: bytes) -> Iterator[int]:
+        """
+        Yields the positions of the bits of the key
+        :param key: Byte string
+        :return: Iterator of bit positions
+        """
+
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, key: bytes):
+        """
+        Adds the key to the BloomFilter
+        :param key: Byte string
+        :return: None
+        """
+
+        for position in self.__positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
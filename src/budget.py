@@ -0,0 +1,87 @@
+""" Run budget and run outcome definition module """
+
+import dataclasses
+import enum
+import time
+from typing import Any
+from typing import Optional
+
+
+class Verdict(enum.Enum):
+    """ Enumeration of possible results of a run """
+    ACCEPT = 'accept'
+    REJECT = 'reject'
+    UNKNOWN = 'unknown'
+
+
+@dataclasses.dataclass
+class Budget:
+    """ A data class representing the limits of a run
+        max_steps - the maximum number of steps, unlimited if None
+        max_time - the maximum wall time in seconds, unlimited if None
+        max_frontier - the maximum number of pending configurations or sentences, unlimited if None
+        check_every - the number of steps between two checks of the limits """
+    max_steps: Optional[int] = None
+    max_time: Optional[float] = None
+    max_frontier: Optional[int] = None
+    check_every: int = 1024
+
+    def start(self) -> 'Meter':
+        """
+        Starts measuring a run against the Budget
+        :return: Meter instance
+        """
+
+        return Meter(self)
+
+
+@dataclasses.dataclass
+class Outcome:
+    """ A data class representing the result of a run
+        verdict - whether the word is accepted, rejected or the budget ran out
+        steps - the number of steps done
+        trace - the derivation of the word if it is accepted by a grammar
+        diverges - whether the run was found to never halt """
+    verdict: Verdict
+    steps: int
+    trace: Any = tuple()
+    diverges: bool = False
+
+
+class Meter:
+    """ Class measuring a run against a Budget
+        The run asks for the next step count at which the limits must be checked,
+        so the checks stay off the per-step path """
+
+    def __init__(self, budget: Budget):
+        self.budget: Budget = budget
+        self.deadline: Optional[float] = \
+            None if budget.max_time is None else time.monotonic() + budget.max_time
+
+    def next_check(self, steps: int) -> int:
+        """
+        Returns the step count at which the limits must be checked next
+        :param steps: The number of steps done
+        :return: The step count of the next check
+        """
+
+        next_steps: int = steps + self.budget.check_every
+        if self.budget.max_steps is not None:
+            next_steps = min(next_steps, self.budget.max_steps)
+        return next_steps
+
+    def exhausted(self, steps: int, frontier: int = 1) -> bool:
+        """
+        Returns whether the run exceeded the Budget
+        :param steps: The number of steps done
+        :param frontier: The number of pending configurations or sentences
+        :return: Boolean value - True if any limit is reached, else False
+        """
+
+        if self.budget.max_steps is not None and steps >= self.budget.max_steps:
+            return True
+        if self.budget.max_frontier is not None and frontier > self.budget.max_frontier:
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return False
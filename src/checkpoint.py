@@ -0,0 +1,223 @@
+""" Checkpoints of long Turing Machine runs module """
+
+import dataclasses
+import os
+import signal
+import struct
+import time
+import zlib
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+MAGIC: bytes = b'PCTM'
+VERSION: int = 1
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    """ A data class representing a saved state of a run
+        word - the word the run was started on
+        steps - the number of steps done
+        configurations - list of (state, tape, head position),
+            one configuration of a deterministic run or the frontier of a search """
+    word: List[str]
+    steps: int
+    configurations: List[Tuple[str, List[str], int]]
+
+    def to_file(self, path: str):
+        """
+        Saves the Checkpoint to a binary file
+        The file holds the magic bytes, the version and a zlib-compressed body
+            with the tables of tape symbols and states
+            and every tape as one or two bytes per cell
+        The file is written next to the target and renamed,
+            so an interrupted save keeps the previous checkpoint
+        :param path: Path to the file
+        :return: None
+        """
+
+        symbols: List[str] = sorted(
+            set(self.word) | {x for _, tape, _ in self.configurations for x in tape}
+        )
+        states: List[str] = sorted({state for state, _, _ in self.configurations})
+        symbol_codes: Dict[str, int] = {x: i for i, x in enumerate(symbols)}
+        state_codes: Dict[str, int] = {x: i for i, x in enumerate(states)}
+        cell: str = 'B' if len(symbols) <= 256 else 'H'
+
+        body: List[bytes] = [_pack_strings(symbols), _pack_strings(states)]
+        body.append(_pack_cells(cell, [symbol_codes[x] for x in self.word]))
+        body.append(struct.pack('<QQ', self.steps, len(self.configurations)))
+        for state, tape, pos in self.configurations:
+            body.append(struct.pack('<Iq', state_codes[state], pos))
+            body.append(_pack_cells(cell, [symbol_codes[x] for x in tape]))
+
+        temporary_path: str = f'{path}.tmp'
+        with open(temporary_path, 'wb') as output_file:
+            output_file.write(MAGIC + struct.pack('<Bc', VERSION, cell.encode()))
+            output_file.write(zlib.compress(b''.join(body)))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Loads a Checkpoint from a binary file written by to_file
+        :param path: Path to the file
+        :return: Checkpoint instance
+        """
+
+        with open(path, 'rb') as input_file:
+            data: bytes = input_file.read()
+
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a checkpoint')
+        version, cell = struct.unpack_from('<Bc', data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f'Unsupported checkpoint version {version}')
+        cell = cell.decode()
+
+        body: bytes = zlib.decompress(data[len(MAGIC) + 2:])
+        offset: int = 0
+        symbols, offset = _unpack_strings(body, offset)
+        states, offset = _unpack_strings(body, offset)
+        word, offset = _unpack_cells(cell, body, offset)
+        steps, count = struct.unpack_from('<QQ', body, offset)
+        offset += struct.calcsize('<QQ')
+
+        configurations: List[Tuple[str, List[str], int]] = list()
+        for _ in range(count):
+            state, pos = struct.unpack_from('<Iq', body, offset)
+            offset += struct.calcsize('<Iq')
+            tape, offset = _unpack_cells(cell, body, offset)
+            configurations.append((states[state], [symbols[x] for x in tape], pos))
+
+        return cls([symbols[x] for x in word], steps, configurations)
+
+
+class CheckpointWriter:
+    """ Class deciding when a run saves its Checkpoint
+        A checkpoint is due every interval seconds and after SIGTERM,
+        a run which received SIGTERM stops after saving it """
+
+    def __init__(self, path: str, interval: Optional[float] = None):
+        """
+        Constructor of CheckpointWriter instance
+        :param path: Path to the checkpoint file
+        :param interval: Seconds between two checkpoints, only on SIGTERM and budget exhaustion if None
+        """
+
+        self.path: str = path
+        self.interval: Optional[float] = interval
+        self.last: float = time.monotonic()
+        self.stopped: bool = False
+        self.previous_handler = None
+
+    def __enter__(self):
+        """
+        Installs the SIGTERM handler if the run is in the main thread
+        :return: CheckpointWriter instance
+        """
+
+        try:
+            self.previous_handler = signal.signal(signal.SIGTERM, self.__on_sigterm)
+        except ValueError:
+            self.previous_handler = None
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Restores the previous SIGTERM handler
+        :return: None
+        """
+
+        if self.previous_handler is not None:
+            signal.signal(signal.SIGTERM, self.previous_handler)
+
+    def __on_sigterm(self, signum, frame):
+        """
+        Marks the run as stopped, the checkpoint is saved at its next budget check
+        :return: None
+        """
+
+        self.stopped = True
+
+    def due(self) -> bool:
+        """
+        Returns whether the run must save its checkpoint now
+        :return: Boolean value - True if the interval passed or SIGTERM was received, else False
+        """
+
+        return self.stopped or (
+            self.interval is not None and time.monotonic() - self.last >= self.interval
+        )
+
+    def save(self, checkpoint: Checkpoint):
+        """
+        Saves the checkpoint to the file
+        :param checkpoint: Checkpoint of the run
+        :return: None
+        """
+
+        checkpoint.to_file(self.path)
+        self.last = time.monotonic()
+
+
+def _pack_strings(values: Sequence[str]) -> bytes:
+    """
+    Packs strings with their lengths
+    :param values: Strings to pack
+    :return: Packed bytes
+    """
+
+    res: List[bytes] = [struct.pack('<I', len(values))]
+    for value in values:
+        encoded: bytes = value.encode()
+        res.append(struct.pack('<I', len(encoded)) + encoded)
+    return b''.join(res)
+
+
+def _unpack_strings(data: bytes, offset: int) -> Tuple[List[str], int]:
+    """
+    Unpacks strings packed by _pack_strings
+    :param data: Packed bytes
+    :param offset: Position of the strings in data
+    :return: Tuple(strings, position after them)
+    """
+
+    count, = struct.unpack_from('<I', data, offset)
+    offset += 4
+    res: List[str] = list()
+    for _ in range(count):
+        length, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        res.append(data[offset:offset + length].decode())
+        offset += length
+    return res, offset
+
+
+def _pack_cells(cell: str, codes: Sequence[int]) -> bytes:
+    """
+    Packs symbol codes with their number
+    :param cell: struct format of a code, B or H
+    :param codes: Symbol codes
+    :return: Packed bytes
+    """
+
+    return struct.pack(f'<Q{len(codes)}{cell}', len(codes), *codes)
+
+
+def _unpack_cells(cell: str, data: bytes, offset: int) -> Tuple[List[int], int]:
+    """
+    Unpacks symbol codes packed by _pack_cells
+    :param cell: struct format of a code, B or H
+    :param data: Packed bytes
+    :param offset: Position of the codes in data
+    :return: Tuple(symbol codes, position after them)
+    """
+
+    count, = struct.unpack_from('<Q', data, offset)
+    offset += 8
+    res: List[int] = list(struct.unpack_from(f'<{count}{cell}', data, offset))
+    return res, offset + count * struct.calcsize(cell)
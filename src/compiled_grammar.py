@@ -0,0 +1,704 @@
+""" Compiled Grammar module """
+
+import heapq
+import pathlib
+import tempfile
+from collections import deque
+from typing import Deque
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from pyformlang import cfg
+
+from src.budget import Budget
+from src.budget import Meter
+from src.budget import Outcome
+from src.budget import Verdict
+from src.disk_hash_table import DiskHashTable
+from src.frontier import Frontier
+from src.head_index import HeadIndex
+from src.head_index import Sentence
+from src.heuristics import Heuristic
+from src.heuristics import HEURISTICS
+from src.my_production import Production
+from src.sharded_search import ShardedSearch
+from src.spilling_frontier import SpillingFrontier
+from src.turing_machine import DEFAULT_BUDGET
+
+SEARCHES: Tuple[str, ...] = ('forward', 'bidirectional', 'best_first', 'astar', 'sharded')
+
+# Derivations of the primality grammars take hundreds of productions while heuristic scores
+# stay within the word length, so the astar search needs a heavy weight to be guided by the score
+DEFAULT_WEIGHT: float = 1000.0
+
+
+def _tuple_find(sentence: Tuple[int, ...], head: Tuple[int, ...], start: int = 0) -> int:
+    """
+    Returns the lowest index of the head in the sentence not less than start, as bytes.find does
+    :param sentence: Tuple of symbol codes
+    :param head: Tuple of symbol codes
+    :param start: The lowest index to look at
+    :return: Index of the head, -1 if there is none
+    """
+
+    for i in range(start, len(sentence) - len(head) + 1):
+        if sentence[i:i + len(head)] == head:
+            return i
+    return -1
+
+
+class CompiledGrammar:
+    """ Class representing a Grammar compiled to integer-coded symbols
+        Sentences are bytes, or tuples of ints if there are more than 256 symbols,
+        so hashing, comparison and search of production heads run in C """
+
+    def __init__(self, grammar, bounded: bool = False):
+        """
+        Constructor of CompiledGrammar instance
+        symbols - list of symbols, the index of a symbol is its code,
+            terminals go first, so a symbol is a terminal iff its code is less than terminals
+        productions - list of (head, body, number of nonterminals the production adds)
+            in the order of the Grammar productions
+        matcher - index of the production heads
+        body_matcher - index of the non-empty production bodies for the backward search,
+            body_productions - production indices of them, empty_bodies - the other production indices
+        persistent - whether no production removes a terminal, then terminals of a sentence
+            are found in every sentence derived from it
+        adds_terminals - list of flags, True if the production adds a terminal
+        :param grammar: The Grammar to compile
+        :param bounded: Whether the Grammar is non-contracting, then the search for a word
+            prunes sentences longer than the word and, if terminals are persistent,
+            sentences with more occurrences of a terminal than the word
+        """
+
+        units = [unit for production in grammar.productions for unit in production.head + production.body]
+        terminals = grammar.terminals | {x for x in units if isinstance(x, cfg.Terminal)}
+        nonterminals = grammar.nonterminals | {grammar.start_symbol} | {
+            x for x in units if isinstance(x, cfg.Variable)
+        }
+
+        self.symbols: List[Union[cfg.Variable, cfg.Terminal]] = \
+            sorted(terminals, key=lambda x: str(x.value)) + sorted(nonterminals, key=lambda x: str(x.value))
+        self.terminals: int = len(terminals)
+        self.codes: Dict[Union[cfg.Variable, cfg.Terminal], int] = {x: i for i, x in enumerate(self.symbols)}
+        self.sentence_type = bytes if len(self.symbols) <= 256 else tuple
+        self.find = bytes.find if self.sentence_type is bytes else _tuple_find
+
+        self.start: Sentence = self.encode((grammar.start_symbol,))
+        self.source: List[Production] = grammar.productions.copy()
+        self.productions: List[Tuple[Sentence, Sentence, int]] = list()
+        for production in self.source:
+            head, body = self.encode(production.head), self.encode(production.body)
+            self.productions.append((head, body, self.nonterminals(body) - self.nonterminals(head)))
+
+        self.matcher: HeadIndex = HeadIndex([head for head, _, _ in self.productions], self.find)
+        self.body_productions: List[int] = [i for i, (_, body, _) in enumerate(self.productions) if len(body) != 0]
+        self.empty_bodies: List[int] = [i for i, (_, body, _) in enumerate(self.productions) if len(body) == 0]
+        self.body_matcher: HeadIndex = HeadIndex([self.productions[i][1] for i in self.body_productions], self.find)
+
+        self.bounded: bool = bounded
+        self.persistent: bool = all(
+            body.count(x) >= head.count(x) for head, body, _ in self.productions for x in range(self.terminals)
+        )
+        self.adds_terminals: List[bool] = [
+            any(body.count(x) > head.count(x) for x in range(self.terminals)) for head, body, _ in self.productions
+        ]
+
+    def encode(self, units: Sequence[Union[cfg.Variable, cfg.Terminal]]) -> Sentence:
+        """
+        Encodes the given symbols to a sentence
+        :param units: Sequence of grammar symbols
+        :return: Sentence of symbol codes
+        """
+
+        return self.sentence_type(self.codes[x] for x in units)
+
+    def decode(self, sentence: Sentence) -> Tuple[Union[cfg.Variable, cfg.Terminal], ...]:
+        """
+        Decodes the given sentence to grammar symbols
+        :param sentence: Sentence of symbol codes
+        :return: Tuple of grammar symbols
+        """
+
+        return tuple(self.symbols[x] for x in sentence)
+
+    def encode_word(self, word: Sequence[str]) -> Optional[Sentence]:
+        """
+        Encodes the given word of terminal values to a sentence
+        :param word: Sequence of terminal values
+        :return: Sentence of symbol codes, None if the word has a symbol which is not a terminal of the Grammar
+        """
+
+        codes: List[int] = list()
+        for x in word:
+            code = self.codes.get(cfg.Terminal(x))
+            if code is None or code >= self.terminals:
+                return None
+            codes.append(code)
+        return self.sentence_type(codes)
+
+    def nonterminals(self, sentence: Sentence) -> int:
+        """
+        Returns the number of nonterminals in the sentence
+        :param sentence: Sentence of symbol codes
+        :return: The number of nonterminals
+        """
+
+        return sum(1 for x in sentence if x >= self.terminals)
+
+    def bounds(self, targets: Sequence[Sentence]) -> Tuple[Optional[int], List[Tuple[int, int]], List[bool]]:
+        """
+        Returns the limits of sentences which can derive any of the targets
+        :param targets: The searched sentences, nothing is limited if there are none
+            or the CompiledGrammar is not bounded
+        :return: Tuple(the maximum length or None,
+            list of (terminal, its maximum number of occurrences),
+            list of flags, True if the production must be checked against the terminal limits)
+        """
+
+        if not self.bounded or len(targets) == 0:
+            return None, list(), [False] * len(self.productions)
+        max_length: int = max(len(target) for target in targets)
+        if not self.persistent:
+            return max_length, list(), [False] * len(self.productions)
+        limits: List[Tuple[int, int]] = [
+            (x, max(target.count(x) for target in targets)) for x in range(self.terminals)
+        ]
+        return max_length, limits, self.adds_terminals
+
+    def explore(
+            self
+            , parent: Dict[Sentence, Optional[Tuple[Sentence, int]]]
+            , targets: Sequence[Sentence] = tuple()
+            , queue: Optional[Frontier] = None
+            , canonical: bool = False
+            , max_length: Optional[int] = None
+            , boundary: Optional[Dict[Sentence, int]] = None
+            , expanded: Optional[Dict[Sentence, int]] = None
+    ) -> Iterator[Tuple[Sentence, int, int]]:
+        """
+        Yields sentences derived from the start one in the order of the Grammar search
+        Every popped sentence is expanded after the consumer resumes the iterator,
+            every discovered sentence gets a parent pointer
+        Sentences which can derive none of the targets are pruned if the CompiledGrammar is bounded,
+            the order of the other sentences is kept
+        :param parent: Empty dictionary to be filled with (sentence it is derived from, production index)
+            for every discovered sentence, None for the start sentence
+        :param targets: The searched sentences, nothing is pruned if there are none
+        :param queue: Empty Frontier to keep the pending sentences in, a new one if None
+        :param canonical: Whether only canonical derivations are followed:
+            rewrites at non-overlapping positions commute, so a rewrite whose head starts
+            at or after the end of the body of the previous rewrite is skipped,
+            it is done before the previous rewrite in another derivation of the same sentence
+            A sentence reached again with a later boundary is expanded again
+            with the rewrites it allows in addition, so every sentence is still reached
+        :param max_length: The maximum length of kept sentences if the CompiledGrammar is bounded
+            and there are no targets, nothing is pruned if None
+        :param boundary: Empty dictionary of the boundaries of the canonical search, a new dict if None
+        :param expanded: Empty dictionary of the boundaries the sentences were expanded with
+            by the canonical search, a new dict if None
+        :return: Iterator of Tuple(sentence, number of nonterminals in it, number of pending sentences)
+        """
+
+        productions = self.productions
+        matcher = self.matcher
+        limit: Optional[int] = max_length if self.bounded else None
+        max_length, limits, adds_terminals = self.bounds(targets)
+        max_length = max_length if max_length is not None else limit
+
+        boundary = boundary if boundary is not None else dict()
+        expanded = expanded if expanded is not None else dict()
+        boundary[self.start] = len(self.start)
+
+        parent[self.start] = None
+        queue = queue if queue is not None else Frontier()
+        queue.push(self.start, self.nonterminals(self.start))
+
+        while len(queue) != 0:
+            sentence, nonterminals = queue.pop()
+
+            end: int = len(sentence)
+            done: Optional[int] = None
+            if canonical:
+                end, done = boundary[sentence], expanded.get(sentence)
+                if done is not None and done >= end:
+                    continue
+                expanded[sentence] = end
+
+            yield sentence, nonterminals, len(queue)
+
+            for index, i in matcher.matches(sentence):
+                head, body, delta = productions[index]
+                if i >= end or (done is not None and i < done):
+                    continue
+                new_sentence: Sentence = sentence[:i] + body + sentence[i + len(head):]
+                if new_sentence not in parent:
+                    if max_length is not None and len(new_sentence) > max_length:
+                        continue
+                    if adds_terminals[index] and any(new_sentence.count(symbol) > count for symbol, count in limits):
+                        continue
+                    parent[new_sentence] = (sentence, index)
+                    if canonical:
+                        boundary[new_sentence] = i + len(body)
+                    queue.push(new_sentence, nonterminals + delta)
+                elif canonical and i + len(body) > boundary[new_sentence]:
+                    boundary[new_sentence] = i + len(body)
+                    if new_sentence in expanded:
+                        queue.push(new_sentence, nonterminals + delta)
+
+    def derivation(
+            self
+            , parent: Dict[Sentence, Optional[Tuple[Sentence, int]]]
+            , sentence: Sentence
+    ) -> Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]:
+        """
+        Rebuilds the derivation of the sentence from the parent pointers of the search
+        :param parent: Dictionary filled by explore
+        :param sentence: The derived sentence
+        :return: Tuple(used productions, decoded sentences from the start one to the derived one)
+        """
+
+        productions: List[Production] = list()
+        sentences: List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]] = [self.decode(sentence)]
+        while parent[sentence] is not None:
+            sentence, index = parent[sentence]
+            productions.append(self.source[index])
+            sentences.append(self.decode(sentence))
+        productions.reverse()
+        sentences.reverse()
+        return productions, sentences
+
+    def run(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , workers: Optional[int] = None
+            , spill_dir: Optional[pathlib.Path] = None
+            , canonical: bool = False
+    ) -> Outcome:
+        """
+        Searches for a derivation of the given word
+        Searches:
+            forward --- from the start sentence in the order of fewest nonterminals
+            bidirectional --- forward from the start sentence and backward from the word
+                by reversed productions, expanding the smaller frontier first,
+                the derivation is joined at the first sentence reached from both sides
+            best_first --- from the start sentence in the order of the heuristic score
+            astar --- from the start sentence in the order of derivation length
+                plus the heuristic score times weight, weighted A* if the weight is above 1,
+                with a weight about 1 it is breadth-like and slower than the forward search
+            sharded --- from the start sentence with sentences hash-partitioned over worker processes,
+                every worker expands its shard in the order of the forward search
+        The search of a bounded CompiledGrammar visits finitely many sentences,
+            so its verdict is exact unless the budget is exceeded
+        :param word: Sequence of terminal values
+        :param budget: Limits of the search, a step is an expansion of a sentence,
+            unlimited for the forward search if None, DEFAULT_BUDGET of the machines for the other searches,
+            as out of the forward order they may never pop a sentence deciding the word of an Unrestricted Grammar
+        :param search: Search strategy, one of SEARCHES
+        :param heuristic: Name of a heuristic from HEURISTICS or a function scoring
+            (CompiledGrammar, sentence, target) where a lower score is closer to the target,
+            used by best_first and astar searches
+        :param weight: Weight of the heuristic score in the astar search, see __run_informed
+        :param workers: The number of worker processes of the sharded search, the number of processors if None
+        :param spill_dir: Directory for the files of the out-of-core forward search, in memory if None
+        :param canonical: Whether forward and bidirectional searches follow only canonical derivations,
+            see explore
+        :return: Outcome of the search, its trace is Tuple(used productions, sentences)
+        if the Grammar generates the given word
+        else empty tuple
+        """
+
+        if search not in SEARCHES:
+            raise ValueError(f'Unknown search {search}, expected one of {", ".join(SEARCHES)}')
+        if spill_dir is not None and search != 'forward':
+            raise ValueError('Only the forward search can spill to disk')
+        if canonical and search not in ('forward', 'bidirectional'):
+            raise ValueError('Only the forward and bidirectional searches can follow canonical derivations')
+
+        target: Optional[Sentence] = self.encode_word(word)
+        if target is None:
+            return Outcome(Verdict.REJECT, 0)
+
+        if budget is None and search != 'forward':
+            budget = DEFAULT_BUDGET
+
+        if search == 'bidirectional':
+            return self.__run_bidirectional(target, budget or Budget(), canonical)
+
+        if search == 'sharded':
+            return ShardedSearch(self, workers).run(target, budget or Budget())
+
+        if search in ('best_first', 'astar'):
+            if isinstance(heuristic, str):
+                if heuristic not in HEURISTICS:
+                    raise ValueError(f'Unknown heuristic {heuristic}, expected one of {", ".join(HEURISTICS)}')
+                heuristic = HEURISTICS[heuristic]
+            return self.__run_informed(target, budget or Budget(), heuristic, weight, search == 'best_first')
+
+        if spill_dir is not None:
+            return self.__run_out_of_core(target, budget or Budget(), spill_dir, canonical)
+
+        return self.__run_forward(target, budget or Budget(), canonical)
+
+    def enumerate(
+            self
+            , max_length: int
+            , budget: Optional[Budget] = None
+    ) -> Iterator[Tuple[Sentence, Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]]]:
+        """
+        Yields the words of the Grammar up to the given length
+        A bounded CompiledGrammar is searched until no sentence up to the given length is left,
+            then every word up to it is yielded in the order of lengths
+        Otherwise a word is yielded if no longer word is popped before it, as the forward search accepts it,
+            so words come in the order of their lengths,
+            the enumeration ends at the first word longer than max_length
+            A word popped after a longer one is never yielded, as the forward search rejects it,
+            so the words are complete up to a length only for a Grammar generating them in the order of lengths
+        :param max_length: The maximum length of a word
+        :param budget: Limits of the search, the enumeration ends when they are exceeded, unlimited if None
+        :return: Iterator of Tuple(word as a sentence of terminal codes, Tuple(used productions, sentences))
+        """
+
+        parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = dict()
+        longest: int = 0
+        words: List[Sentence] = list()
+
+        meter: Meter = (budget or Budget()).start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        for sentence, nonterminals, pending in self.explore(parent, max_length=max_length):
+            if steps >= checkpoint:
+                if meter.exhausted(steps, pending + 1):
+                    break
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            if nonterminals == 0:
+                if self.bounded:
+                    words.append(sentence)
+                    continue
+                if len(sentence) > max_length:
+                    return
+                if len(sentence) >= longest:
+                    longest = len(sentence)
+                    yield sentence, self.derivation(parent, sentence)
+
+        for sentence in sorted(words, key=len):
+            yield sentence, self.derivation(parent, sentence)
+
+    def run_shared(
+            self
+            , words: Sequence[Sequence[str]]
+            , budget: Optional[Budget] = None
+            , canonical: bool = False
+    ) -> Iterator[Tuple[int, Outcome]]:
+        """
+        Searches for derivations of all given words with one forward search
+        Every word gets the verdict of its own forward search:
+            it is accepted when it is popped, rejected when a longer word is popped first,
+            the search ends when every word has a verdict
+        Sentences are pruned by the limits of all words if the CompiledGrammar is bounded,
+            then a longer word does not reject a word, as its own search prunes the longer one,
+            the words which are not popped are rejected when no sentence is left
+        :param words: Sequences of terminal values
+        :param budget: Limits of the shared search, a step is an expansion of a sentence,
+            the words without a verdict are unknown when they are exceeded, unlimited if None
+        :param canonical: Whether the search follows only canonical derivations, see explore
+        :return: Iterator of Tuple(index of the word, outcome of its search) in the order of verdicts
+        """
+
+        waiting: Dict[Sentence, List[int]] = dict()
+        for index, word in enumerate(words):
+            target: Optional[Sentence] = self.encode_word(word)
+            if target is None:
+                yield index, Outcome(Verdict.REJECT, 0)
+            else:
+                waiting.setdefault(target, list()).append(index)
+
+        parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = dict()
+
+        meter: Meter = (budget or Budget()).start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        verdict: Verdict = Verdict.REJECT
+        for sentence, nonterminals, pending in self.explore(parent, list(waiting), canonical=canonical):
+            if len(waiting) == 0:
+                break
+            if steps >= checkpoint:
+                if meter.exhausted(steps, pending + 1):
+                    verdict = Verdict.UNKNOWN
+                    break
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            if nonterminals == 0:
+                if sentence in waiting:
+                    trace = self.derivation(parent, sentence)
+                    for index in waiting.pop(sentence):
+                        yield index, Outcome(Verdict.ACCEPT, steps, trace)
+                if self.bounded:
+                    continue
+                for target in [x for x in waiting if len(sentence) > len(x)]:
+                    for index in waiting.pop(target):
+                        yield index, Outcome(Verdict.REJECT, steps)
+
+        for indices in waiting.values():
+            for index in indices:
+                yield index, Outcome(verdict, steps)
+
+    def __run_forward(
+            self
+            , target: Sentence
+            , budget: Budget
+            , canonical: bool
+            , parent: Optional[Dict[Sentence, Optional[Tuple[Sentence, int]]]] = None
+            , queue: Optional[Frontier] = None
+            , boundary: Optional[Dict[Sentence, int]] = None
+            , expanded: Optional[Dict[Sentence, int]] = None
+    ) -> Outcome:
+        """
+        Searches for a derivation of the target from the start sentence
+        :param target: Sentence of terminal codes
+        :param budget: Limits of the search
+        :param canonical: Whether only canonical derivations are followed
+        :param parent: Empty dictionary of the parent pointers, a new dict if None
+        :param queue: Empty Frontier, a new one if None
+        :param boundary: Empty dictionary of the boundaries of the canonical search, a new dict if None
+        :param expanded: Empty dictionary of the boundaries of expanded sentences, a new dict if None
+        :return: Outcome of the search
+        """
+
+        parent = parent if parent is not None else dict()
+
+        meter: Meter = budget.start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        for sentence, nonterminals, pending in self.explore(
+                parent, [target], queue, canonical, boundary=boundary, expanded=expanded
+        ):
+            if steps >= checkpoint:
+                if meter.exhausted(steps, pending + 1):
+                    return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            if nonterminals == 0:
+                if sentence == target:
+                    return Outcome(Verdict.ACCEPT, steps, self.derivation(parent, target))
+                if len(sentence) > len(target):
+                    return Outcome(Verdict.REJECT, steps)
+
+        return Outcome(Verdict.REJECT, steps)
+
+    def __run_out_of_core(
+            self
+            , target: Sentence
+            , budget: Budget
+            , spill_dir: pathlib.Path
+            , canonical: bool
+    ) -> Outcome:
+        """
+        Searches for a derivation of the target from the start sentence in the order of the forward search
+            keeping the parent pointers in a DiskHashTable and the pending sentences in a SpillingFrontier,
+            the boundaries of the canonical search in DiskHashTables too,
+            their files are removed when the search ends
+        :param target: Sentence of terminal codes
+        :param budget: Limits of the search
+        :param spill_dir: Directory for the files of the search
+        :param canonical: Whether only canonical derivations are followed
+        :return: Outcome of the search
+        """
+
+        with tempfile.TemporaryDirectory(dir=spill_dir) as directory:
+            parent = DiskHashTable(pathlib.Path(directory) / 'parent')
+            queue = SpillingFrontier(pathlib.Path(directory))
+            tables: List[DiskHashTable] = list()
+            if canonical:
+                tables = [DiskHashTable(pathlib.Path(directory) / x) for x in ('boundary', 'expanded')]
+            try:
+                return self.__run_forward(target, budget, canonical, parent, queue, *tables)
+            finally:
+                queue.close()
+                parent.close()
+                for table in tables:
+                    table.close()
+
+    def __run_bidirectional(self, target: Sentence, budget: Budget, canonical: bool) -> Outcome:
+        """
+        Searches for a derivation of the target from both ends
+        The forward side is the forward search,
+            the backward side is a breadth-first search from the target
+            replacing an occurrence of a production body by its head
+        Either side running out of sentences proves that the target is not derived
+        :param target: Sentence of terminal codes
+        :param budget: Limits of the search
+        :param canonical: Whether the forward side follows only canonical derivations
+        :return: Outcome of the search
+        """
+
+        productions = self.productions
+
+        parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = dict()
+        forward: Iterator[Tuple[Sentence, int, int]] = self.explore(parent, [target], canonical=canonical)
+        forward_pending: int = 1
+
+        child: Dict[Sentence, Optional[Tuple[Sentence, int]]] = {target: None}
+        backward: Deque[Sentence] = deque([target])
+
+        meter: Meter = budget.start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        while forward_pending != 0 and len(backward) != 0:
+            if steps >= checkpoint:
+                if meter.exhausted(steps, forward_pending + len(backward)):
+                    return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            if len(backward) < forward_pending:
+                sentence: Sentence = backward.popleft()
+                for index, i in self.__reversed_matches(sentence):
+                    head, body, _ = productions[index]
+                    new_sentence: Sentence = sentence[:i] + head + sentence[i + len(body):]
+                    if new_sentence not in child:
+                        child[new_sentence] = (sentence, index)
+                        if new_sentence in parent:
+                            return Outcome(Verdict.ACCEPT, steps, self.__join(parent, child, new_sentence))
+                        backward.append(new_sentence)
+                continue
+
+            sentence, nonterminals, forward_pending = next(forward, (None, 0, -1))
+            forward_pending += 1
+            if sentence is None:
+                break
+
+            if sentence in child:
+                return Outcome(Verdict.ACCEPT, steps, self.__join(parent, child, sentence))
+            if nonterminals == 0 and len(sentence) > len(target):
+                return Outcome(Verdict.REJECT, steps)
+
+        return Outcome(Verdict.REJECT, steps)
+
+    def __run_informed(
+            self
+            , target: Sentence
+            , budget: Budget
+            , heuristic: Heuristic
+            , weight: float
+            , greedy: bool
+    ) -> Outcome:
+        """
+        Searches for a derivation of the target from the start sentence
+            expanding the sentence with the lowest priority first,
+            ties are broken in the order of discovery
+        The target is accepted as soon as it is discovered,
+            it is rejected when a popped sentence of terminals is longer than the target,
+            as the forward search does, or when no sentence is left
+        A derivation is far longer than the heuristic score of any of its sentences,
+            so with a small weight the derivation length dominates the priority
+            and the search expands sentences level by level, more of them than the forward search,
+            with DEFAULT_WEIGHT the score leads and the length breaks its ties
+        :param target: Sentence of terminal codes
+        :param budget: Limits of the search
+        :param heuristic: Function scoring (CompiledGrammar, sentence, target)
+        :param weight: Weight of the heuristic score, unused by the greedy search
+        :param greedy: Whether the priority is the heuristic score only,
+            else the derivation length plus the weighted score
+        :return: Outcome of the search
+        """
+
+        productions = self.productions
+        matcher = self.matcher
+        max_length, limits, adds_terminals = self.bounds([target])
+
+        parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = {self.start: None}
+        counter: int = 0
+        queue: List[Tuple[float, int, int, Sentence]] = [(0, counter, 0, self.start)]
+
+        meter: Meter = budget.start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        if self.start == target:
+            return Outcome(Verdict.ACCEPT, steps, self.derivation(parent, target))
+
+        while len(queue) != 0:
+            if steps >= checkpoint:
+                if meter.exhausted(steps, len(queue)):
+                    return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            _, _, depth, sentence = heapq.heappop(queue)
+            if len(sentence) > len(target) and self.nonterminals(sentence) == 0:
+                return Outcome(Verdict.REJECT, steps)
+
+            for index, i in matcher.matches(sentence):
+                head, body, _ = productions[index]
+                new_sentence: Sentence = sentence[:i] + body + sentence[i + len(head):]
+                if new_sentence not in parent:
+                    if max_length is not None and len(new_sentence) > max_length:
+                        continue
+                    if adds_terminals[index] and any(new_sentence.count(symbol) > count for symbol, count in limits):
+                        continue
+                    parent[new_sentence] = (sentence, index)
+                    if new_sentence == target:
+                        return Outcome(Verdict.ACCEPT, steps, self.derivation(parent, target))
+                    score: float = heuristic(self, new_sentence, target)
+                    counter += 1
+                    heapq.heappush(queue, (
+                        score if greedy else depth + 1 + weight * score
+                        , counter
+                        , depth + 1
+                        , new_sentence
+                    ))
+
+        return Outcome(Verdict.REJECT, steps)
+
+    def __reversed_matches(self, sentence: Sentence) -> Iterator[Tuple[int, int]]:
+        """
+        Yields every occurrence of a production body in the sentence,
+            a production with the empty body occurs at every position
+        :param sentence: Sentence of symbol codes
+        :return: Iterator of Tuple(production index, position)
+        """
+
+        for index, i in self.body_matcher.matches(sentence):
+            yield self.body_productions[index], i
+        for index in self.empty_bodies:
+            for i in range(len(sentence) + 1):
+                yield index, i
+
+    def __join(
+            self
+            , parent: Dict[Sentence, Optional[Tuple[Sentence, int]]]
+            , child: Dict[Sentence, Optional[Tuple[Sentence, int]]]
+            , sentence: Sentence
+    ) -> Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]:
+        """
+        Joins the derivation of the sentence from the start one and the derivation of the target from it
+        :param parent: Parent pointers of the forward side
+        :param child: Pointers of the backward side to the sentence derived by one production
+        :param sentence: Sentence reached from both sides
+        :return: Tuple(used productions, decoded sentences from the start one to the target)
+        """
+
+        productions, sentences = self.derivation(parent, sentence)
+        while child[sentence] is not None:
+            sentence, index = child[sentence]
+            productions.append(self.source[index])
+            sentences.append(self.decode(sentence))
+        return productions, sentences
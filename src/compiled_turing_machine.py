@@ -0,0 +1,378 @@
+""" Compiled deterministic Turing Machine module """
+
+import math
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from src.budget import Budget
+from src.budget import Meter
+from src.budget import Outcome
+from src.budget import Verdict
+from src.checkpoint import Checkpoint
+from src.checkpoint import CheckpointWriter
+from src.run_length_tape import RunLengthTape
+
+BLANK: str = '_'
+
+UNKNOWN: str = ''
+
+SHIFTS: Dict[str, int] = {'<': -1, '>': 1}
+
+
+class CompiledTuringMachine:
+    """ Class representing a deterministic Turing Machine
+        compiled to integer-coded states, symbols and a flat transition table """
+
+    def __init__(self, turing_machine):
+        """
+        Constructor of CompiledTuringMachine instance
+        states - list of state names, the index of a state is its code
+        symbols - list of tape symbols, the index of a symbol is its code
+            the last code is reserved for symbols unknown to the Turing Machine
+        table - flat transition table indexed by state * width + symbol
+            each cell is None or a tuple (next state, written symbol, head shift)
+        accepting - list of flags, True if the state is an accepting one
+        :param turing_machine: The deterministic Turing Machine to compile
+        """
+
+        self.states: List[str] = sorted(
+            turing_machine.states | turing_machine.accept_states | {turing_machine.init_state}
+        )
+        self.symbols: List[str] = sorted(turing_machine.gamma | {BLANK} | {
+            symbol
+            for (_, cur_symbol), moves in turing_machine.transitions.items()
+            for symbol in [cur_symbol] + [next_symbol for _, next_symbol, _ in moves]
+        })
+        self.state_codes: Dict[str, int] = {x: i for i, x in enumerate(self.states)}
+        self.symbol_codes: Dict[str, int] = {x: i for i, x in enumerate(self.symbols)}
+        self.unknown: int = len(self.symbols)
+        self.width: int = len(self.symbols) + 1
+        self.blank: int = self.symbol_codes[BLANK]
+        self.init_state: int = self.state_codes[turing_machine.init_state]
+
+        self.accepting: List[bool] = [x in turing_machine.accept_states for x in self.states]
+
+        self.table: List[Optional[Tuple[int, int, int]]] = [None] * (len(self.states) * self.width)
+        for (cur_state, cur_symbol), moves in turing_machine.transitions.items():
+            for next_state, next_symbol, shift in moves:
+                self.table[self.state_codes[cur_state] * self.width + self.symbol_codes[cur_symbol]] = (
+                    self.state_codes[next_state]
+                    , self.symbol_codes[next_symbol]
+                    , SHIFTS.get(shift, 0)
+                )
+
+    def encode(self, word: Sequence[str]) -> Union[bytearray, List[int]]:
+        """
+        Encodes the given word to a tape of symbol codes
+        The tape is a bytearray when all codes fit in a byte, else a list
+        :param word: Sequence of tape symbols
+        :return: Mutable tape with codes of the word symbols, a single blank for the empty word
+        """
+
+        tape_type = bytearray if self.width <= 256 else list
+        if len(word) == 0:
+            return tape_type([self.blank])
+        return tape_type(self.symbol_codes.get(x, self.unknown) for x in word)
+
+    def accepts(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , detect_loops: bool = False
+    ) -> bool:
+        """
+        Returns whether the Turing Machine accepts the given word
+        :param word: Sequence of tape symbols
+        :param budget: Limits of the run, the word is considered rejected if they are exceeded
+        :param detect_loops: Whether to reject the word as soon as the run is found to loop
+        :return: Boolean value - if Turing Machine accepts word then True, else False
+        """
+
+        return self.run(word, budget, detect_loops).verdict is Verdict.ACCEPT
+
+    def configurations_bound(self, length: int) -> Optional[int]:
+        """
+        Returns the number of distinct configurations on a tape of the given length
+            |Q| * |Gamma|^length * length
+            a run longer than this on such a tape repeats a configuration
+        :param length: Length of the tape
+        :return: The number of configurations, None if it does not fit in 64 bits
+        """
+
+        if length * math.log2(self.width) + math.log2(len(self.states) * length) >= 64:
+            return None
+        return len(self.states) * self.width ** length * length
+
+    def save(
+            self
+            , word: Sequence[str]
+            , state: int
+            , tape: Union[bytearray, List[int]]
+            , pos: int
+            , steps: int
+    ) -> Checkpoint:
+        """
+        Returns the Checkpoint of a run in the given configuration
+        Symbols unknown to the Turing Machine are saved as UNKNOWN,
+            they are never overwritten and stop the run when read, so their names do not matter
+        :param word: Sequence of tape symbols the run was started on
+        :param state: Code of the current state
+        :param tape: Tape of symbol codes
+        :param pos: Index of the cell under the head
+        :param steps: The number of steps done
+        :return: Checkpoint instance
+        """
+
+        symbols = self.symbols + [UNKNOWN]
+        return Checkpoint(list(word), steps, [(self.states[state], [symbols[x] for x in tape], pos)])
+
+    def restore(
+            self
+            , word: Sequence[str]
+            , checkpoint: Checkpoint
+    ) -> Tuple[int, Union[bytearray, List[int]], int, int]:
+        """
+        Returns the configuration of a run saved to the Checkpoint
+        :param word: Sequence of tape symbols the run was started on
+        :param checkpoint: Checkpoint of a deterministic run on the word
+        :return: Tuple(code of the state, tape of symbol codes, index of the cell under the head, steps)
+        """
+
+        if checkpoint.word != list(word):
+            raise ValueError('Checkpoint was saved by a run on another word')
+        if len(checkpoint.configurations) != 1:
+            raise ValueError('Checkpoint was saved by a non-deterministic run')
+
+        state, cells, pos = checkpoint.configurations[0]
+        if state not in self.state_codes:
+            raise ValueError(f'Checkpoint state {state} is unknown to the Turing Machine')
+        return self.state_codes[state], self.encode(cells), pos, checkpoint.steps
+
+    def run(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , detect_loops: bool = False
+            , writer: Optional[CheckpointWriter] = None
+            , resume: Optional[Checkpoint] = None
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word
+        Runs on one mutable tape that grows by doubling, so a step costs O(1)
+        Loop detection compares the configuration with a snapshot
+            taken at every power of two steps (Brent's method)
+            and checks the number of steps against configurations_bound of the tape
+        :param word: Sequence of tape symbols
+        :param budget: Limits of the run, unlimited if None, steps are counted from the start of the run
+        :param detect_loops: Whether to stop the run as soon as it is found to loop
+        :param writer: Saves the Checkpoint of the run when it is due and when the budget is exceeded,
+            the run is unknown when it is stopped by SIGTERM
+        :param resume: Checkpoint of the run on the word to continue from, the run starts afresh if None
+        :return: Outcome of the run, a looping run is rejected as diverging
+        """
+
+        table = self.table
+        accepting = self.accepting
+        width = self.width
+        blank = self.blank
+
+        tape: Union[bytearray, List[int]] = self.encode(word)
+        pos: int = 0
+        state: int = self.init_state
+        steps: int = 0
+        if resume is not None:
+            state, tape, pos, steps = self.restore(word, resume)
+
+        meter: Meter = (budget or Budget()).start()
+        checkpoint: int = meter.next_check(steps)
+
+        snapshot_at: int = max(steps, 1) if detect_loops else -1
+        snapshot: Tuple[int, int, Union[bytearray, List[int]]] = (-1, -1, tape[:0])
+        bound_length: int = 0
+        bound: Optional[int] = None
+
+        while True:
+            move = table[state * width + tape[pos]]
+
+            if move is None:
+                return Outcome(Verdict.ACCEPT if accepting[state] else Verdict.REJECT, steps)
+
+            if state == snapshot[0] and pos == snapshot[1] and tape == snapshot[2]:
+                return Outcome(Verdict.REJECT, steps, diverges=True)
+
+            if steps == snapshot_at:
+                snapshot = (state, pos, tape[:])
+                snapshot_at *= 2
+
+            if steps >= checkpoint:
+                if detect_loops:
+                    if bound_length != len(tape):
+                        bound_length = len(tape)
+                        bound = self.configurations_bound(bound_length)
+                    if bound is not None and steps > bound:
+                        return Outcome(Verdict.REJECT, steps, diverges=True)
+                if meter.exhausted(steps):
+                    if writer is not None:
+                        writer.save(self.save(word, state, tape, pos, steps))
+                    return Outcome(Verdict.UNKNOWN, steps)
+                if writer is not None and writer.due():
+                    writer.save(self.save(word, state, tape, pos, steps))
+                    if writer.stopped:
+                        return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+
+            state, tape[pos], shift = move
+            pos += shift
+            steps += 1
+
+            if pos < 0:
+                pos += len(tape)
+                tape[0:0] = [blank] * len(tape)
+            elif pos == len(tape):
+                tape.extend([blank] * len(tape))
+
+    def run_bounded(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , writer: Optional[CheckpointWriter] = None
+            , resume: Optional[Checkpoint] = None
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word as a Linear Bounded Automaton
+        The tape is preallocated with the length of the word and never grows,
+            the caller guarantees that the head never leaves it,
+            LinearBoundedAutomaton.compile_bounded checks the end markers for it
+        Loops are always detected as in run, so every run ends with an exact verdict
+            unless the budget is exceeded
+        :param word: Sequence of tape symbols, end markers included
+        :param budget: Limits of the run, unlimited if None, steps are counted from the start of the run
+        :param writer: Saves the Checkpoint of the run as in run
+        :param resume: Checkpoint of the run on the word to continue from, the run starts afresh if None
+        :return: Outcome of the run, a looping run is rejected as diverging
+        """
+
+        table = self.table
+        accepting = self.accepting
+        width = self.width
+
+        tape: Union[bytearray, List[int]] = self.encode(word)
+        pos: int = 0
+        state: int = self.init_state
+        steps: int = 0
+        if resume is not None:
+            state, tape, pos, steps = self.restore(word, resume)
+            if len(tape) != len(word) or not 0 <= pos < len(tape):
+                raise ValueError('Checkpoint tape does not fit the bounded tape of the word')
+
+        meter: Meter = (budget or Budget()).start()
+        checkpoint: int = meter.next_check(steps)
+
+        snapshot_at: int = max(steps, 1)
+        snapshot: Tuple[int, int, Union[bytearray, List[int]]] = (-1, -1, tape[:0])
+        bound: Optional[int] = self.configurations_bound(len(tape))
+
+        while True:
+            move = table[state * width + tape[pos]]
+
+            if move is None:
+                return Outcome(Verdict.ACCEPT if accepting[state] else Verdict.REJECT, steps)
+
+            if state == snapshot[0] and pos == snapshot[1] and tape == snapshot[2]:
+                return Outcome(Verdict.REJECT, steps, diverges=True)
+
+            if steps == snapshot_at:
+                snapshot = (state, pos, tape[:])
+                snapshot_at *= 2
+
+            if steps >= checkpoint:
+                if bound is not None and steps > bound:
+                    return Outcome(Verdict.REJECT, steps, diverges=True)
+                if meter.exhausted(steps):
+                    if writer is not None:
+                        writer.save(self.save(word, state, tape, pos, steps))
+                    return Outcome(Verdict.UNKNOWN, steps)
+                if writer is not None and writer.due():
+                    writer.save(self.save(word, state, tape, pos, steps))
+                    if writer.stopped:
+                        return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+
+            state, tape[pos], shift = move
+            pos += shift
+            steps += 1
+
+    def run_run_length(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , detect_loops: bool = False
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word stored as a run-length encoded tape
+        A transition which keeps the state and moves the head
+            is applied to the whole block of equal symbols at once,
+            such a macro-step counts as all the steps it replaces
+        Loop detection compares the configuration with a snapshot
+            taken at every power of two macro-steps (Brent's method),
+            the tape is compared relative to the head,
+            so a run that repeats itself shifted along the tape is found too
+        :param word: Sequence of tape symbols
+        :param budget: Limits of the run, unlimited if None
+        :param detect_loops: Whether to stop the run as soon as it is found to loop
+        :return: Outcome of the run, a looping run is rejected as diverging
+            as well as a sweep into the endless blank part of the tape
+        """
+
+        table = self.table
+        accepting = self.accepting
+        width = self.width
+
+        tape: RunLengthTape = RunLengthTape(self.encode(word), self.blank)
+        state: int = self.init_state
+
+        meter: Meter = (budget or Budget()).start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        macro_steps: int = 0
+        snapshot_at: int = 1 if detect_loops else -1
+        snapshot: Tuple = (-1, tape.symbol, tape.around[:], tape.configuration())
+
+        while True:
+            move = table[state * width + tape.symbol]
+
+            if move is None:
+                return Outcome(Verdict.ACCEPT if accepting[state] else Verdict.REJECT, steps)
+
+            if state == snapshot[0] and tape.symbol == snapshot[1] and tape.around == snapshot[2] \
+                    and tape.configuration() == snapshot[3]:
+                return Outcome(Verdict.REJECT, steps, diverges=True)
+
+            if macro_steps == snapshot_at:
+                snapshot = (state, tape.symbol, tape.around[:], tape.configuration())
+                snapshot_at *= 2
+
+            if steps >= checkpoint:
+                if meter.exhausted(steps):
+                    return Outcome(Verdict.UNKNOWN, steps)
+                checkpoint = meter.next_check(steps)
+
+            next_state, next_symbol, shift = move
+
+            if next_state == state and shift != 0:
+                crossed = tape.sweep(next_symbol, shift)
+                if crossed is None:
+                    return Outcome(Verdict.REJECT, steps, diverges=True)
+                steps += crossed
+            else:
+                tape.write(next_symbol)
+                tape.move(shift)
+                steps += 1
+
+            macro_steps += 1
+            state = next_state
@@ -1,11 +1,20 @@
 """ Context Sensitive Grammar module """
 
 import itertools
+import pathlib
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
 
 from pyformlang import cfg
 
+from src.compiled_grammar import CompiledGrammar
+from src.compiled_turing_machine import SHIFTS
 from src.grammar import Grammar
+from src.linear_bounded_automaton import LinearBoundedAutomaton
 from src.my_production import Production
+from src.provenance import Provenance
 from src.turing_machine import TuringMachine
 
 
@@ -13,6 +22,35 @@ class ContextSensitiveGrammar(Grammar):
     """ Class representing a Context Sensitive Grammar
         Subclass of Grammar Class """
 
+    def __init__(self):
+        """
+        Constructor of ContextSensitiveGrammar instance
+        non_contracting - whether the Grammar was found non-contracting when it was loaded or built,
+            then searches are bounded by the length of the word
+        """
+
+        super().__init__()
+        self.non_contracting: bool = False
+
+    def copy(self):
+        """
+        Returns a copy of the Context Sensitive Grammar instance
+        :return: A copy of the Context Sensitive Grammar instance
+        """
+
+        grammar = super().copy()
+        grammar.non_contracting = self.non_contracting
+        return grammar
+
+    def compile(self) -> CompiledGrammar:
+        """
+        Compiles the Context Sensitive Grammar to integer-coded symbols,
+            the search is bounded by the length of the word if the Grammar is non-contracting
+        :return: CompiledGrammar instance
+        """
+
+        return CompiledGrammar(self, bounded=self.non_contracting)
+
     def __add_initial_configs_single(
             self
             , lba: TuringMachine
@@ -385,17 +423,103 @@ class ContextSensitiveGrammar(Grammar):
                  cfg.Terminal(f'{sigma_symbol_2}'),)
             ))
 
+    def _replay(
+            self
+            , word: str
+            , moves: List[Tuple[int, str, str, str, str, str]]
+    ) -> Optional[List[Tuple[Production, int]]]:
+        """
+        Builds the derivation of the word following the accepting computation of the Linear Bounded Automaton
+            in the symbols of from_lba before the optimizations
+        A symbol of the sentence is a cell of the tape with the end marker next to it,
+            a move rewrites the cells under the head before and after it,
+            then the cell with the accepting state becomes its terminal and the word is restored
+            sweeping the cells to the right of it, then to the left
+        :param word: Non-empty word accepted by the Linear Bounded Automaton
+        :param moves: Moves of the computation on $word# from TuringMachine.computation
+        :return: List of (production, position of its head in the sentence), None if it is not built
+        """
+
+        if len(word) == 0 or any(move[5] not in SHIFTS for move in moves):
+            return None
+
+        n: int = len(word)
+        cells: List[List[str]] = [[x, x] for x in word]
+
+        def _owner(pos: int) -> int:
+            return min(max(pos - 1, 0), n - 1)
+
+        def _cell(k: int, pos: int, state: str) -> cfg.Variable:
+            parts: List[str] = (['$'] if k == 0 else []) + cells[k] + (['#'] if k == n - 1 else [])
+            if pos == k + 1:
+                parts.insert(1 if k == 0 else 0, state)
+            elif pos == 0 and k == 0:
+                parts.insert(0, state)
+            elif pos == n + 1 and k == n - 1:
+                parts.insert(len(parts) - 1, state)
+            return cfg.Variable(f'[{",".join(parts)}]')
+
+        steps: List[Tuple[Production, int]] = list()
+        sentence: List[Union[cfg.Variable, cfg.Terminal]] = [cfg.Variable('S1')]
+
+        def _apply(
+                head: List[Union[cfg.Variable, cfg.Terminal]]
+                , body: List[Union[cfg.Variable, cfg.Terminal]]
+                , i: int
+        ):
+            steps.append((Production(tuple(head), tuple(body)), i))
+            sentence[i:i + len(head)] = body
+
+        init_state: str = self.provenance.machine.init_state
+        if n == 1:
+            _apply([cfg.Variable('S1')], [_cell(0, 0, init_state)], 0)
+        else:
+            _apply([cfg.Variable('S1')], [_cell(0, 0, init_state), cfg.Variable('S2')], 0)
+            for k in range(1, n - 1):
+                _apply([cfg.Variable('S2')], [_cell(k, -1, ''), cfg.Variable('S2')], k)
+            _apply([cfg.Variable('S2')], [_cell(n - 1, -1, '')], n - 1)
+
+        for pos, cur_state, cur_symbol, next_state, next_symbol, shift in moves:
+            next_pos: int = pos + SHIFTS[shift]
+            owners: List[int] = sorted({_owner(pos), _owner(next_pos)})
+            head = [_cell(k, pos, cur_state) for k in owners]
+            if 1 <= pos <= n:
+                cells[pos - 1][0] = next_symbol
+            elif next_symbol != cur_symbol:
+                return None
+            _apply(head, [_cell(k, next_pos, next_state) for k in owners], owners[0])
+
+        pos: int = moves[-1][0] + SHIFTS[moves[-1][5]] if len(moves) != 0 else 0
+        accept: str = moves[-1][3] if len(moves) != 0 else init_state
+        c: int = _owner(pos)
+        _apply([_cell(c, pos, accept)], [cfg.Terminal(cells[c][1])], c)
+
+        for k in range(c + 1, n):
+            terminal = cfg.Terminal(cells[k - 1][1])
+            _apply([terminal, _cell(k, -1, '')], [terminal, cfg.Terminal(cells[k][1])], k - 1)
+        for k in range(c - 1, -1, -1):
+            terminal = cfg.Terminal(cells[k + 1][1])
+            _apply([_cell(k, -1, ''), terminal], [cfg.Terminal(cells[k][1]), terminal], k)
+
+        return steps
+
     @classmethod
-    def from_lba(cls, lba: TuringMachine):
+    def from_lba(cls, lba: TuringMachine, optimize: bool = True):
         """
         Build a Context Sensitive Grammar by a Linear Bounded Automaton
-        :param lba: The Linear Bounded Automaton from which the Context Sensitive Grammar is built
+        :param lba: The Linear Bounded Automaton from which the Context Sensitive Grammar is built,
+            a TuringMachine is read as a Linear Bounded Automaton, so the provenance encloses words in end markers
+        :param optimize: Whether useless productions and simple substitutions are removed
         :return: The Context Sensitive Grammar builded by lba
         """
 
+        if not isinstance(lba, LinearBoundedAutomaton):
+            lba = LinearBoundedAutomaton.from_lines(lba.to_lines())
+
         grammar = ContextSensitiveGrammar()
         grammar.terminals = {cfg.Terminal(x) for x in lba.sigma}
         grammar.start_symbol = cfg.Variable('S1')
+        grammar.provenance = Provenance(lba)
         grammar.__add_initial_configs_single(lba, 'S1')
         grammar.__add_single_movement_configs(lba)
         grammar.__add_single_movement_restore_configs(lba)
@@ -407,11 +531,25 @@ class ContextSensitiveGrammar(Grammar):
         grammar.__add_general_movement_restore_word(lba)
         grammar = grammar.nonterminals_optimization()
 
-        while True:
+        while optimize:
             prev = len(grammar.productions)
-            grammar = grammar.deep_optimization(max_cnt=5)
+            grammar = grammar.useful_optimization()
             grammar = grammar.substitutions_optimization()
             if prev == len(grammar.productions):
                 break
 
+        grammar.non_contracting = grammar.is_non_contracting()
+        return grammar
+
+    @classmethod
+    def from_txt(cls, path: pathlib.Path):
+        """
+        Loads an instance of a Context Sensitive Grammar from a txt file
+            and checks whether it is non-contracting
+        :param path: Path to a txt file
+        :return: Context Sensitive Grammar instance
+        """
+
+        grammar = super().from_txt(path)
+        grammar.non_contracting = grammar.is_non_contracting()
         return grammar
@@ -0,0 +1,202 @@
+""" Hash table stored on disk module """
+
+import hashlib
+import mmap
+import os
+import pathlib
+import pickle
+import struct
+from typing import Any
+from typing import Optional
+from typing import Tuple
+
+from src.bloom_filter import BloomFilter
+
+SLOT = struct.Struct('<QQ')
+RECORD = struct.Struct('<II')
+BUFFER: int = 1 << 20
+
+
+def _key_bytes(key: Any) -> bytes:
+    """
+    Returns the byte string identifying the key
+    :param key: Byte string or picklable key
+    :return: The key itself if it is a byte string else its pickle
+    """
+
+    return key if isinstance(key, bytes) else pickle.dumps(key)
+
+
+class DiskHashTable:
+    """ Class representing a dictionary whose keys and values are kept in files
+        Records (key, pickled value) are appended to a data file,
+        a memory-mapped slot file is an open addressing table of (key hash, record offset)
+        with linear probing, it doubles when half full
+        Lookups of absent keys are answered by a BloomFilter in memory
+        without touching the files in most cases """
+
+    def __init__(self, path: pathlib.Path, capacity: int = 1 << 16, expected: int = 1 << 22):
+        """
+        Constructor of DiskHashTable instance
+        data - the data file, records are written in chunks of BUFFER bytes,
+            flushed - its size on disk, buffer - the records not written yet
+        slots - the memory-mapped slot file of capacity slots, 0 marks an empty slot
+        :param path: Path prefix of the files, PATH.data and PATH.slots are created
+        :param capacity: The initial number of slots, a power of two
+        :param expected: The expected number of keys, sizes the BloomFilter
+        """
+
+        self.path: pathlib.Path = path
+        self.data = open(path.with_suffix('.data'), 'w+b')
+        self.flushed: int = 0
+        self.buffer: bytearray = bytearray()
+        self.count: int = 0
+        self.bloom: BloomFilter = BloomFilter(expected)
+        self.capacity: int = capacity
+        self.slots_file, self.slots = self.__allocate(path.with_suffix('.slots'), capacity)
+
+    @staticmethod
+    def __allocate(path: pathlib.Path, capacity: int) -> Tuple[Any, mmap.mmap]:
+        """
+        Creates a slot file of empty slots
+        :param path: Path to the slot file
+        :param capacity: The number of slots
+        :return: Tuple(the open file, its memory map)
+        """
+
+        slots_file = open(path, 'w+b')
+        slots_file.truncate(capacity * SLOT.size)
+        return slots_file, mmap.mmap(slots_file.fileno(), capacity * SLOT.size)
+
+    @staticmethod
+    def __hash(key: bytes) -> int:
+        """
+        Returns the non-zero 64 bit hash of the key, the same in every process
+        :param key: Byte string
+        :return: The hash
+        """
+
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') | 1
+
+    def __read(self, offset: int, size: int) -> bytes:
+        """
+        Reads bytes of the data file, a record is never split between the file and the buffer
+        :param offset: Offset in the data file
+        :param size: The number of bytes
+        :return: The bytes
+        """
+
+        if offset >= self.flushed:
+            return bytes(self.buffer[offset - self.flushed:offset - self.flushed + size])
+        self.data.seek(offset)
+        return self.data.read(size)
+
+    def __find(self, key: bytes, digest: int) -> Tuple[int, Optional[int]]:
+        """
+        Probes the slots of the key
+        :param key: Byte string
+        :param digest: Hash of the key
+        :return: Tuple(index of the slot of the key or of the empty slot ending the probe,
+            offset of the record of the key or None if there is none)
+        """
+
+        mask: int = self.capacity - 1
+        i: int = digest & mask
+        while True:
+            stored, offset = SLOT.unpack_from(self.slots, i * SLOT.size)
+            if stored == 0:
+                return i, None
+            if stored == digest:
+                key_size, _ = RECORD.unpack(self.__read(offset, RECORD.size))
+                if self.__read(offset + RECORD.size, key_size) == key:
+                    return i, offset
+            i = (i + 1) & mask
+
+    def __grow(self):
+        """
+        Doubles the number of slots, entries are moved from the old slot file to the new one
+        Both files are closed before the new one replaces the old one, as Windows
+            can not rename a mapped file, then the new one is mapped again
+        :return: None
+        """
+
+        old_file, old_slots, old_capacity = self.slots_file, self.slots, self.capacity
+        self.capacity *= 2
+        self.slots_file, self.slots = self.__allocate(self.path.with_suffix('.grow'), self.capacity)
+
+        mask: int = self.capacity - 1
+        for j in range(old_capacity):
+            stored, offset = SLOT.unpack_from(old_slots, j * SLOT.size)
+            if stored != 0:
+                i: int = stored & mask
+                while SLOT.unpack_from(self.slots, i * SLOT.size)[0] != 0:
+                    i = (i + 1) & mask
+                SLOT.pack_into(self.slots, i * SLOT.size, stored, offset)
+
+        old_slots.close()
+        old_file.close()
+        self.slots.close()
+        self.slots_file.close()
+        os.replace(self.path.with_suffix('.grow'), self.path.with_suffix('.slots'))
+        self.slots_file = open(self.path.with_suffix('.slots'), 'r+b')
+        self.slots = mmap.mmap(self.slots_file.fileno(), self.capacity * SLOT.size)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: Any) -> bool:
+        key = _key_bytes(key)
+        if key not in self.bloom:
+            return False
+        return self.__find(key, self.__hash(key))[1] is not None
+
+    def __getitem__(self, key: Any) -> Any:
+        key = _key_bytes(key)
+        _, offset = self.__find(key, self.__hash(key))
+        if offset is None:
+            raise KeyError(key)
+        key_size, value_size = RECORD.unpack(self.__read(offset, RECORD.size))
+        return pickle.loads(self.__read(offset + RECORD.size + key_size, value_size))
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """
+        Returns the value of the key
+        :param key: Byte string or picklable key
+        :param default: The value returned if the key is absent
+        :return: The value of the key or default
+        """
+
+        if key not in self:
+            return default
+        return self[key]
+
+    def __setitem__(self, key: Any, value: Any):
+        key = _key_bytes(key)
+        digest: int = self.__hash(key)
+        i, offset = self.__find(key, digest)
+
+        value = pickle.dumps(value)
+        SLOT.pack_into(self.slots, i * SLOT.size, digest, self.flushed + len(self.buffer))
+        self.buffer += RECORD.pack(len(key), len(value)) + key + value
+        if len(self.buffer) >= BUFFER:
+            self.data.seek(self.flushed)
+            self.data.write(self.buffer)
+            self.data.flush()
+            self.flushed += len(self.buffer)
+            self.buffer = bytearray()
+
+        if offset is None:
+            self.count += 1
+            self.bloom.add(key)
+            if 2 * self.count > self.capacity:
+                self.__grow()
+
+    def close(self):
+        """
+        Closes the files of the DiskHashTable, they are left on disk
+        :return: None
+        """
+
+        self.slots.close()
+        self.slots_file.close()
+        self.data.close()
@@ -0,0 +1,50 @@
+""" Priority queue of sentences for the grammar search module """
+
+import heapq
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+
+class Frontier:
+    """ Class representing the pending sentences of the grammar search as a binary heap
+        Sentences with fewer nonterminals go first,
+        among sentences with equal numbers of nonterminals
+        those with terminals go first, newest first,
+        then the others, oldest first """
+
+    def __init__(self):
+        """
+        Constructor of Frontier instance
+        heap - list of (nonterminals, 0 if there are terminals else 1, order, sentence)
+        counter - the number of pushed sentences, it breaks ties deterministically
+        """
+
+        self.heap: List[Tuple[int, int, int, Sequence]] = list()
+        self.counter: int = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, sentence: Sequence, nonterminals: int):
+        """
+        Adds the sentence to the Frontier
+        :param sentence: The sentence
+        :param nonterminals: The number of nonterminals in the sentence
+        :return: None
+        """
+
+        self.counter += 1
+        if nonterminals < len(sentence):
+            heapq.heappush(self.heap, (nonterminals, 0, -self.counter, sentence))
+        else:
+            heapq.heappush(self.heap, (nonterminals, 1, self.counter, sentence))
+
+    def pop(self) -> Tuple[Sequence, int]:
+        """
+        Removes the first sentence from the Frontier
+        :return: Tuple(sentence, number of nonterminals in it)
+        """
+
+        nonterminals, _, _, sentence = heapq.heappop(self.heap)
+        return sentence, nonterminals
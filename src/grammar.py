@@ -1,18 +1,31 @@
 """ Generic Grammar definition module """
 
+import functools
+import hashlib
+import itertools
 import pathlib
-from collections import deque
-from typing import Deque
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Sequence
 from typing import Set
 from typing import Tuple
 from typing import Union
 
 from pyformlang import cfg
 
+from src.budget import Budget
+from src.budget import Outcome
+from src.budget import Verdict
+from src.compiled_grammar import CompiledGrammar
+from src.compiled_grammar import DEFAULT_WEIGHT
+from src.compiled_grammar import Sentence
+from src.heuristics import Heuristic
 from src.my_production import Production
+from src.parallel import run_many
+from src.provenance import Provenance
 
 
 class Grammar:
@@ -25,78 +38,332 @@ class Grammar:
         terminals - set of terminal varibles
         start symbol - start symbol of Grammar instance
         productions - dictionary matching the head of production to set of bodies
+        provenance - the machine the Grammar is built from and the renaming of its symbols, None if unknown
         """
 
         self.nonterminals: Set[cfg.Variable] = set()
         self.terminals: Set[cfg.Terminal] = set()
         self.start_symbol: cfg.Variable = cfg.Variable('S')
         self.productions: List[Production] = list()
-
-    def accepts(self, word: str) -> Tuple[
+        self.provenance: Optional[Provenance] = None
+
+    def accepts(
+            self
+            , word: str
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , workers: Optional[int] = None
+            , spill_dir: Optional[pathlib.Path] = None
+            , canonical: bool = False
+    ) -> Tuple[
         List[Production],
         List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]
     ]:
         """
         Returns whether the Context Sensitive Grammar generates the given word
         :param word: Tuple from grammar terminals
+        :param budget: Limits of the search, the word is considered not generated if they are exceeded
+        :param search: Search strategy, one of SEARCHES
+        :param heuristic: Name of a heuristic from HEURISTICS or a scoring function for informed searches
+        :param weight: Weight of the heuristic score in the astar search
+        :param workers: The number of worker processes of the sharded search, the number of processors if None
+        :param spill_dir: Directory for the files of the out-of-core forward search, in memory if None
+        :param canonical: Whether forward and bidirectional searches follow only canonical derivations
         :return: Tuple(used productions, sentences)
         if Context Sensitive Grammar generates the given word
         else empty tuple
         """
 
-        word = tuple(cfg.Terminal(x) for x in word)
+        return self.run(word, budget, search, heuristic, weight, workers, spill_dir, canonical).trace
+
+    def accepts_many(
+            self
+            , words: Sequence[str]
+            , workers: Optional[int] = None
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , canonical: bool = False
+    ) -> Iterator[Tuple[
+        str,
+        Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]
+    ]]:
+        """
+        Checks whether the Grammar generates every given word
+        The forward search of all words is shared if workers is None,
+            else the Grammar is sent to every worker of a pool once, longer words are scheduled first
+        :param words: Words from grammar terminals
+        :param workers: The number of worker processes, one shared forward search in the calling process if None,
+            the number of processors if None and the search is not forward
+        :param budget: Limits of every search, the word is considered not generated if they are exceeded
+        :param search: Search strategy, one of SEARCHES
+        :param heuristic: Name of a heuristic from HEURISTICS or a picklable scoring function for informed searches
+        :param weight: Weight of the heuristic score in the astar search
+        :param canonical: Whether forward and bidirectional searches follow only canonical derivations
+        The machine of a Grammar with provenance is replayed word by word instead of the shared search,
+            the workers of a pool replay it as run does
+        The sharded search checks the words one by one, each sharded over workers processes,
+            so the shards are not multiplied by the pool
+        :return: Iterator of Tuple(word, result of accepts) in the order of completion
+        """
 
-        used: Dict[
-            Tuple[Union[cfg.Variable, cfg.Terminal], ...],
-            List[Production]
-        ] = dict()
+        if workers is None and search == 'forward' and self.provenance is not None:
+            for word in words:
+                yield word, self.run(word, budget, canonical=canonical).trace
+            return
+
+        if search == 'sharded':
+            for word in words:
+                yield word, self.run(word, budget, search, heuristic, weight, workers, canonical=canonical).trace
+            return
+
+        if workers is None and search == 'forward':
+            for index, outcome in self.compile().run_shared(words, budget, canonical):
+                yield words[index], outcome.trace
+            return
+
+        runner = functools.partial(
+            self._run
+            , self.compile()
+            , budget=budget
+            , search=search
+            , heuristic=heuristic
+            , weight=weight
+            , canonical=canonical
+        )
+        for word, outcome in run_many(runner, words, workers):
+            yield word, outcome.trace
+
+    def enumerate(
+            self
+            , max_len: int
+            , budget: Optional[Budget] = None
+    ) -> Iterator[Tuple[
+        str,
+        Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]
+    ]]:
+        """
+        Yields the words generated by the Grammar up to the given length in the order of their lengths
+        A word is yielded as soon as the forward search accepts it,
+            all words of a bounded Grammar are yielded once its search is exhausted,
+            a word of another Grammar the forward search rejects is never yielded, see CompiledGrammar.enumerate
+        :param max_len: The maximum length of a word
+        :param budget: Limits of the search, the enumeration ends when they are exceeded, unlimited if None
+        :return: Iterator of Tuple(word, Tuple(used productions, sentences))
+        """
+
+        compiled: CompiledGrammar = self.compile()
+        for sentence, trace in compiled.enumerate(max_len, budget):
+            yield ''.join(x.value for x in compiled.decode(sentence)), trace
+
+    def compile(self) -> CompiledGrammar:
+        """
+        Compiles the Grammar to integer-coded symbols
+        :return: CompiledGrammar instance
+        """
+
+        return CompiledGrammar(self)
+
+    def run(
+            self
+            , word: str
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , workers: Optional[int] = None
+            , spill_dir: Optional[pathlib.Path] = None
+            , canonical: bool = False
+    ) -> Outcome:
+        """
+        Searches for a derivation of the given word
+        The forward search of a Grammar with provenance replays the machine first, see replay
+        :param word: Tuple from grammar terminals
+        :param budget: Limits of the search, a step is an expansion of a sentence,
+            unlimited for the forward search if None, see CompiledGrammar.run
+        :param search: Search strategy, one of SEARCHES
+        :param heuristic: Name of a heuristic from HEURISTICS or a scoring function for informed searches
+        :param weight: Weight of the heuristic score in the astar search
+        :param workers: The number of worker processes of the sharded search, the number of processors if None
+        :param spill_dir: Directory for the files of the out-of-core forward search, in memory if None
+        :param canonical: Whether forward and bidirectional searches follow only canonical derivations
+        :return: Outcome of the search, its trace is Tuple(used productions, sentences)
+        if the Grammar generates the given word
+        else empty tuple
+        """
+
+        return self._run(None, word, budget, search, heuristic, weight, workers, spill_dir, canonical)
+
+    def _run(
+            self
+            , compiled: Optional[CompiledGrammar]
+            , word: str
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , workers: Optional[int] = None
+            , spill_dir: Optional[pathlib.Path] = None
+            , canonical: bool = False
+    ) -> Outcome:
+        """
+        Searches for a derivation of the given word as run does with the given compiled Grammar,
+            so worker processes of a batch compile the Grammar once
+        :param compiled: The compiled Grammar, compiled when needed if None
+        :return: Outcome of the search, see run
+        """
+
+        if search == 'forward':
+            outcome: Optional[Outcome] = self.replay(word, budget)
+            if outcome is not None:
+                return outcome
+
+        compiled = compiled if compiled is not None else self.compile()
+        return compiled.run(word, budget, search, heuristic, weight, workers, spill_dir, canonical)
+
+    def replay(self, word: str, budget: Optional[Budget] = None) -> Optional[Outcome]:
+        """
+        Decides whether the Grammar generates the given word by running the machine it is built from
+            and translating the accepting computation into a derivation
+        A halt of the deterministic machine without acceptance is exact
+            if the word passes the checks of the machine input, see Provenance.machine_word,
+            a translated derivation is returned only if verify_derivation accepts it
+        :param word: Tuple from grammar terminals
+        :param budget: Limits of the run, a step is a move of the machine, DEFAULT_BUDGET of the machine if None
+        :return: Outcome of the run, its trace is Tuple(used productions, sentences) if the word is accepted
+            , None if the Grammar has no provenance, its machine is non-deterministic,
+            the word fails the checks of the machine input or the computation is not translated
+        """
+
+        if self.provenance is None or not self.provenance.machine.is_deterministic():
+            return None
+
+        tape: Optional[List[str]] = self.provenance.machine_word(word)
+        if tape is None:
+            return None
 
-        parent: Dict[
+        verdict, moves = self.provenance.machine.computation(tape, budget)
+        if verdict != Verdict.ACCEPT:
+            return Outcome(verdict, len(moves))
+
+        steps: Optional[List[Tuple[Production, int]]] = self._replay(word, moves)
+        if steps is None:
+            return None
+
+        current: Dict[str, Union[cfg.Variable, cfg.Terminal]] = dict()
+
+        def _current(unit: Union[cfg.Variable, cfg.Terminal]) -> Union[cfg.Variable, cfg.Terminal]:
+            if unit.value not in current:
+                value: str = self.provenance.symbol(unit.value)
+                current[unit.value] = \
+                    cfg.Terminal(value) if cfg.Terminal(value) in self.terminals else cfg.Variable(value)
+            return current[unit.value]
+
+        productions: List[Production] = list()
+        sentences: List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]] = [(self.start_symbol,)]
+        for production, i in steps:
+            head = tuple(_current(x) for x in production.head)
+            body = tuple(_current(x) for x in production.body)
+            if head == body:
+                continue
+            sentence = sentences[-1]
+            if sentence[i:i + len(head)] != head:
+                return None
+            productions.append(Production(head, body))
+            sentences.append(sentence[:i] + body + sentence[i + len(head):])
+
+        if not self.verify_derivation(word, (productions, sentences)):
+            return None
+        return Outcome(Verdict.ACCEPT, len(moves), (productions, sentences))
+
+    def _replay(
+            self
+            , word: str
+            , moves: List[Tuple[int, str, str, str, str, str]]
+    ) -> Optional[List[Tuple[Production, int]]]:
+        """
+        Builds the derivation of the word following the accepting computation of the machine
+            in the symbols of the Grammar built from it before the optimizations
+        :param word: Word accepted by the machine
+        :param moves: Moves of the computation from TuringMachine.computation
+        :return: List of (production, position of its head in the sentence), None if it is not built
+        """
+
+        return None
+
+    def verify_derivation(
+            self
+            , word: str
+            , trace: Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]
+    ) -> bool:
+        """
+        Checks a derivation of the word
+        :param word: Tuple from grammar terminals
+        :param trace: Tuple(used productions, sentences) from accepts
+        :return: Boolean value - True if the sentences start with the start symbol, end with the word
+            and every sentence follows from the previous one by its production of the Grammar, else False,
+            a production is looked for only around the end of the common prefix of the two sentences
+        """
+
+        productions, sentences = trace
+        if len(sentences) != len(productions) + 1 or len(sentences) == 0:
+            return False
+        if sentences[0] != (self.start_symbol,) or sentences[-1] != tuple(cfg.Terminal(x) for x in word):
+            return False
+
+        known: Set[Tuple[
             Tuple[Union[cfg.Variable, cfg.Terminal], ...],
             Tuple[Union[cfg.Variable, cfg.Terminal], ...]
-        ] = dict()
+        ]] = self._known(productions)
+
+        for production, before, after in zip(productions, sentences, sentences[1:]):
+            head, body = production.head, production.body
+            if (head, body) not in known:
+                return False
+
+            if head == body:
+                candidates = range(len(before) - len(head) + 1) if before == after else range(0)
+            else:
+                lo, hi = 0, min(len(before), len(after))
+                while lo < hi:
+                    mid: int = (lo + hi + 1) // 2
+                    if before[:mid] == after[:mid]:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                candidates = range(max(0, lo - max(len(head), len(body))), min(lo, len(before) - len(head)) + 1)
 
-        queue: Deque[Tuple[Union[cfg.Variable, cfg.Terminal], ...]] = \
-            deque([(cfg.Variable(self.start_symbol),)])
+            if not any(
+                    before[i:i + len(head)] == head and before[:i] + body + before[i + len(head):] == after
+                    for i in candidates
+            ):
+                return False
 
-        while len(queue) != 0:
-            sentence: Tuple[Union[cfg.Variable, cfg.Terminal], ...] = queue.popleft()
-
-            if sentence not in used:
-                used[sentence] = list()
-
-            if all(isinstance(x, cfg.Terminal) for x in sentence):
-                if sentence == word:
-                    trace = list()
-                    prev = word
-                    while prev in parent:
-                        trace.append(prev)
-                        prev = parent[prev]
-                    trace.append(prev)
-                    trace.reverse()
-                    return used[word], trace
-                if len(sentence) > len(word):
-                    return tuple()
+        return True
 
-            for production in self.productions:
-                for i in range(len(sentence) - len(production.head) + 1):
-                    if production.head == sentence[i:i + len(production.head)]:
-                        new_sentence: Tuple[Union[cfg.Variable, cfg.Terminal], ...] = \
-                            sentence[:i] + production.body + sentence[i + len(production.head):]
-                        if new_sentence not in used:
-                            used[new_sentence] = used[sentence].copy() + [production]
-                            parent[new_sentence] = sentence
-                            if any(isinstance(x, cfg.Terminal) for x in new_sentence):
-                                queue.appendleft(new_sentence)
-                            else:
-                                queue.append(new_sentence)
-
-            queue = deque(sorted(
-                queue
-                , key=lambda y: sum(1 for x in y if isinstance(x, cfg.Variable))
-            ))
-
-        return tuple()
+    def _known(self, productions: Sequence[Production]) -> Set[Tuple[
+        Tuple[Union[cfg.Variable, cfg.Terminal], ...],
+        Tuple[Union[cfg.Variable, cfg.Terminal], ...]
+    ]]:
+        """
+        Returns the productions of the Grammar a derivation is checked against
+        :param productions: Productions used by the derivation
+        :return: Set of (head, body) of every production of the Grammar
+        """
+
+        return {(x.head, x.body) for x in self.productions}
+
+    def is_non_contracting(self) -> bool:
+        """
+        Returns whether no production has a body shorter than its head,
+            then a sentence never derives a shorter one
+        :return: Boolean value - True if the Grammar is non-contracting, else False
+        """
+
+        return all(len(production.body) >= len(production.head) for production in self.productions)
 
     def copy(self):
         """
@@ -104,16 +371,36 @@ class Grammar:
         :return: A copy of the Grammar instance
         """
 
-        grammar = Grammar()
+        grammar = type(self)()
         grammar.nonterminals = self.nonterminals.copy()
         grammar.terminals = self.terminals.copy()
         grammar.start_symbol = cfg.Variable(self.start_symbol.value)
         grammar.productions = self.productions.copy()
+        grammar.provenance = self.provenance
         return grammar
 
+    def digest(self) -> str:
+        """
+        Returns the digest of the start symbol, the symbols and the productions of the Grammar,
+            a saved provenance keeps it to be checked against the loaded Grammar
+        :return: Hexadecimal SHA-256 digest
+        """
+
+        lines: List[str] = [
+            self.start_symbol.value
+            , ' '.join(sorted(x.value for x in self.nonterminals))
+            , ' '.join(sorted(x.value for x in self.terminals))
+        ]
+        for production in self.productions:
+            lines.append(
+                ' '.join(x.value for x in production.head) + ' -> ' + ' '.join(x.value for x in production.body)
+            )
+        return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
     def to_txt(self, path: pathlib.Path):
         """
-        Saves an instance of the Grammar to a txt file
+        Saves an instance of the Grammar to a txt file,
+            the provenance follows the productions, see Provenance.from_lines
         :param path: Path to a txt file
         :return: None
         """
@@ -138,15 +425,21 @@ class Grammar:
                     + f'{" ".join(_values(production.body))}\n'
                 )
 
+            if self.provenance is not None:
+                for line in self.provenance.to_lines(self.digest()):
+                    output_file.write(f'{line}\n')
+
     @classmethod
     def from_txt(cls, path: pathlib.Path):
         """
         Loads an instance of a Grammar from a txt file
+        A provenance is loaded only with the digest of the loaded Grammar,
+            so an edited or stale file does not replay a machine of another Grammar
         :param path: Path to a txt file
         :return: Grammar instance
         """
 
-        grammar = Grammar()
+        grammar = cls()
 
         with open(path, 'r') as input_file:
             grammar.start_symbol = cfg.Variable(
@@ -163,7 +456,12 @@ class Grammar:
                 for x in input_file.readline().strip().replace('terminals: ', '').split()
             }
 
-            for production in input_file:
+            lines: List[str] = input_file.readlines()
+            end: int = next((i for i, x in enumerate(lines) if x.startswith('provenance: ')), len(lines))
+            if end != len(lines):
+                grammar.provenance = Provenance.from_lines(lines[end:])
+
+            for production in lines[:end]:
                 head, body = production.split(' -> ')
                 grammar.productions.append(Production(
                     tuple(
@@ -176,6 +474,9 @@ class Grammar:
                     )
                 ))
 
+        if grammar.provenance is not None and grammar.provenance.digest != grammar.digest():
+            raise ValueError(f'Provenance in {path} does not match the Grammar, remove it to load the Grammar')
+
         return grammar
 
     def nonterminals_optimization(self):
@@ -235,6 +536,9 @@ class Grammar:
 
             grammar.productions.append(new_production)
 
+        if grammar.provenance is not None:
+            grammar.provenance = grammar.provenance.rename({x.value: y.value for x, y in rename.items()})
+
         return grammar.nonterminals_optimization()
 
     def super_names_optimization(self):
@@ -274,59 +578,37 @@ class Grammar:
 
             grammar.productions.append(new_production)
 
+        if grammar.provenance is not None:
+            grammar.provenance = grammar.provenance.rename({x.value: y.value for x, y in rename.items()})
+
         return grammar
 
     def deep_optimization(self, max_cnt: int = -1):
         """
-        Saves only those products that are used to generate some max_cnt words
+        Saves only those products that are used to generate some max_cnt words,
+            productions of the other words may be lost, useful_optimization keeps every used production
         :param max_cnt: The maximum number of words generated by the Grammar instance
         :return: Grammar instance
         """
 
         cnt: int = max_cnt
 
-        words: Set[Tuple[cfg.Terminal, ...]] = set()
-
-        used: Dict[
-            Tuple[Union[cfg.Variable, cfg.Terminal], ...], List[Production]
-        ] = dict()
+        compiled: CompiledGrammar = self.compile()
 
-        queue: Deque[Tuple[Union[cfg.Variable, cfg.Terminal], ...]] = \
-            deque([(cfg.Variable(self.start_symbol),)])
+        words: Set[Sentence] = set()
 
-        while len(queue) != 0:
-            sentence: Tuple[Union[cfg.Variable, cfg.Terminal], ...] = queue.popleft()
-            print(len(queue), words)
-
-            if sentence not in used:
-                used[sentence] = list()
+        parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = dict()
 
-            if all(isinstance(x, cfg.Terminal) for x in sentence):
+        for sentence, nonterminals, _ in compiled.explore(parent):
+            if nonterminals == 0:
                 cnt -= 1
                 words.add(sentence)
                 if cnt == 0:
                     break
 
-            for production in self.productions:
-                for i in range(len(sentence) - len(production.head) + 1):
-                    if production.head == sentence[i:i + len(production.head)]:
-                        new_sentence: Tuple[Union[cfg.Variable, cfg.Terminal], ...] = \
-                            sentence[:i] + production.body + sentence[i + len(production.head):]
-                        if new_sentence not in used:
-                            used[new_sentence] = used[sentence].copy() + [production]
-                            if any(isinstance(x, cfg.Terminal) for x in new_sentence):
-                                queue.appendleft(new_sentence)
-                            else:
-                                queue.append(new_sentence)
-
-            queue = deque(sorted(
-                queue
-                , key=lambda y: sum(1 for x in y if isinstance(x, cfg.Variable))
-            ))
-
         productions: List[Production] = list()
         for word in words:
-            for production in used[word]:
+            for production in compiled.derivation(parent, word)[0]:
                 if production not in productions:
                     productions.append(production)
 
@@ -341,54 +623,192 @@ class Grammar:
 
         return res.nonterminals_optimization()
 
-    def substitutions_optimization(self):
+    def useful_optimization(self, adjacency: bool = True):
         """
-        Removes all simple substitutions from productions
+        Removes all productions which take part in no derivation of a word, found by fixpoints over the productions
+        A symbol is productive if it is a terminal or in the head of a production with only productive symbols in the body,
+            a production with an unproductive symbol never takes part in a derivation of a word
+        A production is enabled if its head may appear in a sentence: every symbol of it is reachable
+            from the start symbol and, if adjacency, every two neighbouring symbols of it may be adjacent,
+            the adjacent pairs are over-approximated passing the neighbours of the head of an enabled production
+            to the ends of its body
+        The passes are exact for a Context Free Grammar and only remove unused productions of any Grammar,
+            they are repeated while some production is removed
+        :param adjacency: Whether neighbouring symbols of heads are checked to be adjacent, else only their symbols
         :return: Grammar instance
         """
 
-        def _update_production(old_production: Production, substitution: Production) -> Production:
-            """
-            Substitutes substitution into production
-            :param old_production: Production in which the substitution is performed
-            :param substitution: Substitution production
-            :return: Production instance
-            """
+        productions: List[Production] = self.productions
+        while True:
+            prev: int = len(productions)
+            productions = self.__productive(productions)
+            productions = self.__enabled(productions, adjacency)
+            if prev == len(productions):
+                break
+
+        res = self.copy()
+        res.productions = productions
+        return res.nonterminals_optimization()
+
+    def __productive(self, productions: List[Production]) -> List[Production]:
+        """
+        Returns the productions with only productive symbols
+        :param productions: List of productions
+        :return: List of productions
+        """
 
-            old: Tuple[
-                Tuple[Union[cfg.Variable, cfg.Terminal], ...],
-                Tuple[Union[cfg.Variable, cfg.Terminal], ...]
-            ] = (old_production.head, old_production.body)
+        productive: Set[Union[cfg.Variable, cfg.Terminal]] = set(self.terminals)
+        waiting: Dict[Union[cfg.Variable, cfg.Terminal], List[int]] = dict()
+        missing: List[int] = list()
+        queue: List[int] = list()
 
-            substitutied_production = [tuple(), tuple()]
+        for k, production in enumerate(productions):
+            body = set(production.body) - productive
+            missing.append(len(body))
+            for unit in body:
+                waiting.setdefault(unit, list()).append(k)
+            if len(body) == 0:
+                queue.append(k)
 
-            for i in [0, 1]:
-                for unit in old[i]:
-                    if unit != substitution.head[0]:
-                        substitutied_production[i] += tuple([unit])
+        while len(queue) != 0:
+            for unit in productions[queue.pop()].head:
+                if unit not in productive:
+                    productive.add(unit)
+                    for k in waiting.get(unit, tuple()):
+                        missing[k] -= 1
+                        if missing[k] == 0:
+                            queue.append(k)
+
+        return [x for x in productions if all(unit in productive for unit in x.head + x.body)]
+
+    def __enabled(self, productions: List[Production], adjacency: bool) -> List[Production]:
+        """
+        Returns the productions whose heads may appear in a sentence
+        A fact is a reachable symbol (unit,) or a pair (left, right) of symbols which may be adjacent,
+            None stands for an end of the sentence,
+            a production is enabled when all facts about its head hold
+        :param productions: List of productions
+        :param adjacency: Whether facts about pairs are required
+        :return: List of productions
+        """
+
+        def _conditions(head: Tuple[Union[cfg.Variable, cfg.Terminal], ...]) -> Set[Tuple]:
+            res: Set[Tuple] = {(x,) for x in head}
+            if adjacency:
+                res |= set(zip(head, head[1:]))
+            return res
+
+        waiting: Dict[Tuple, List[int]] = dict()
+        missing: List[int] = list()
+        for k, production in enumerate(productions):
+            conditions = _conditions(production.head)
+            missing.append(len(conditions))
+            for fact in conditions:
+                waiting.setdefault(fact, list()).append(k)
+
+        facts: Set[Tuple] = set()
+        left: Dict[Union[cfg.Variable, cfg.Terminal], Set] = dict()
+        right: Dict[Union[cfg.Variable, cfg.Terminal], Set] = dict()
+        starts: Dict[Union[cfg.Variable, cfg.Terminal], List[Production]] = dict()
+        ends: Dict[Union[cfg.Variable, cfg.Terminal], List[Production]] = dict()
+        enabled: List[bool] = [False] * len(productions)
+        queue: List[Tuple] = [(self.start_symbol,), (None, self.start_symbol), (self.start_symbol, None)]
+
+        def _fire(production: Production):
+            head, body = production.head, production.body
+            queue.extend((x,) for x in body)
+            if not adjacency:
+                return
+            queue.extend(zip(body, body[1:]))
+            starts.setdefault(head[0], list()).append(production)
+            ends.setdefault(head[-1], list()).append(production)
+            if len(body) != 0:
+                queue.extend((x, body[0]) for x in left.get(head[0], tuple()))
+                queue.extend((body[-1], x) for x in right.get(head[-1], tuple()))
+            else:
+                queue.extend(itertools.product(left.get(head[0], tuple()), right.get(head[-1], tuple())))
+
+        while len(queue) != 0:
+            fact = queue.pop()
+            if fact in facts:
+                continue
+            facts.add(fact)
+
+            for k in waiting.get(fact, tuple()):
+                missing[k] -= 1
+                if missing[k] == 0:
+                    enabled[k] = True
+                    _fire(productions[k])
+
+            if len(fact) == 2:
+                a, b = fact
+                right.setdefault(a, set()).add(b)
+                left.setdefault(b, set()).add(a)
+                for production in starts.get(b, tuple()):
+                    if len(production.body) != 0:
+                        queue.append((a, production.body[0]))
+                    else:
+                        queue.extend((a, x) for x in right.get(production.head[-1], tuple()))
+                for production in ends.get(a, tuple()):
+                    if len(production.body) != 0:
+                        queue.append((production.body[-1], b))
                     else:
-                        substitutied_production[i] += substitution.body
+                        queue.extend((x, b) for x in left.get(production.head[0], tuple()))
+
+        return [x for k, x in enumerate(productions) if enabled[k]]
+
+    def substitutions_optimization(self):
+        """
+        Removes all simple substitutions from productions
+        A production (A -> B) is a simple substitution if it is the only production with the head (A),
+            it is removed and every A in the other productions is replaced by B
+        A replacement keeps the lengths of productions and never changes a head of length one,
+            so the substitutions are known in advance, they are applied in the order of productions
+            composing the replacements of symbols in one pass
+        :return: Grammar instance
+        """
 
-            new = Production(*substitutied_production)
+        heads: Dict[Union[cfg.Variable, cfg.Terminal], int] = dict()
+        for production in self.productions:
+            if len(production.head) == 1:
+                heads[production.head[0]] = heads.get(production.head[0], 0) + 1
 
-            return new
+        substitutions: Set[int] = {
+            k
+            for k, production in enumerate(self.productions)
+            if len(production.head) == 1 and len(production.body) == 1 and heads[production.head[0]] == 1
+        }
+
+        replace: Dict[Union[cfg.Variable, cfg.Terminal], Union[cfg.Variable, cfg.Terminal]] = dict()
+
+        def _find(unit: Union[cfg.Variable, cfg.Terminal]) -> Union[cfg.Variable, cfg.Terminal]:
+            """
+            Returns the symbol replacing the given one after the applied substitutions
+            :param unit: Symbol
+            :return: Symbol
+            """
+
+            res = unit
+            while res in replace:
+                res = replace[res]
+            while unit in replace and replace[unit] != res:
+                replace[unit], unit = res, replace[unit]
+            return res
 
         res = self.copy()
 
-        while True:
-            prev: int = len(res.productions)
-            for production in res.productions:
-                if len(production.head) == 1 and \
-                        len(production.body) == 1 and \
-                        sum(1 for x in res.productions if x.head == production.head) == 1:
-                    new_productions: List[Production] = list()
-                    for res_production in res.productions:
-                        if res_production.head != production.head:
-                            new_production = _update_production(res_production, production)
-                            new_productions.append(new_production)
-                    res.productions = new_productions.copy()
-                    break
-            if prev == len(res.productions):
-                break
+        for k in sorted(substitutions):
+            head, body = self.productions[k].head[0], _find(self.productions[k].body[0])
+            if head != body:
+                replace[head] = body
+            if res.provenance is not None:
+                res.provenance = res.provenance.substitute(head.value, body.value)
+
+        res.productions = [
+            Production(tuple(_find(x) for x in production.head), tuple(_find(x) for x in production.body))
+            if any(x in replace for x in production.head + production.body) else production
+            for k, production in enumerate(self.productions)
+            if k not in substitutions
+        ]
 
         return res.nonterminals_optimization()
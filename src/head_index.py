@@ -0,0 +1,52 @@
+""" Index of production heads by their first symbol module """
+
+import itertools
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+Sentence = Union[bytes, Tuple[int, ...]]
+
+
+class HeadIndex:
+    """ Class matching production heads against a sentence
+        Heads are indexed by their first symbol, so only productions whose head starts
+        with a symbol of the sentence are searched for, each with one scan in C """
+
+    def __init__(self, heads: Sequence[Sentence], find: Callable[..., int]):
+        """
+        Constructor of HeadIndex instance
+        by_first - dictionary matching a symbol code to indices of productions whose head starts with it
+        :param heads: Heads of the productions, the index of a head is the index of its production
+        :param find: Function returning the lowest index of a head in a sentence not less than a start,
+            -1 if there is none, as bytes.find does
+        """
+
+        self.heads: List[Sentence] = list(heads)
+        self.find: Callable[..., int] = find
+        self.by_first: Dict[int, List[int]] = dict()
+        for index, head in enumerate(self.heads):
+            self.by_first.setdefault(head[0], list()).append(index)
+
+    def matches(self, sentence: Sentence) -> Iterator[Tuple[int, int]]:
+        """
+        Yields every occurrence of a production head in the sentence
+        :param sentence: Sentence of symbol codes
+        :return: Iterator of Tuple(production index, position) ordered by production index, then by position
+        """
+
+        heads = self.heads
+        find = self.find
+        candidates = sorted(itertools.chain.from_iterable(
+            self.by_first.get(x, ()) for x in set(sentence)
+        ))
+        for index in candidates:
+            head = heads[index]
+            i = find(sentence, head)
+            while i != -1:
+                yield index, i
+                i = find(sentence, head, i + 1)
@@ -0,0 +1,61 @@
+""" Heuristics of the informed grammar search module
+
+A heuristic scores a sentence of a CompiledGrammar against the target word,
+both given as sentences of symbol codes, a lower score means closer to the target
+"""
+
+from typing import Callable
+from typing import Dict
+from typing import List
+
+from src.head_index import Sentence
+
+Heuristic = Callable[..., float]
+
+
+def length_distance(grammar, sentence: Sentence, target: Sentence) -> float:
+    """
+    Returns the difference between the lengths of the sentence and the target
+    :param grammar: The CompiledGrammar
+    :param sentence: Sentence of symbol codes
+    :param target: Sentence of terminal codes
+    :return: The absolute difference of the lengths
+    """
+
+    return abs(len(target) - len(sentence))
+
+
+def terminal_distance(grammar, sentence: Sentence, target: Sentence) -> float:
+    """
+    Returns the distance between the multisets of terminals of the sentence and the target
+    :param grammar: The CompiledGrammar
+    :param sentence: Sentence of symbol codes
+    :param target: Sentence of terminal codes
+    :return: The number of terminals to add to or remove from the sentence to match the target multiset
+    """
+
+    return sum(abs(target.count(x) - sentence.count(x)) for x in range(grammar.terminals))
+
+
+def blocked_nonterminals(grammar, sentence: Sentence, target: Sentence) -> float:
+    """
+    Returns the number of nonterminals of the sentence not covered by an occurrence of a production head,
+        such a nonterminal can not be rewritten before its neighbours change
+    :param grammar: The CompiledGrammar
+    :param sentence: Sentence of symbol codes
+    :param target: Sentence of terminal codes
+    :return: The number of blocked nonterminals
+    """
+
+    covered: List[bool] = [False] * len(sentence)
+    for index, i in grammar.matcher.matches(sentence):
+        for j in range(i, i + len(grammar.productions[index][0])):
+            covered[j] = True
+    return sum(1 for x, y in zip(sentence, covered) if x >= grammar.terminals and not y)
+
+
+HEURISTICS: Dict[str, Heuristic] = {
+    'length': length_distance
+    , 'terminals': terminal_distance
+    , 'blocked': blocked_nonterminals
+}
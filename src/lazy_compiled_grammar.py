@@ -0,0 +1,206 @@
+""" Compiled Grammar with productions generated on demand module """
+
+import pathlib
+from collections import OrderedDict
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from pyformlang import cfg
+
+from src.budget import Budget
+from src.budget import Outcome
+from src.compiled_grammar import CompiledGrammar
+from src.compiled_grammar import DEFAULT_WEIGHT
+from src.head_index import Sentence
+from src.heuristics import Heuristic
+from src.my_production import Production
+
+Entry = Tuple[
+    List[Tuple[Sentence, Sentence, int]],
+    List[Production],
+    List[bool],
+    List[int],
+    Dict[int, List[int]]
+]
+
+
+class _Field:
+    """ Class viewing one field of the generated productions as a list indexed by production indices """
+
+    def __init__(self, grammar, field: int):
+        """
+        Constructor of _Field instance
+        :param grammar: The LazyCompiledGrammar
+        :param field: Index of the field in the Entry of a symbol
+        """
+
+        self.grammar = grammar
+        self.field: int = field
+
+    def __getitem__(self, index: Tuple[int, int]):
+        code, k = index
+        return self.grammar.entry(code)[self.field][k]
+
+
+class LazyCompiledGrammar(CompiledGrammar):
+    """ Class representing a LazyGrammar compiled to integer-coded symbols
+        The productions whose head starts with a symbol are generated and compiled
+        when a sentence with the symbol is matched for the first time, at most cache_size symbols
+        keep their productions, the least recently used ones are evicted and generated again if needed
+        A production index is (code of the first symbol of its head, number among its productions),
+        generation is deterministic, so an index stays valid after an eviction
+        Codes of nonterminals are given in the order the symbols are met """
+
+    def __init__(self, grammar):
+        """
+        Constructor of LazyCompiledGrammar instance
+        cache - dictionary matching a symbol code to its Entry in the order of use:
+            compiled productions, productions, flags of added terminals,
+            numbers of productions with one-symbol heads, numbers of the other productions by the second head symbol
+        generated - the number of symbols whose productions were generated
+        :param grammar: The LazyGrammar to compile
+        """
+
+        terminals = sorted(grammar.terminals, key=lambda x: str(x.value))
+        self.grammar = grammar
+        self.symbols: List[Union[cfg.Variable, cfg.Terminal]] = list(terminals)
+        self.terminals: int = len(terminals)
+        self.codes: Dict[Union[cfg.Variable, cfg.Terminal], int] = {x: i for i, x in enumerate(self.symbols)}
+        self.sentence_type = bytes if grammar.max_symbols() <= 256 else tuple
+
+        self.cache_size: int = grammar.cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.generated: int = 0
+
+        self.start: Sentence = self.encode((grammar.start_symbol,))
+        self.productions: _Field = _Field(self, 0)
+        self.source: _Field = _Field(self, 1)
+        self.adds_terminals: _Field = _Field(self, 2)
+        self.matcher: LazyCompiledGrammar = self
+
+        self.bounded: bool = grammar.bounded
+        self.persistent: bool = grammar.persistent
+
+    def encode(self, units: Sequence[Union[cfg.Variable, cfg.Terminal]]) -> Sentence:
+        """
+        Encodes the given symbols to a sentence, a new symbol gets the next code
+        :param units: Sequence of grammar symbols
+        :return: Sentence of symbol codes
+        """
+
+        for unit in units:
+            if unit not in self.codes:
+                self.codes[unit] = len(self.symbols)
+                self.symbols.append(unit)
+        return self.sentence_type(self.codes[x] for x in units)
+
+    def entry(self, code: int) -> Entry:
+        """
+        Returns the productions whose head starts with the symbol, generates them on a cache miss
+        :param code: Code of the symbol
+        :return: Entry of the symbol
+        """
+
+        if code in self.cache:
+            self.cache.move_to_end(code)
+            return self.cache[code]
+
+        source: List[Production] = self.grammar.productions_for(self.symbols[code])
+        compiled: List[Tuple[Sentence, Sentence, int]] = list()
+        adds_terminals: List[bool] = list()
+        singles: List[int] = list()
+        by_second: Dict[int, List[int]] = dict()
+        for k, production in enumerate(source):
+            head, body = self.encode(production.head), self.encode(production.body)
+            compiled.append((head, body, self.nonterminals(body) - self.nonterminals(head)))
+            adds_terminals.append(any(body.count(x) > head.count(x) for x in range(self.terminals)))
+            if len(head) == 1:
+                singles.append(k)
+            else:
+                by_second.setdefault(head[1], list()).append(k)
+
+        entry: Entry = (compiled, source, adds_terminals, singles, by_second)
+        self.generated += 1
+        self.cache[code] = entry
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return entry
+
+    def matches(self, sentence: Sentence) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Yields every occurrence of a production head in the sentence as HeadIndex does
+        :param sentence: Sentence of symbol codes
+        :return: Iterator of Tuple(production index, position) ordered by production index, then by position
+        """
+
+        entries: Dict[int, Entry] = {x: self.entry(x) for x in set(sentence)}
+        found: List[Tuple[Tuple[int, int], int]] = list()
+        for i, x in enumerate(sentence):
+            compiled, _, _, singles, by_second = entries[x]
+            found.extend(((x, k), i) for k in singles)
+            if i + 1 < len(sentence):
+                for k in by_second.get(sentence[i + 1], tuple()):
+                    head = compiled[k][0]
+                    if sentence[i:i + len(head)] == head:
+                        found.append(((x, k), i))
+        found.sort()
+        return iter(found)
+
+    def bounds(self, targets: Sequence[Sentence]) -> Tuple[Optional[int], List[Tuple[int, int]], _Field]:
+        """
+        Returns the limits of sentences which can derive any of the targets as CompiledGrammar.bounds does,
+            the flags of productions are always the lazy ones, they are ignored without terminal limits
+        :param targets: The searched sentences
+        :return: Tuple(the maximum length or None,
+            list of (terminal, its maximum number of occurrences),
+            flags, True if the production must be checked against the terminal limits)
+        """
+
+        if not self.bounded or len(targets) == 0:
+            return None, list(), self.adds_terminals
+        max_length: int = max(len(target) for target in targets)
+        if not self.persistent:
+            return max_length, list(), self.adds_terminals
+        limits: List[Tuple[int, int]] = [
+            (x, max(target.count(x) for target in targets)) for x in range(self.terminals)
+        ]
+        return max_length, limits, self.adds_terminals
+
+    def run(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , search: str = 'forward'
+            , heuristic: Union[str, Heuristic] = 'length'
+            , weight: float = DEFAULT_WEIGHT
+            , workers: Optional[int] = None
+            , spill_dir: Optional[pathlib.Path] = None
+            , canonical: bool = False
+    ) -> Outcome:
+        """
+        Searches for a derivation of the given word as CompiledGrammar.run does
+        The bidirectional search needs every production body and the workers of the sharded search
+            would give the symbols different codes, so they are not supported
+        :param word: Sequence of terminal values
+        :param budget: Limits of the search, a step is an expansion of a sentence,
+            unlimited for the forward search if None, DEFAULT_BUDGET of the machines for the other searches
+        :param search: Search strategy, one of SEARCHES except bidirectional and sharded
+        :param heuristic: Name of a heuristic from HEURISTICS or a function scoring
+            (CompiledGrammar, sentence, target) where a lower score is closer to the target
+        :param weight: Weight of the heuristic score in the astar search
+        :param workers: Not used, the sharded search is not supported
+        :param spill_dir: Directory for the files of the out-of-core forward search, in memory if None
+        :param canonical: Whether the forward search follows only canonical derivations
+        :return: Outcome of the search, its trace is Tuple(used productions, sentences)
+        if the Grammar generates the given word
+        else empty tuple
+        """
+
+        if search in ('bidirectional', 'sharded'):
+            raise ValueError(f'The {search} search needs the whole grammar, a lazy grammar does not support it')
+        return super().run(word, budget, search, heuristic, weight, workers, spill_dir, canonical)
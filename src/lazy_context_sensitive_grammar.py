@@ -0,0 +1,258 @@
+""" Context Sensitive Grammar with productions generated on demand module """
+
+import itertools
+from typing import List
+from typing import Optional
+from typing import Union
+
+from pyformlang import cfg
+
+from src.lazy_grammar import LazyGrammar
+from src.lazy_grammar import _match
+from src.my_production import Production
+from src.turing_machine import TuringMachine
+
+
+def _cell(*parts: str) -> cfg.Variable:
+    """
+    Returns the nonterminal of a cell of the tape
+    :param parts: Values of the cell, the state, the markers, the tape symbol and the terminal
+    :return: Nonterminal
+    """
+
+    return cfg.Variable(f'[{",".join(parts)}]')
+
+
+class LazyContextSensitiveGrammar(LazyGrammar):
+    """ Class representing the Context Sensitive Grammar of a Linear Bounded Automaton
+        whose productions are generated on demand
+        The productions are the ones ContextSensitiveGrammar.from_lba builds before the optimizations,
+        a nonterminal is parsed back to its cell of the tape to find the productions it starts """
+
+    def __init__(self):
+        """
+        Constructor of LazyContextSensitiveGrammar instance
+        lba - the Linear Bounded Automaton the productions are generated from
+        """
+
+        super().__init__()
+        self.lba: Optional[TuringMachine] = None
+        self.bounded = True
+        self.persistent = True
+
+    def copy(self):
+        """
+        Returns a copy of the Lazy Context Sensitive Grammar instance
+        :return: A copy of the Lazy Context Sensitive Grammar instance
+        """
+
+        grammar = super().copy()
+        grammar.lba = self.lba
+        return grammar
+
+    def max_symbols(self) -> int:
+        """
+        Returns the number of symbols the productions can contain:
+            the start symbols, the terminals and 8|Q|+3 cells for every tape symbol and terminal
+        :return: The number of symbols
+        """
+
+        lba = self.lba
+        states = lba.states | lba.accept_states
+        gamma = lba.gamma | {y for x in lba.transitions.values() for _, y, _ in x}
+        return (8 * len(states) + 3) * len(gamma) * len(lba.sigma) + 2 + len(lba.sigma)
+
+    def productions_for(self, symbol: Union[cfg.Variable, cfg.Terminal]) -> List[Production]:
+        """
+        Generates the productions whose head starts with the symbol
+        :param symbol: Symbol of the Grammar
+        :return: List of productions in the same order on every call
+        """
+
+        lba = self.lba
+        sigma, gamma = sorted(lba.sigma), sorted(lba.gamma)
+        value: str = symbol.value
+        res: List[Production] = list()
+
+        if isinstance(symbol, cfg.Terminal):
+            if value in lba.sigma:
+                for gamma_symbol, sigma_symbol in itertools.product(gamma, sigma):
+                    res.append(Production(
+                        (symbol, _cell(gamma_symbol, sigma_symbol)), (symbol, cfg.Terminal(sigma_symbol))
+                    ))
+                    res.append(Production(
+                        (symbol, _cell(gamma_symbol, sigma_symbol, '#')), (symbol, cfg.Terminal(sigma_symbol))
+                    ))
+            return res
+
+        if value == 'S1':
+            for sigma_symbol in sigma:
+                res.append(Production(
+                    (symbol,), (_cell(lba.init_state, '$', sigma_symbol, sigma_symbol, '#'),)
+                ))
+                res.append(Production(
+                    (symbol,), (_cell(lba.init_state, '$', sigma_symbol, sigma_symbol), cfg.Variable('S2'))
+                ))
+            return res
+
+        if value == 'S2':
+            for sigma_symbol in sigma:
+                res.append(Production((symbol,), (_cell(sigma_symbol, sigma_symbol), symbol)))
+                res.append(Production((symbol,), (_cell(sigma_symbol, sigma_symbol, '#'),)))
+            return res
+
+        if not value.startswith('[') or not value.endswith(']'):
+            return res
+        parts: List[str] = value[1:-1].split(',')
+        res.extend(self.__movements(symbol, parts))
+        res.extend(self.__restores(symbol, parts))
+        return res
+
+    def __movements(self, symbol: cfg.Variable, parts: List[str]) -> List[Production]:
+        """
+        Generates the productions for movements of the Linear Bounded Automaton starting with the cell
+        :param symbol: Nonterminal of the cell
+        :param parts: Values of the cell
+        :return: List of productions
+        """
+
+        lba = self.lba
+        gamma, sigma = frozenset(lba.gamma), frozenset(lba.sigma)
+        neighbours = list(itertools.product(sorted(gamma), sorted(sigma)))
+        res: List[Production] = list()
+
+        right = _match(parts, (gamma, sigma))
+        first = _match(parts, ('$', gamma, sigma))
+
+        for (cur_state, cur_symbol), moves in sorted(lba.transitions.items()):
+            if cur_state in lba.accept_states:
+                continue
+            for (next_state, next_symbol, shift), sigma_symbol in itertools.product(sorted(moves), sorted(sigma)):
+                moved = _cell(cur_state, cur_symbol, sigma_symbol)
+                moved_last = _cell(cur_state, cur_symbol, sigma_symbol, '#')
+                skip_left: bool = cur_symbol == '$' and next_symbol == '$' and shift == '>'
+                skip_right: bool = cur_symbol == '#' and next_symbol == '#' and shift == '<'
+
+                if skip_left:
+                    match = _match(parts, (cur_state, '$', gamma, sigma_symbol, '#'))
+                    if match is not None:
+                        res.append(Production((symbol,), (_cell('$', next_state, *match, sigma_symbol, '#'),)))
+                    match = _match(parts, (cur_state, '$', gamma, sigma_symbol))
+                    if match is not None:
+                        res.append(Production((symbol,), (_cell('$', next_state, *match, sigma_symbol),)))
+                elif skip_right:
+                    match = _match(parts, ('$', gamma, sigma_symbol, cur_state, '#'))
+                    if match is not None:
+                        res.append(Production((symbol,), (_cell('$', next_state, *match, sigma_symbol, '#'),)))
+                elif parts == ['$', cur_state, cur_symbol, sigma_symbol, '#']:
+                    if shift == '<':
+                        res.append(Production((symbol,), (_cell(next_state, '$', next_symbol, sigma_symbol, '#'),)))
+                    elif shift == '>':
+                        res.append(Production((symbol,), (_cell('$', next_symbol, sigma_symbol, next_state, '#'),)))
+
+                if not skip_left and parts == ['$', cur_state, cur_symbol, sigma_symbol]:
+                    if shift == '<':
+                        res.append(Production((symbol,), (_cell(next_state, '$', next_symbol, sigma_symbol),)))
+                    elif shift == '>':
+                        for gamma_symbol, sigma_symbol_right in neighbours:
+                            res.append(Production(
+                                (symbol, _cell(gamma_symbol, sigma_symbol_right))
+                                , (_cell('$', next_symbol, sigma_symbol)
+                                   , _cell(next_state, gamma_symbol, sigma_symbol_right))
+                            ))
+                            res.append(Production(
+                                (symbol, _cell(gamma_symbol, sigma_symbol_right, '#'))
+                                , (_cell('$', next_symbol, sigma_symbol)
+                                   , _cell(next_state, gamma_symbol, sigma_symbol_right, '#'))
+                            ))
+
+                if shift == '>' and parts == [cur_state, cur_symbol, sigma_symbol]:
+                    for gamma_symbol, sigma_symbol_right in neighbours:
+                        res.append(Production(
+                            (symbol, _cell(gamma_symbol, sigma_symbol_right))
+                            , (_cell(next_symbol, sigma_symbol), _cell(next_state, gamma_symbol, sigma_symbol_right))
+                        ))
+                        res.append(Production(
+                            (symbol, _cell(gamma_symbol, sigma_symbol_right, '#'))
+                            , (_cell(next_symbol, sigma_symbol)
+                               , _cell(next_state, gamma_symbol, sigma_symbol_right, '#'))
+                        ))
+                if shift == '<' and right is not None:
+                    res.append(Production((symbol, moved), (_cell(next_state, *right), _cell(next_symbol, sigma_symbol))))
+                if shift == '<' and first is not None:
+                    res.append(Production(
+                        (symbol, moved), (_cell('$', next_state, *first), _cell(next_symbol, sigma_symbol))
+                    ))
+
+                if skip_right:
+                    match = _match(parts, (gamma, sigma_symbol, cur_state, '#'))
+                    if match is not None:
+                        res.append(Production((symbol,), (_cell(next_state, *match, sigma_symbol, '#'),)))
+                elif shift == '>' and parts == [cur_state, cur_symbol, sigma_symbol, '#']:
+                    res.append(Production((symbol,), (_cell(next_symbol, sigma_symbol, next_state, '#'),)))
+                elif shift == '<':
+                    if right is not None:
+                        res.append(Production(
+                            (symbol, moved_last), (_cell(next_state, *right), _cell(next_symbol, sigma_symbol, '#'))
+                        ))
+                    if first is not None:
+                        res.append(Production(
+                            (symbol, moved_last)
+                            , (_cell('$', next_state, *first), _cell(next_symbol, sigma_symbol, '#'))
+                        ))
+
+        return res
+
+    def __restores(self, symbol: cfg.Variable, parts: List[str]) -> List[Production]:
+        """
+        Generates the productions restoring the word accepted by the Linear Bounded Automaton
+            starting with the cell
+        :param symbol: Nonterminal of the cell
+        :param parts: Values of the cell
+        :return: List of productions
+        """
+
+        lba = self.lba
+        gamma, sigma = frozenset(lba.gamma), frozenset(lba.sigma)
+        res: List[Production] = list()
+
+        for accept_state in sorted(lba.accept_states):
+            for pattern in (
+                    (accept_state, '$', gamma, sigma, '#')
+                    , ('$', accept_state, gamma, sigma, '#')
+                    , ('$', gamma, sigma, accept_state, '#')
+                    , (accept_state, '$', gamma, sigma)
+                    , ('$', accept_state, gamma, sigma)
+                    , (accept_state, gamma, sigma)
+                    , (accept_state, gamma, sigma, '#')
+                    , (gamma, sigma, accept_state, '#')
+            ):
+                match = _match(parts, pattern)
+                if match is not None:
+                    res.append(Production((symbol,), (cfg.Terminal(match[1]),)))
+
+        for pattern in ((gamma, sigma), ('$', gamma, sigma)):
+            match = _match(parts, pattern)
+            if match is not None:
+                for sigma_symbol in sorted(sigma):
+                    res.append(Production(
+                        (symbol, cfg.Terminal(sigma_symbol)), (cfg.Terminal(match[1]), cfg.Terminal(sigma_symbol))
+                    ))
+
+        return res
+
+    @classmethod
+    def from_lba(cls, lba: TuringMachine, cache_size: int = 1 << 12):
+        """
+        Build a Lazy Context Sensitive Grammar by a Linear Bounded Automaton
+        :param lba: The Linear Bounded Automaton from which the Context Sensitive Grammar is built
+        :param cache_size: The maximum number of symbols whose productions the compiled grammar keeps
+        :return: The Lazy Context Sensitive Grammar of lba
+        """
+
+        grammar = cls()
+        grammar.lba = lba
+        grammar.terminals = {cfg.Terminal(x) for x in lba.sigma}
+        grammar.start_symbol = cfg.Variable('S1')
+        grammar.cache_size = cache_size
+        return grammar
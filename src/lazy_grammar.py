@@ -0,0 +1,170 @@
+""" Grammar with productions generated on demand module """
+
+import pathlib
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from pyformlang import cfg
+
+from src.grammar import Grammar
+from src.lazy_compiled_grammar import LazyCompiledGrammar
+from src.my_production import Production
+
+
+def _match(parts: Sequence[str], pattern: Sequence[Union[str, frozenset]]) -> Optional[List[str]]:
+    """
+    Matches the parts of a symbol against a pattern
+    :param parts: Values separated by commas in the symbol
+    :param pattern: Sequence of values and sets of allowed values
+    :return: List of the parts matched by sets, None if the parts do not match the pattern
+    """
+
+    if len(parts) != len(pattern):
+        return None
+    res: List[str] = list()
+    for part, x in zip(parts, pattern):
+        if isinstance(x, frozenset):
+            if part not in x:
+                return None
+            res.append(part)
+        elif part != x:
+            return None
+    return res
+
+
+class LazyGrammar(Grammar):
+    """ Class representing a Grammar whose productions are not stored
+        A subclass generates the productions whose head starts with a given symbol,
+        the compiled grammar asks for them when a sentence with the symbol is met for the first time,
+        so the productions of symbols which never appear in a sentence are never built
+        The productions list stays empty, the methods working on it, as optimizations and to_txt,
+        raise ValueError, a derivation is checked against the generated productions """
+
+    def __init__(self):
+        """
+        Constructor of LazyGrammar instance
+        cache_size - the maximum number of symbols whose productions the compiled grammar keeps
+        bounded - whether the Grammar is non-contracting, then searches are bounded by the length of the word
+        persistent - whether no production removes a terminal
+        """
+
+        super().__init__()
+        self.cache_size: int = 1 << 12
+        self.bounded: bool = False
+        self.persistent: bool = False
+
+    def productions_for(self, symbol: Union[cfg.Variable, cfg.Terminal]) -> List[Production]:
+        """
+        Generates the productions whose head starts with the symbol
+        :param symbol: Symbol of the Grammar
+        :return: List of productions in the same order on every call
+        """
+
+        return list()
+
+    def max_symbols(self) -> int:
+        """
+        Returns an upper bound of the number of symbols the productions can contain
+        :return: The number of symbols
+        """
+
+        return len(self.terminals) + 1
+
+    def compile(self) -> LazyCompiledGrammar:
+        """
+        Compiles the Lazy Grammar, productions are generated and compiled during the search
+        :return: LazyCompiledGrammar instance
+        """
+
+        return LazyCompiledGrammar(self)
+
+    def copy(self):
+        """
+        Returns a copy of the Lazy Grammar instance
+        :return: A copy of the Lazy Grammar instance
+        """
+
+        grammar = super().copy()
+        grammar.cache_size = self.cache_size
+        grammar.bounded = self.bounded
+        grammar.persistent = self.persistent
+        return grammar
+
+    def _known(self, productions: Sequence[Production]) -> Set[Tuple[
+        Tuple[Union[cfg.Variable, cfg.Terminal], ...],
+        Tuple[Union[cfg.Variable, cfg.Terminal], ...]
+    ]]:
+        """
+        Returns the generated productions starting with the first symbols of the heads of the derivation
+        :param productions: Productions used by the derivation
+        :return: Set of (head, body) of the generated productions
+        """
+
+        return {
+            (x.head, x.body)
+            for symbol in {production.head[0] for production in productions if len(production.head) != 0}
+            for x in self.productions_for(symbol)
+        }
+
+    def to_txt(self, path: pathlib.Path):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be saved
+        :param path: Path to a txt file
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be saved')
+
+    def nonterminals_optimization(self):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
+
+    def names_optimization(self):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
+
+    def super_names_optimization(self):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
+
+    def deep_optimization(self, max_cnt: int = -1):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :param max_cnt: Not used
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
+
+    def useful_optimization(self, adjacency: bool = True):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :param adjacency: Not used
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
+
+    def substitutions_optimization(self):
+        """
+        Not supported, the productions of a Lazy Grammar are not stored to be optimized
+        :return: None
+        """
+
+        raise ValueError('A lazy grammar does not store its productions, it can not be optimized')
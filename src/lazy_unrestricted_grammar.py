@@ -0,0 +1,159 @@
+""" Unrestricted Grammar with productions generated on demand module """
+
+import itertools
+from typing import List
+from typing import Optional
+from typing import Union
+
+from pyformlang import cfg
+
+from src.lazy_grammar import LazyGrammar
+from src.lazy_grammar import _match
+from src.my_production import Production
+from src.turing_machine import TuringMachine
+
+
+class LazyUnrestrictedGrammar(LazyGrammar):
+    """ Class representing the Unrestricted Grammar of a Turing Machine
+        whose productions are generated on demand
+        The productions are the ones UnrestrictedGrammar.from_turing_machine builds before the optimizations,
+        a nonterminal is a state of the machine or is parsed back to its cell of the tape """
+
+    def __init__(self):
+        """
+        Constructor of LazyUnrestrictedGrammar instance
+        turing_machine - the Turing Machine the productions are generated from
+        """
+
+        super().__init__()
+        self.turing_machine: Optional[TuringMachine] = None
+        self.persistent = True
+
+    def copy(self):
+        """
+        Returns a copy of the Lazy Unrestricted Grammar instance
+        :return: A copy of the Lazy Unrestricted Grammar instance
+        """
+
+        grammar = super().copy()
+        grammar.turing_machine = self.turing_machine
+        return grammar
+
+    def max_symbols(self) -> int:
+        """
+        Returns the number of symbols the productions can contain:
+            the start symbols, the states, a cell for every terminal or the empty one and tape symbol,
+            the terminals and the empty one
+        :return: The number of symbols
+        """
+
+        turing_machine = self.turing_machine
+        states = turing_machine.states | turing_machine.accept_states
+        gamma = turing_machine.gamma | {y for x in turing_machine.transitions.values() for _, y, _ in x}
+        return 2 + len(states) + (len(turing_machine.sigma) + 1) * len(gamma) + len(turing_machine.sigma) + 1
+
+    def productions_for(self, symbol: Union[cfg.Variable, cfg.Terminal]) -> List[Production]:
+        """
+        Generates the productions whose head starts with the symbol
+        :param symbol: Symbol of the Grammar
+        :return: List of productions in the same order on every call
+        """
+
+        turing_machine = self.turing_machine
+        sigma = sorted(turing_machine.sigma | {''})
+        gamma = sorted(turing_machine.gamma)
+        accept_states = sorted(turing_machine.accept_states)
+        value: str = symbol.value
+        res: List[Production] = list()
+
+        if isinstance(symbol, cfg.Terminal):
+            if value in turing_machine.sigma:
+                for accept_state in accept_states:
+                    res.append(Production((symbol, cfg.Variable(accept_state)), (symbol,)))
+            return res
+
+        if value == 'S1':
+            res.append(Production(
+                (symbol,)
+                , (cfg.Variable('[,_]'), cfg.Variable(turing_machine.init_state)
+                   , cfg.Variable('S2'), cfg.Variable('[,_]'))
+            ))
+            return res
+
+        if value == 'S2':
+            for sigma_symbol in sorted(turing_machine.sigma):
+                res.append(Production((symbol,), (cfg.Variable(f'[{sigma_symbol},{sigma_symbol}]'), symbol)))
+            res.append(Production((symbol,), tuple()))
+            return res
+
+        if value == '[,_]':
+            res.append(Production((symbol,), (symbol, symbol)))
+
+        cell: Optional[List[str]] = None
+        if value.startswith('[') and value.endswith(']'):
+            cell = _match(value[1:-1].split(','), (frozenset(sigma), frozenset(gamma)))
+
+        for (cur_state, cur_symbol), moves in sorted(turing_machine.transitions.items()):
+            for (next_state, next_symbol, shift), sigma_symbol in itertools.product(sorted(moves), sigma):
+                if shift == '>' and value == cur_state:
+                    res.append(Production(
+                        (symbol, cfg.Variable(f'[{sigma_symbol},{cur_symbol}]'))
+                        , (cfg.Variable(f'[{sigma_symbol},{next_symbol}]'), cfg.Variable(next_state))
+                    ))
+                elif shift == '<' and cell is not None:
+                    res.append(Production(
+                        (symbol, cfg.Variable(cur_state), cfg.Variable(f'[{sigma_symbol},{cur_symbol}]'))
+                        , (cfg.Variable(next_state), symbol, cfg.Variable(f'[{sigma_symbol},{next_symbol}]'))
+                    ))
+
+        res.extend(self.__restores(symbol, cell))
+        return res
+
+    def __restores(self, symbol: cfg.Variable, cell: Optional[List[str]]) -> List[Production]:
+        """
+        Generates the productions restoring the word accepted by the Turing Machine starting with the symbol
+        :param symbol: Nonterminal of the Grammar
+        :param cell: Terminal or empty value and tape symbol of the cell if the symbol is a cell else None
+        :return: List of productions
+        """
+
+        turing_machine = self.turing_machine
+        sigma = sorted(turing_machine.sigma | {''})
+        gamma = sorted(turing_machine.gamma)
+        value: str = symbol.value
+        res: List[Production] = list()
+
+        for accept_state in sorted(turing_machine.accept_states):
+            state = cfg.Variable(accept_state)
+            if cell is not None:
+                res.append(Production((symbol, state), (state, cfg.Terminal(cell[0]), state)))
+                if cell[0] == '':
+                    res.append(Production((symbol, state), (state,)))
+            if value == accept_state:
+                for sigma_symbol, gamma_symbol in itertools.product(sigma, gamma):
+                    res.append(Production(
+                        (symbol, cfg.Variable(f'[{sigma_symbol},{gamma_symbol}]'))
+                        , (symbol, cfg.Terminal(sigma_symbol), symbol)
+                    ))
+                for gamma_symbol in gamma:
+                    res.append(Production((symbol, cfg.Variable(f'[,{gamma_symbol}]')), (symbol,)))
+                for sigma_symbol in sorted(turing_machine.sigma):
+                    res.append(Production((symbol, cfg.Terminal(sigma_symbol)), (cfg.Terminal(sigma_symbol),)))
+
+        return res
+
+    @classmethod
+    def from_turing_machine(cls, turing_machine: TuringMachine, cache_size: int = 1 << 12):
+        """
+        Build a Lazy Unrestricted Grammar by a Turing Machine
+        :param turing_machine: The Turing Machine from which the Unrestricted Grammar is built
+        :param cache_size: The maximum number of symbols whose productions the compiled grammar keeps
+        :return: The Lazy Unrestricted Grammar of turing_machine
+        """
+
+        grammar = cls()
+        grammar.turing_machine = turing_machine
+        grammar.terminals = {cfg.Terminal(x) for x in turing_machine.sigma}
+        grammar.start_symbol = cfg.Variable('S1')
+        grammar.cache_size = cache_size
+        return grammar
@@ -0,0 +1,200 @@
+""" Linear Bounded Automaton module """
+
+import functools
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from src.budget import Budget
+from src.budget import Outcome
+from src.checkpoint import Checkpoint
+from src.checkpoint import CheckpointWriter
+from src.compiled_turing_machine import CompiledTuringMachine
+from src.turing_machine import DEFAULT_BUDGET
+from src.turing_machine import TuringMachine
+
+LEFT_MARKER: str = '$'
+RIGHT_MARKER: str = '#'
+
+
+def _run_bounded(compiled: CompiledTuringMachine, budget: Budget, word: Sequence[str]) -> Outcome:
+    """
+    Runs the compiled Linear Bounded Automaton on the word enclosed between end markers
+    :param compiled: The compiled Linear Bounded Automaton
+    :param budget: Limits of the run
+    :param word: Sequence of tape symbols, end markers included
+    :return: Outcome of the run
+    """
+
+    LinearBoundedAutomaton.check_word(word)
+    return compiled.run_bounded(word, budget)
+
+
+class LinearBoundedAutomaton(TuringMachine):
+    """ Class representing a Linear Bounded Automaton
+        Subclass of TuringMachine Class
+        The tape is the input word enclosed between end markers $ and #,
+        the head never moves past them and they are never overwritten """
+
+    ENGINES: Tuple[str, ...] = ('auto', 'bounded', 'compiled', 'run_length', 'bfs')
+
+    def check_markers(self):
+        """
+        Checks that transitions keep the head between the end markers
+            a transition on $ writes $ and does not move left
+            a transition on # writes # and does not move right
+            no other transition writes an end marker
+        :return: None
+        """
+
+        for (cur_state, cur_symbol), moves in self.transitions.items():
+            for next_state, next_symbol, shift in moves:
+                if cur_symbol == LEFT_MARKER and (next_symbol != LEFT_MARKER or shift == '<'):
+                    raise ValueError(f'Transition ({cur_state},{cur_symbol}) -> '
+                                     + f'({next_state},{next_symbol},{shift}) leaves the left end marker')
+                if cur_symbol == RIGHT_MARKER and (next_symbol != RIGHT_MARKER or shift == '>'):
+                    raise ValueError(f'Transition ({cur_state},{cur_symbol}) -> '
+                                     + f'({next_state},{next_symbol},{shift}) leaves the right end marker')
+                if cur_symbol not in (LEFT_MARKER, RIGHT_MARKER) and next_symbol in (LEFT_MARKER, RIGHT_MARKER):
+                    raise ValueError(f'Transition ({cur_state},{cur_symbol}) -> '
+                                     + f'({next_state},{next_symbol},{shift}) writes an end marker')
+
+    def compile_bounded(self) -> CompiledTuringMachine:
+        """
+        Compiles the Linear Bounded Automaton for the bounded engine
+            which trusts the end markers to keep the head on the preallocated tape,
+            so they are checked first
+        :return: CompiledTuringMachine instance
+        """
+
+        self.check_markers()
+        return self.compile()
+
+    @staticmethod
+    def check_word(word: Sequence[str]):
+        """
+        Checks that the word is enclosed between end markers which do not occur inside it
+        :param word: Sequence of tape symbols
+        :return: None
+        """
+
+        if len(word) < 2 or word[0] != LEFT_MARKER or word[-1] != RIGHT_MARKER \
+                or LEFT_MARKER in word[1:-1] or RIGHT_MARKER in word[1:-1]:
+            raise ValueError(f'Word must be enclosed between {LEFT_MARKER} and {RIGHT_MARKER}')
+
+    def run(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , max_visited: Optional[int] = None
+            , engine: str = 'auto'
+            , detect_loops: bool = False
+            , checkpoint: Optional[str] = None
+            , checkpoint_every: Optional[float] = None
+            , resume_from: Optional[str] = None
+    ) -> Outcome:
+        """
+        Runs the Linear Bounded Automaton on the given word
+        Engines:
+            auto --- bounded if the Linear Bounded Automaton is deterministic, else bfs
+            bounded --- deterministic run on a preallocated tape of the word length
+                without growth checks, loops are always detected,
+                so the verdict is exact unless the budget is exceeded
+            compiled, run_length, bfs --- engines of TuringMachine
+                the bfs engine visits each of the finitely many configurations once,
+                so its verdict is exact as well
+        Runs of bounded, compiled and bfs engines can be saved and continued as in TuringMachine.run
+        :param word: Sequence of tape symbols, end markers included
+        :param budget: Limits of the run, nine minutes of wall time if None
+        :param max_visited: The maximum number of configurations remembered
+            by the non-deterministic search, unlimited if None
+        :param engine: Simulation engine, one of ENGINES
+        :param detect_loops: Whether a run of compiled or run_length engines
+            is stopped as soon as it is found to loop
+        :param checkpoint: Path to the file the run is saved to, not saved if None
+        :param checkpoint_every: Seconds between two saves of the run
+        :param resume_from: Path to the file of a saved run on the word to continue
+        :return: Outcome of the run
+        """
+
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown engine {engine}, expected one of {", ".join(self.ENGINES)}')
+
+        self.check_word(word)
+
+        if engine == 'auto':
+            engine = 'bounded' if self.is_deterministic() else 'bfs'
+
+        return super().run(
+            word
+            , budget
+            , max_visited
+            , engine
+            , detect_loops
+            , checkpoint
+            , checkpoint_every
+            , resume_from
+        )
+
+    def _run_engine(
+            self
+            , engine: str
+            , word: Sequence[str]
+            , budget: Budget
+            , max_visited: Optional[int]
+            , detect_loops: bool
+            , writer: Optional[CheckpointWriter]
+            , resume: Optional[Checkpoint]
+    ) -> Outcome:
+        """
+        Runs the Linear Bounded Automaton on the given word with an engine which saves and continues runs
+        :param engine: bounded, compiled or bfs
+        :param word: Sequence of tape symbols, end markers included
+        :param budget: Limits of the run
+        :param max_visited: The maximum number of configurations remembered by the non-deterministic search
+        :param detect_loops: Whether a run of compiled engine is stopped as soon as it is found to loop
+        :param writer: Saves the Checkpoint of the run, not saved if None
+        :param resume: Checkpoint of the run to continue from, the run starts afresh if None
+        :return: Outcome of the run
+        """
+
+        if engine == 'bounded':
+            return self.compile_bounded().run_bounded(word, budget, writer, resume)
+
+        return super()._run_engine(engine, word, budget, max_visited, detect_loops, writer, resume)
+
+    def _runner(
+            self
+            , budget: Optional[Budget]
+            , max_visited: Optional[int]
+            , engine: str
+            , detect_loops: bool
+    ) -> Callable[[Sequence[str]], Outcome]:
+        """
+        Returns a picklable callable which runs the Linear Bounded Automaton on a word
+        :param budget: Limits of every run
+        :param max_visited: The maximum number of configurations remembered by the non-deterministic search
+        :param engine: Simulation engine, one of ENGINES
+        :param detect_loops: Whether a run of compiled or run_length engines
+            is stopped as soon as it is found to loop
+        :return: Callable from a word to Outcome of the run
+        """
+
+        if engine in ('auto', 'bounded') and self.is_deterministic():
+            return functools.partial(_run_bounded, self.compile_bounded(), budget or DEFAULT_BUDGET)
+
+        return super()._runner(budget, max_visited, engine, detect_loops)
+
+    @classmethod
+    def from_txt(cls, path):
+        """
+        Read Linear Bounded Automaton from txt file in the format of TuringMachine.from_txt
+        and check that its transitions respect the end markers
+        :param path: The path to the txt file with a Linear Bounded Automaton
+        :return: Linear Bounded Automaton instance
+        """
+
+        linear_bounded_automaton = super().from_txt(path)
+        linear_bounded_automaton.check_markers()
+        return linear_bounded_automaton
@@ -0,0 +1,105 @@
+""" Lockstep simulation of many runs of a deterministic Turing Machine module """
+
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+
+from src.budget import Budget
+from src.budget import Meter
+from src.budget import Outcome
+from src.budget import Verdict
+from src.compiled_turing_machine import CompiledTuringMachine
+
+MARGIN: int = 64
+
+
+class LockstepSimulator:
+    """ Class simulating runs of one compiled deterministic Turing Machine on many words at once
+        Tapes are rows of a 2-D uint8 array, heads and states are integer vectors,
+        a step of all active runs is one vectorized table lookup, write and move """
+
+    def __init__(self, compiled: CompiledTuringMachine):
+        """
+        Constructor of LockstepSimulator instance
+        defined, next_state, next_symbol, shift - columns of the flat transition table
+        :param compiled: The compiled deterministic Turing Machine
+        """
+
+        if compiled.width > 256:
+            raise ValueError('Lockstep simulation needs tape symbols with one byte codes')
+
+        self.compiled: CompiledTuringMachine = compiled
+        self.defined = np.array([x is not None for x in compiled.table], dtype=bool)
+        self.next_state = np.array([x[0] if x is not None else 0 for x in compiled.table], dtype=np.int64)
+        self.next_symbol = np.array([x[1] if x is not None else 0 for x in compiled.table], dtype=np.uint8)
+        self.shift = np.array([x[2] if x is not None else 0 for x in compiled.table], dtype=np.int64)
+
+    def run(
+            self
+            , words: Sequence[Sequence[str]]
+            , budget: Optional[Budget] = None
+    ) -> Iterator[Tuple[int, Outcome]]:
+        """
+        Runs the Turing Machine on every word in lockstep
+        Finished runs are masked out and yielded as soon as they halt
+        :param words: Sequences of tape symbols
+        :param budget: Limits of the whole simulation, a step is a step of all active runs,
+            runs still active when they are exceeded are unknown
+        :return: Iterator of Tuple(index of the word, outcome of its run)
+        """
+
+        compiled = self.compiled
+        width: int = compiled.width
+
+        encoded = [compiled.encode(x) for x in words]
+        length: int = max((len(x) for x in encoded), default=1) + 2 * MARGIN
+
+        tapes = np.full((len(words), length), compiled.blank, dtype=np.uint8)
+        for i, tape in enumerate(encoded):
+            tapes[i, MARGIN:MARGIN + len(tape)] = np.frombuffer(bytes(tape), dtype=np.uint8)
+
+        rows = np.arange(len(words), dtype=np.int64)
+        pos = np.full(len(words), MARGIN, dtype=np.int64)
+        states = np.full(len(words), compiled.init_state, dtype=np.int64)
+
+        meter: Meter = (budget or Budget()).start()
+        steps: int = 0
+        checkpoint: int = meter.next_check(steps)
+
+        while len(rows) != 0:
+            flat = tapes.reshape(-1)
+            cells = rows * length + pos
+            keys = states * width + flat[cells]
+            defined = self.defined[keys]
+
+            if not defined.all():
+                halted = ~defined
+                for row, state in zip(rows[halted].tolist(), states[halted].tolist()):
+                    yield row, Outcome(
+                        Verdict.ACCEPT if compiled.accepting[state] else Verdict.REJECT
+                        , steps
+                    )
+                rows, pos, states = rows[defined], pos[defined], states[defined]
+                keys, cells = keys[defined], cells[defined]
+                if len(rows) == 0:
+                    break
+
+            if steps >= checkpoint:
+                if meter.exhausted(steps, len(rows)):
+                    for row in rows.tolist():
+                        yield row, Outcome(Verdict.UNKNOWN, steps)
+                    return
+                checkpoint = meter.next_check(steps)
+
+            flat[cells] = self.next_symbol[keys]
+            states = self.next_state[keys]
+            pos += self.shift[keys]
+            steps += 1
+
+            if steps % MARGIN == 0 and (pos.min() < MARGIN or pos.max() >= length - MARGIN):
+                tapes = np.pad(tapes, ((0, 0), (length, length)), constant_values=compiled.blank)
+                pos += length
+                length *= 3
@@ -0,0 +1,69 @@
+""" Batch acceptance over a pool of worker processes module """
+
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from src.budget import Outcome
+
+_RUNNER: Optional[Callable[[Sequence[str]], Outcome]] = None
+
+
+def _init_worker(runner: Callable[[Sequence[str]], Outcome]):
+    """
+    Stores the runner in the worker process, so it is sent to every worker only once
+    :param runner: Picklable callable which runs a machine or a grammar on a word
+    :return: None
+    """
+
+    global _RUNNER
+    _RUNNER = runner
+
+
+def _run_in_worker(index: int, word: Sequence[str]) -> Tuple[int, Outcome]:
+    """
+    Runs the stored runner on the word
+    :param index: Index of the word in the batch
+    :param word: Word to check
+    :return: Tuple(index of the word, outcome of the run)
+    """
+
+    return index, _RUNNER(word)
+
+
+def run_many(
+        runner: Callable[[Sequence[str]], Outcome]
+        , words: Sequence[Sequence[str]]
+        , workers: Optional[int] = None
+) -> Iterator[Tuple[Sequence[str], Outcome]]:
+    """
+    Runs the runner on every word using a pool of worker processes
+    Longer words are scheduled first, so long runs do not end up last on a single worker
+    Outcomes are yielded as soon as they are ready, not in the order of words
+    :param runner: Picklable callable which runs a machine or a grammar on a word
+    :param words: Words to check
+    :param workers: The number of worker processes, the number of processors if None,
+        1 runs all words in the calling process
+    :return: Iterator of Tuple(word, outcome of the run)
+    """
+
+    order = sorted(range(len(words)), key=lambda i: len(words[i]), reverse=True)
+
+    if workers == 1:
+        for i in order:
+            yield words[i], runner(words[i])
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(runner,)) as executor:
+        futures = [executor.submit(_run_in_worker, i, words[i]) for i in order]
+        try:
+            for future in as_completed(futures):
+                i, outcome = future.result()
+                yield words[i], outcome
+        finally:
+            for future in futures:
+                future.cancel()
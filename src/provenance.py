@@ -0,0 +1,117 @@
+""" Provenance of a Grammar built from a machine module """
+
+import dataclasses
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from src.linear_bounded_automaton import LEFT_MARKER
+from src.linear_bounded_automaton import LinearBoundedAutomaton
+from src.linear_bounded_automaton import RIGHT_MARKER
+from src.turing_machine import TuringMachine
+
+
+@dataclasses.dataclass
+class Provenance:
+    """ A data class representing the machine a Grammar is built from
+        machine - the Turing Machine or the Linear Bounded Automaton
+        symbols - dictionary matching the value of a symbol of the built Grammar to the value it became
+            after the optimizations, a symbol missing from it kept its value
+        digest - digest of the Grammar the Provenance was saved with, see Grammar.digest,
+            None if it was not read from a file """
+
+    machine: TuringMachine
+    symbols: Dict[str, str] = dataclasses.field(default_factory=dict)
+    digest: Optional[str] = None
+
+    def symbol(self, value: str) -> str:
+        """
+        Returns the current value of a symbol of the built Grammar
+        :param value: Value of the symbol in the built Grammar
+        :return: Value of the symbol in the optimized Grammar
+        """
+
+        return self.symbols.get(value, value)
+
+    def substitute(self, old: str, new: str):
+        """
+        Returns the Provenance after every occurrence of a symbol was replaced by another one
+        :param old: Value of the replaced symbol
+        :param new: Value of the replacing symbol
+        :return: Provenance instance
+        """
+
+        return self.rename({old: new})
+
+    def rename(self, rename: Dict[str, str]):
+        """
+        Returns the Provenance after the symbols were renamed
+        :param rename: Dictionary matching the current value of a symbol to its new value
+        :return: Provenance instance
+        """
+
+        symbols: Dict[str, str] = {x: rename.get(y, y) for x, y in self.symbols.items()}
+        for old, new in rename.items():
+            symbols.setdefault(old, new)
+        return Provenance(self.machine, {x: y for x, y in symbols.items() if x != y})
+
+    def machine_word(self, word: Sequence[str]) -> Optional[List[str]]:
+        """
+        Returns the input of the machine for a word of the Grammar
+        :param word: Sequence of terminals
+        :return: The word between the end markers for a Linear Bounded Automaton else the word,
+            None if the Linear Bounded Automaton fails its marker checks on it,
+            then a halt of the machine does not decide the word
+        """
+
+        if isinstance(self.machine, LinearBoundedAutomaton):
+            tape: List[str] = [LEFT_MARKER] + list(word) + [RIGHT_MARKER]
+            try:
+                self.machine.check_markers()
+                self.machine.check_word(tape)
+            except ValueError:
+                return None
+            return tape
+        return list(word)
+
+    def to_lines(self, digest: str) -> List[str]:
+        """
+        Returns the Provenance in the format of from_lines
+        :param digest: Digest of the saved Grammar, see Grammar.digest
+        :return: List of lines without line breaks
+        """
+
+        kind: str = 'lba' if isinstance(self.machine, LinearBoundedAutomaton) else 'tm'
+        lines: List[str] = [f'provenance: {kind}', f'digest: {digest}'] + self.machine.to_lines() + ['symbols:']
+        for old, new in sorted(self.symbols.items()):
+            lines.append(f'{old} -> {new}')
+        return lines
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[str]):
+        """
+        Reads Provenance from lines
+        Lines contain:
+            at first line --- 'provenance: ' and the kind of the machine, tm or lba
+            at second line --- 'digest: ' and the digest of the saved Grammar
+            then the machine in the format of TuringMachine.from_txt
+            then the line 'symbols:'
+            Other lines contain one renamed symbol per line, the value in the built Grammar
+            , ' -> ' and the current value
+        :param lines: Lines of a txt file with a Provenance
+        :return: Provenance instance
+        """
+
+        kind: str = lines[0].replace('provenance: ', '').strip()
+        digest: str = lines[1].replace('digest: ', '').strip()
+        machine_class = LinearBoundedAutomaton if kind == 'lba' else TuringMachine
+        end: int = [x.strip() for x in lines].index('symbols:')
+
+        symbols: Dict[str, str] = dict()
+        for line in lines[end + 1:]:
+            if line.strip() != '':
+                old, new = line.strip().split(' -> ')
+                symbols[old] = new
+
+        return cls(machine_class.from_lines(lines[2:end]), symbols, digest)
@@ -0,0 +1,134 @@
+""" Run-length encoded tape module """
+
+import itertools
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+LEFT: int = 0
+RIGHT: int = 1
+
+
+class RunLengthTape:
+    """ Class representing an infinite tape stored as blocks of equal symbols
+        Blocks on both sides of the head are kept as stacks, nearest block last,
+        and two neighbouring blocks never hold the same symbol,
+        so a whole block can be crossed in one operation """
+
+    def __init__(self, word: Sequence[int], blank: int):
+        """
+        Constructor of RunLengthTape instance
+        sides - stacks of (symbol, count) blocks to the left and to the right of the current block
+        symbol - symbol of the current block, the head reads it
+        around - numbers of cells of the current block to the left and to the right of the head
+        :param word: Codes of tape symbols, the head is on the first of them
+        :param blank: Code of the blank symbol which fills the rest of the tape
+        """
+
+        blocks: List[Tuple[int, int]] = [(x, len(list(y))) for x, y in itertools.groupby(word)] or [(blank, 1)]
+
+        self.blank: int = blank
+        self.sides: List[List[Tuple[int, int]]] = [list(), blocks[:0:-1]]
+        self.symbol: int = blocks[0][0]
+        self.around: List[int] = [0, blocks[0][1] - 1]
+
+    def configuration(self) -> Tuple[int, int, int, Tuple[Tuple[int, int], ...], Tuple[Tuple[int, int], ...]]:
+        """
+        Returns a value equal for tapes with equal blocks and equal head offsets
+        :return: Tuple(symbol, cells before the head, cells after the head, left blocks, right blocks)
+        """
+
+        return self.symbol, self.around[LEFT], self.around[RIGHT], tuple(self.sides[LEFT]), tuple(self.sides[RIGHT])
+
+    def __push(self, side: int, symbol: int, count: int):
+        """
+        Pushes a block to the given side of the current block merging it with an equal neighbour
+        :param side: LEFT or RIGHT
+        :param symbol: Symbol of the block
+        :param count: Length of the block
+        :return: None
+        """
+
+        stack = self.sides[side]
+        if count == 0:
+            return
+        if len(stack) != 0 and stack[-1][0] == symbol:
+            count += stack.pop()[1]
+        stack.append((symbol, count))
+
+    def __enter(self, near: int):
+        """
+        Makes the nearest block on the given side current, the head is on its nearest cell
+        :param near: LEFT or RIGHT
+        :return: None
+        """
+
+        far: int = 1 - near
+        stack = self.sides[near]
+        self.symbol, count = stack.pop() if len(stack) != 0 else (self.blank, 1)
+        self.around[near] = count - 1
+        self.around[far] = 0
+
+        stack = self.sides[far]
+        if len(stack) != 0 and stack[-1][0] == self.symbol:
+            self.around[far] = stack.pop()[1]
+
+    def write(self, symbol: int):
+        """
+        Writes the symbol into the cell under the head
+        :param symbol: Code of the symbol
+        :return: None
+        """
+
+        if symbol == self.symbol:
+            return
+
+        self.__push(LEFT, self.symbol, self.around[LEFT])
+        self.__push(RIGHT, self.symbol, self.around[RIGHT])
+        self.__push(RIGHT, symbol, 1)
+        self.__enter(RIGHT)
+
+    def move(self, shift: int):
+        """
+        Moves the head by one cell
+        :param shift: -1 to move left, 1 to move right, 0 to stay
+        :return: None
+        """
+
+        if shift == 0:
+            return
+
+        near: int = RIGHT if shift > 0 else LEFT
+        far: int = 1 - near
+
+        if self.around[near] != 0:
+            self.around[near] -= 1
+            self.around[far] += 1
+        elif len(self.sides[near]) == 0 and self.symbol == self.blank:
+            self.around[far] += 1
+        else:
+            self.__push(far, self.symbol, self.around[far] + 1)
+            self.__enter(near)
+
+    def sweep(self, symbol: int, shift: int) -> Optional[int]:
+        """
+        Writes the symbol into every cell from the head to the end of the current block
+            and moves the head to the first cell after them
+        :param symbol: Code of the written symbol
+        :param shift: -1 to sweep to the left, 1 to sweep to the right
+        :return: The number of crossed cells, None if the sweep runs into the endless blank part of the tape
+        """
+
+        near: int = RIGHT if shift > 0 else LEFT
+        far: int = 1 - near
+
+        if len(self.sides[near]) == 0 and self.symbol == self.blank:
+            return None
+
+        crossed: int = self.around[near] + 1
+        self.__push(far, self.symbol, self.around[far])
+        self.__push(far, symbol, crossed)
+        self.__enter(near)
+
+        return crossed
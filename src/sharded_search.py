@@ -0,0 +1,263 @@
+""" Grammar search sharded over worker processes module """
+
+import itertools
+import multiprocessing
+import os
+import zlib
+from array import array
+from multiprocessing.connection import Connection
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from pyformlang import cfg
+
+from src.budget import Budget
+from src.budget import Meter
+from src.budget import Outcome
+from src.budget import Verdict
+from src.frontier import Frontier
+from src.head_index import Sentence
+from src.my_production import Production
+
+BATCH: int = 256
+SLACK: int = 1
+
+Discovery = Tuple[Sentence, Sentence, int, int]
+
+
+def _shard(sentence: Sentence, shards: int) -> int:
+    """
+    Returns the index of the shard owning the sentence, the same in every process
+    :param sentence: Sentence of symbol codes
+    :param shards: The number of shards
+    :return: Index of the shard
+    """
+
+    data = sentence if isinstance(sentence, bytes) else array('L', sentence).tobytes()
+    return zlib.crc32(data) % shards
+
+
+def _serve(grammar, target: Sentence, shard: int, shards: int, connection: Connection, accepted):
+    """
+    Runs one shard of the search in a worker process
+    The worker owns the parent pointers of the sentences of its shard and answers the requests:
+        ('round', discoveries, quota, limit) --- visits the discovered sentences of the shard,
+            expands at most quota pending ones with at most limit nonterminals and replies with
+            ('done', discoveries per shard, expanded, pending, nonterminals of the first pending one, found,
+            whether a popped sentence of terminals is longer than the target)
+        ('parent', sentence) --- replies with the parent pointer of the sentence of the shard
+        ('stop',) --- ends the worker
+    :param grammar: The CompiledGrammar
+    :param target: Sentence of terminal codes
+    :param shard: Index of the shard
+    :param shards: The number of shards
+    :param connection: End of the pipe to the coordinator
+    :param accepted: Event set by the worker which discovers the target
+    :return: None
+    """
+
+    productions = grammar.productions
+    matcher = grammar.matcher
+    max_length, limits, adds_terminals = grammar.bounds([target])
+
+    parent: Dict[Sentence, Optional[Tuple[Sentence, int]]] = dict()
+    queue: Frontier = Frontier()
+
+    while True:
+        request = connection.recv()
+
+        if request[0] == 'stop':
+            break
+
+        if request[0] == 'parent':
+            connection.send(parent[request[1]])
+            continue
+
+        _, discoveries, quota, limit = request
+        found: bool = False
+        longer: bool = False
+        outgoing: List[Dict[Sentence, Discovery]] = [dict() for _ in range(shards)]
+
+        for sentence, origin, index, nonterminals in discoveries:
+            if sentence not in parent:
+                parent[sentence] = None if index < 0 else (origin, index)
+                found = found or sentence == target
+                queue.push(sentence, nonterminals)
+
+        expanded: int = 0
+        while not found and not longer and expanded < quota and len(queue) != 0 and queue.heap[0][0] <= limit \
+                and not accepted.is_set():
+            sentence, nonterminals = queue.pop()
+            expanded += 1
+            if nonterminals == 0 and len(sentence) > len(target):
+                longer = True
+                break
+
+            for index, i in matcher.matches(sentence):
+                head, body, delta = productions[index]
+                new_sentence: Sentence = sentence[:i] + body + sentence[i + len(head):]
+                if max_length is not None and len(new_sentence) > max_length:
+                    continue
+                if adds_terminals[index] and any(new_sentence.count(symbol) > count for symbol, count in limits):
+                    continue
+                owner: int = _shard(new_sentence, shards)
+                if owner != shard:
+                    if new_sentence not in outgoing[owner]:
+                        outgoing[owner][new_sentence] = (new_sentence, sentence, index, nonterminals + delta)
+                elif new_sentence not in parent:
+                    parent[new_sentence] = (sentence, index)
+                    found = found or new_sentence == target
+                    queue.push(new_sentence, nonterminals + delta)
+
+        if found:
+            accepted.set()
+        first: Optional[int] = queue.heap[0][0] if len(queue) != 0 else None
+        connection.send((
+            'done', [list(x.values()) for x in outgoing], expanded, len(queue), first, found, longer
+        ))
+
+    connection.close()
+
+
+class ShardedSearch:
+    """ Class searching for a derivation with the sentences hash-partitioned over worker processes
+        Every worker owns the parent pointers of one shard and expands its sentences
+        in the order of the forward search, discovered sentences of other shards
+        are exchanged in batches through the coordinator once a round
+        A round expands only sentences with at most SLACK more nonterminals than the fewest pending in any shard,
+        so the shards together keep close to the order of the forward search
+        without a round for every sentence whose child with fewer nonterminals belongs to another shard
+        Every round is a round trip to every worker and a discovered sentence crosses two pipes,
+        so sharding pays off only when the sentences of a search do not fit the memory of one process
+        or the shards run on separate processors and expanding a sentence costs more than sending it,
+        on a single processor the forward search is several times faster """
+
+    def __init__(self, grammar, workers: Optional[int] = None):
+        """
+        Constructor of ShardedSearch instance
+        :param grammar: The CompiledGrammar to search
+        :param workers: The number of worker processes, the number of processors if None
+        """
+
+        self.grammar = grammar
+        self.workers: int = workers or os.cpu_count() or 1
+
+    def run(self, target: Sentence, budget: Budget) -> Outcome:
+        """
+        Searches for a derivation of the target from the start sentence
+        A round expands at most BATCH sentences of every shard,
+            the search ends in the round a worker discovers the target, the workers stop
+            expanding as soon as the accepted flag is set
+        The target is rejected in the round a worker pops a sentence of terminals longer than the target,
+            as the forward search does, or when no sentence is left
+        :param target: Sentence of terminal codes
+        :param budget: Limits of the search, a step is an expansion of a sentence
+        :return: Outcome of the search
+        """
+
+        grammar = self.grammar
+        shards: int = self.workers
+
+        accepted = multiprocessing.Event()
+        connections: List[Connection] = list()
+        processes: List[multiprocessing.Process] = list()
+        for shard in range(shards):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve
+                , args=(grammar, target, shard, shards, child, accepted)
+                , daemon=True
+            )
+            process.start()
+            child.close()
+            connections.append(connection)
+            processes.append(process)
+
+        try:
+            incoming: List[List[Discovery]] = [list() for _ in range(shards)]
+            incoming[_shard(grammar.start, shards)].append(
+                (grammar.start, grammar.start, -1, grammar.nonterminals(grammar.start))
+            )
+
+            heads: List[Optional[int]] = [None] * shards
+
+            meter: Meter = budget.start()
+            steps: int = 0
+            checkpoint: int = meter.next_check(steps)
+
+            while True:
+                limit: int = min(itertools.chain(
+                    (x for x in heads if x is not None)
+                    , (x[3] for discoveries in incoming for x in discoveries)
+                ))
+                for connection, discoveries in zip(connections, incoming):
+                    connection.send(('round', discoveries, BATCH, limit + SLACK))
+
+                incoming = [list() for _ in range(shards)]
+                found: bool = False
+                longer: bool = False
+                pending: int = 0
+                for shard, connection in enumerate(connections):
+                    _, outgoing, expanded, queued, heads[shard], found_here, longer_here = connection.recv()
+                    for owner, discoveries in enumerate(outgoing):
+                        incoming[owner].extend(discoveries)
+                    steps += expanded
+                    pending += queued
+                    found = found or found_here
+                    longer = longer or longer_here
+
+                if found:
+                    return Outcome(Verdict.ACCEPT, steps, self.__derivation(connections, target))
+                if longer:
+                    return Outcome(Verdict.REJECT, steps)
+
+                exchanged: int = sum(len(x) for x in incoming)
+                if pending == 0 and exchanged == 0:
+                    return Outcome(Verdict.REJECT, steps)
+
+                if steps >= checkpoint:
+                    if meter.exhausted(steps, pending + exchanged):
+                        return Outcome(Verdict.UNKNOWN, steps)
+                    checkpoint = meter.next_check(steps)
+        finally:
+            for connection in connections:
+                try:
+                    connection.send(('stop',))
+                except (BrokenPipeError, OSError):
+                    pass
+                connection.close()
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+
+    def __derivation(
+            self
+            , connections: List[Connection]
+            , sentence: Sentence
+    ) -> Tuple[List[Production], List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]]]:
+        """
+        Rebuilds the derivation of the sentence asking the owners of its ancestors for their parent pointers
+        :param connections: Pipes to the workers, one per shard
+        :param sentence: The derived sentence
+        :return: Tuple(used productions, decoded sentences from the start one to the derived one)
+        """
+
+        grammar = self.grammar
+        productions: List[Production] = list()
+        sentences: List[Tuple[Union[cfg.Variable, cfg.Terminal], ...]] = [grammar.decode(sentence)]
+        while True:
+            connection = connections[_shard(sentence, len(connections))]
+            connection.send(('parent', sentence))
+            pointer: Optional[Tuple[Sentence, int]] = connection.recv()
+            if pointer is None:
+                break
+            sentence, index = pointer
+            productions.append(grammar.source[index])
+            sentences.append(grammar.decode(sentence))
+        productions.reverse()
+        sentences.reverse()
+        return productions, sentences
@@ -0,0 +1,170 @@
+""" Priority queue of sentences spilling to disk for the grammar search module """
+
+import heapq
+import mmap
+import os
+import pathlib
+import pickle
+import struct
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from src.frontier import Frontier
+
+ENTRY = struct.Struct('<qqqBI')
+MAX_RUNS: int = 64
+
+
+class _Run:
+    """ Class reading a memory-mapped file of Frontier entries sorted by their order """
+
+    def __init__(self, path: pathlib.Path, entries: Iterable[Tuple[int, int, int, Sequence]]):
+        """
+        Constructor of _Run instance, writes the entries to the file and maps it
+        offset - offset of the first unread entry
+        head - the first unread entry, None if every entry is read
+        :param path: Path to the run file
+        :param entries: Frontier entries in ascending order
+        """
+
+        with open(path, 'wb') as output_file:
+            for nonterminals, terminals, order, sentence in entries:
+                kind: int = 0 if isinstance(sentence, bytes) else 1
+                data: bytes = sentence if kind == 0 else pickle.dumps(sentence)
+                output_file.write(ENTRY.pack(nonterminals, terminals, order, kind, len(data)) + data)
+
+        self.path: pathlib.Path = path
+        self.file = open(path, 'rb')
+        self.map: mmap.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offset: int = 0
+        self.head: Optional[Tuple[int, int, int, Sequence]] = None
+        self.advance()
+
+    def advance(self):
+        """
+        Reads the next entry to head
+        :return: None
+        """
+
+        if self.offset == len(self.map):
+            self.head = None
+            return
+        nonterminals, terminals, order, kind, size = ENTRY.unpack_from(self.map, self.offset)
+        self.offset += ENTRY.size
+        data: bytes = self.map[self.offset:self.offset + size]
+        self.offset += size
+        self.head = (nonterminals, terminals, order, data if kind == 0 else pickle.loads(data))
+
+    def entries(self) -> Iterator[Tuple[int, int, int, Sequence]]:
+        """
+        Yields the unread entries
+        :return: Iterator of entries in ascending order
+        """
+
+        while self.head is not None:
+            yield self.head
+            self.advance()
+
+    def close(self):
+        """
+        Closes and removes the run file
+        :return: None
+        """
+
+        self.map.close()
+        self.file.close()
+        os.remove(self.path)
+
+
+class SpillingFrontier(Frontier):
+    """ Class representing the pending sentences of the grammar search
+        with at most capacity sentences in memory
+        When the heap overflows, its later half is sorted and written to a memory-mapped run file,
+        more than MAX_RUNS runs are merged into one,
+        sentences are popped from the merge of the heap and the heads of the runs,
+        so the order is the order of Frontier """
+
+    def __init__(self, directory: pathlib.Path, capacity: int = 1 << 16):
+        """
+        Constructor of SpillingFrontier instance
+        runs - heap of (head entry, run number, _Run) of the runs with unread entries
+        spilled - the number of unread entries of the runs
+        written - the number of run files written
+        :param directory: Directory of the run files
+        :param capacity: The maximum number of sentences in memory
+        """
+
+        super().__init__()
+        self.directory: pathlib.Path = directory
+        self.capacity: int = capacity
+        self.runs: List[Tuple[Tuple[int, int, int, Sequence], int, _Run]] = list()
+        self.spilled: int = 0
+        self.written: int = 0
+
+    def __len__(self) -> int:
+        return len(self.heap) + self.spilled
+
+    def push(self, sentence: Sequence, nonterminals: int):
+        """
+        Adds the sentence to the SpillingFrontier
+        :param sentence: The sentence
+        :param nonterminals: The number of nonterminals in the sentence
+        :return: None
+        """
+
+        super().push(sentence, nonterminals)
+        if len(self.heap) > self.capacity:
+            self.heap.sort()
+            half: int = len(self.heap) // 2
+            run = _Run(self.directory / f'run{self.written}.bin', self.heap[half:])
+            self.spilled += len(self.heap) - half
+            del self.heap[half:]
+            heapq.heappush(self.runs, (run.head, self.written, run))
+            self.written += 1
+            if len(self.runs) > MAX_RUNS:
+                self.__merge()
+
+    def __merge(self):
+        """
+        Merges all runs into one run file
+        :return: None
+        """
+
+        runs: List[_Run] = [run for _, _, run in self.runs]
+        merged = _Run(self.directory / f'run{self.written}.bin', heapq.merge(*(run.entries() for run in runs)))
+        for run in runs:
+            run.close()
+        self.runs = [(merged.head, self.written, merged)]
+        self.written += 1
+
+    def pop(self) -> Tuple[Sequence, int]:
+        """
+        Removes the first sentence from the SpillingFrontier
+        :return: Tuple(sentence, number of nonterminals in it)
+        """
+
+        if len(self.runs) != 0 and (len(self.heap) == 0 or self.runs[0][0] < self.heap[0]):
+            entry, number, run = heapq.heappop(self.runs)
+            run.advance()
+            if run.head is not None:
+                heapq.heappush(self.runs, (run.head, number, run))
+            else:
+                run.close()
+            self.spilled -= 1
+            return entry[3], entry[0]
+        return super().pop()
+
+    def close(self):
+        """
+        Closes and removes the run files
+        :return: None
+        """
+
+        for _, _, run in self.runs:
+            run.close()
+        self.runs.clear()
+        self.spilled = 0
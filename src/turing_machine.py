@@ -1,16 +1,40 @@
 """ Turing Machine module """
 
-import time
+import contextlib
+import functools
 from collections import deque
+from typing import Callable
 from typing import Dict, Deque
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Sequence
 from typing import Set
 from typing import Tuple
 
+from src.budget import Budget
+from src.budget import Meter
+from src.budget import Outcome
+from src.budget import Verdict
+from src.checkpoint import Checkpoint
+from src.checkpoint import CheckpointWriter
+from src.compiled_turing_machine import CompiledTuringMachine
+from src.compiled_turing_machine import SHIFTS
+from src.lockstep import LockstepSimulator
+from src.parallel import run_many
+from src.zipper_tape import StackPool
+from src.zipper_tape import ZipperTape
+
+DEFAULT_BUDGET: Budget = Budget(max_time=9 * 60)
+
+ENGINES: Tuple[str, ...] = ('auto', 'compiled', 'run_length', 'bfs')
+
 
 class TuringMachine:
     """ Class representing a possibly non-deterministic Turing Machine """
 
+    ENGINES: Tuple[str, ...] = ENGINES
+
     def __init__(self):
         self.init_state: str = ''
         self.states: Set[str] = set()
@@ -19,57 +43,396 @@ class TuringMachine:
         self.gamma: Set[str] = set()
         self.transitions: Dict[Tuple[str, str], Set[Tuple[str, str, str]]] = dict()
 
-    def accepts(self, word: List[str]) -> bool:
+    def is_deterministic(self) -> bool:
+        """
+        Returns whether the Turing Machine has at most one transition for every (state, symbol)
+        :return: Boolean value - True if Turing Machine is deterministic, else False
+        """
+
+        return all(len(x) <= 1 for x in self.transitions.values())
+
+    def compile(self) -> CompiledTuringMachine:
+        """
+        Compiles the deterministic Turing Machine to integer-coded tables
+        :return: CompiledTuringMachine instance
+        """
+
+        if not self.is_deterministic():
+            raise ValueError('Only a deterministic Turing Machine can be compiled')
+
+        return CompiledTuringMachine(self)
+
+    def accepts(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , max_visited: Optional[int] = None
+            , engine: str = 'auto'
+            , detect_loops: bool = False
+            , checkpoint: Optional[str] = None
+            , checkpoint_every: Optional[float] = None
+            , resume_from: Optional[str] = None
+    ) -> bool:
         """
         Returns whether the Turing Machine accepts the given word
-        Perceives a Turing Machine as non-deterministic
-        :param word: List of variables from sigma
+        :param word: Sequence of variables from sigma
+        :param budget: Limits of the run, the word is considered rejected if they are exceeded
+        :param max_visited: The maximum number of configurations remembered
+            by the non-deterministic search, unlimited if None
+        :param engine: Simulation engine, one of ENGINES
+        :param detect_loops: Whether a deterministic run is rejected as soon as it is found to loop
+        :param checkpoint: Path to the file the run is saved to, not saved if None
+        :param checkpoint_every: Seconds between two saves of the run
+        :param resume_from: Path to the file of a saved run on the word to continue
         :return: Boolean value - if Turing Machine accepts word then True, else False
         """
 
-        if len(word) == 0:
-            word.append('_')
+        return self.run(
+            word
+            , budget
+            , max_visited
+            , engine
+            , detect_loops
+            , checkpoint
+            , checkpoint_every
+            , resume_from
+        ).verdict is Verdict.ACCEPT
 
-        queue: Deque[Tuple[List[str], int, str, str]] = \
-            deque([(word[:], 0, self.init_state[:], word[0][:])])
+    def accepts_many(
+            self
+            , words: Sequence[Sequence[str]]
+            , workers: Optional[int] = None
+            , budget: Optional[Budget] = None
+            , max_visited: Optional[int] = None
+            , engine: str = 'auto'
+            , detect_loops: bool = False
+    ) -> Iterator[Tuple[Sequence[str], bool]]:
+        """
+        Checks whether the Turing Machine accepts every given word using a pool of worker processes
+        The Turing Machine is compiled once and sent to every worker once,
+            longer words are scheduled first
+        The lockstep engine instead runs a deterministic Turing Machine on all words at once
+            in the calling process with vectorized NumPy steps, so it takes no workers
+            and its budget limits the whole batch, not every word
+        :param words: Sequences of variables from sigma
+        :param workers: The number of worker processes, the number of processors if None,
+            must be None for the lockstep engine
+        :param budget: Limits of every run, the word is considered rejected if they are exceeded,
+            limits of the whole simulation for the lockstep engine, the words still running are rejected
+        :param max_visited: The maximum number of configurations remembered
+            by the non-deterministic search, unlimited if None
+        :param engine: Simulation engine, one of ENGINES or lockstep
+        :param detect_loops: Whether a deterministic run is rejected as soon as it is found to loop
+        :return: Iterator of Tuple(word, whether Turing Machine accepts it) in the order of completion
+        """
 
-        start: float = time.time()
+        if engine == 'lockstep':
+            if workers is not None:
+                raise ValueError('The lockstep engine runs in the calling process, it takes no workers')
+            simulator = LockstepSimulator(self.compile())
+            for i, outcome in simulator.run(words, budget or DEFAULT_BUDGET):
+                yield words[i], outcome.verdict is Verdict.ACCEPT
+            return
 
-        while len(queue) != 0:
-            if time.time() - start >= 9 * 60:
-                return False
+        runner = self._runner(budget, max_visited, engine, detect_loops)
+        for word, outcome in run_many(runner, words, workers):
+            yield word, outcome.verdict is Verdict.ACCEPT
+
+    def _runner(
+            self
+            , budget: Optional[Budget]
+            , max_visited: Optional[int]
+            , engine: str
+            , detect_loops: bool
+    ) -> Callable[[Sequence[str]], Outcome]:
+        """
+        Returns a picklable callable which runs the Turing Machine on a word
+        :param budget: Limits of every run
+        :param max_visited: The maximum number of configurations remembered by the non-deterministic search
+        :param engine: Simulation engine, one of ENGINES
+        :param detect_loops: Whether a deterministic run is stopped as soon as it is found to loop
+        :return: Callable from a word to Outcome of the run
+        """
+
+        if engine in ('auto', 'compiled') and self.is_deterministic():
+            return functools.partial(
+                self.compile().run
+                , budget=budget or DEFAULT_BUDGET
+                , detect_loops=detect_loops
+            )
+
+        return functools.partial(
+            self.run
+            , budget=budget
+            , max_visited=max_visited
+            , engine=engine
+            , detect_loops=detect_loops
+        )
+
+    def run(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+            , max_visited: Optional[int] = None
+            , engine: str = 'auto'
+            , detect_loops: bool = False
+            , checkpoint: Optional[str] = None
+            , checkpoint_every: Optional[float] = None
+            , resume_from: Optional[str] = None
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word
+        Engines:
+            auto --- compiled if the Turing Machine is deterministic, else bfs
+            compiled --- deterministic run on one mutable tape
+            run_length --- deterministic run on a run-length encoded tape
+                with sweeps over blocks of equal symbols done in one macro-step
+            bfs --- breadth-first search over configurations
+        A run of compiled or bfs engines can be saved to a checkpoint file
+            every checkpoint_every seconds, when the budget is exceeded and on SIGTERM,
+            a run stopped by SIGTERM is unknown, and continued later from the file
+        :param word: Sequence of variables from sigma
+        :param budget: Limits of the run, nine minutes of wall time if None,
+            steps of a continued run are counted from its very start
+        :param max_visited: The maximum number of configurations remembered
+            by the non-deterministic search, unlimited if None
+        :param engine: Simulation engine, one of ENGINES
+        :param detect_loops: Whether a deterministic run is stopped as soon as it is found to loop,
+            the bfs engine never expands a configuration twice, so it stops on a loop anyway
+        :param checkpoint: Path to the file the run is saved to, not saved if None
+        :param checkpoint_every: Seconds between two saves of the run,
+            only on SIGTERM and when the budget is exceeded if None
+        :param resume_from: Path to the file of a saved run on the word to continue, may equal checkpoint
+        :return: Outcome of the run
+        """
+
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown engine {engine}, expected one of {", ".join(self.ENGINES)}')
+
+        if budget is None:
+            budget = DEFAULT_BUDGET
+
+        if engine == 'auto':
+            engine = 'compiled' if self.is_deterministic() else 'bfs'
+
+        if engine == 'run_length':
+            if checkpoint is not None or resume_from is not None:
+                raise ValueError('The run_length engine can not save and continue runs')
+            return self.compile().run_run_length(word, budget, detect_loops)
+
+        resume: Optional[Checkpoint] = None if resume_from is None else Checkpoint.from_file(resume_from)
+
+        with contextlib.nullcontext() if checkpoint is None \
+                else CheckpointWriter(checkpoint, checkpoint_every) as writer:
+            return self._run_engine(engine, word, budget, max_visited, detect_loops, writer, resume)
+
+    def _run_engine(
+            self
+            , engine: str
+            , word: Sequence[str]
+            , budget: Budget
+            , max_visited: Optional[int]
+            , detect_loops: bool
+            , writer: Optional[CheckpointWriter]
+            , resume: Optional[Checkpoint]
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word with an engine which saves and continues runs
+        :param engine: compiled or bfs
+        :param word: Sequence of variables from sigma
+        :param budget: Limits of the run
+        :param max_visited: The maximum number of configurations remembered by the non-deterministic search
+        :param detect_loops: Whether a deterministic run is stopped as soon as it is found to loop
+        :param writer: Saves the Checkpoint of the run, not saved if None
+        :param resume: Checkpoint of the run to continue from, the run starts afresh if None
+        :return: Outcome of the run
+        """
+
+        if engine == 'compiled':
+            return self.compile().run(word, budget, detect_loops, writer, resume)
+
+        return self.__run_nondeterministic(word, budget, max_visited, writer, resume)
+
+    def __run_nondeterministic(
+            self
+            , word: Sequence[str]
+            , budget: Budget
+            , max_visited: Optional[int] = None
+            , writer: Optional[CheckpointWriter] = None
+            , resume: Optional[Checkpoint] = None
+    ) -> Outcome:
+        """
+        Runs the Turing Machine on the given word
+        Perceives a Turing Machine as non-deterministic
+        Configurations are kept as (state, zipper tape),
+            branches share the unchanged part of their tapes
+            and every configuration reachable by several paths is expanded once
+        The Checkpoint of the run holds its frontier only,
+            so a continued run may expand again configurations expanded before the save
+        :param word: Sequence of variables from sigma
+        :param budget: Limits of the run, a step is an expansion of a configuration
+        :param max_visited: The maximum number of remembered configurations, unlimited if None
+        :param writer: Saves the Checkpoint of the run when it is due and when the budget is exceeded
+        :param resume: Checkpoint of the run on the word to continue from, the run starts afresh if None
+        :return: Outcome of the run
+        """
+
+        symbols: List[str] = sorted(self.gamma | {'_'} | set(word) | {
+            x for _, x in self.transitions
+        } | {
+            x for moves in self.transitions.values() for _, x, _ in moves
+        } | {
+            x for _, cells, _ in (resume.configurations if resume is not None else []) for x in cells
+        })
+        codes: Dict[str, int] = {x: i for i, x in enumerate(symbols)}
+
+        transitions: Dict[Tuple[str, int], List[Tuple[str, int, int]]] = {
+            (cur_state, codes[cur_symbol]): [
+                (next_state, codes[next_symbol], SHIFTS.get(shift, 0))
+                for next_state, next_symbol, shift in moves
+            ]
+            for (cur_state, cur_symbol), moves in self.transitions.items()
+        }
 
-            cur_word, cur_pos, cur_state, cur_symbol = queue.popleft()
+        pool: StackPool = StackPool(codes['_'])
+        tape: ZipperTape = ZipperTape.from_word(pool, [codes[x] for x in word])
+        queue: Deque[Tuple[str, ZipperTape]] = deque([(self.init_state, tape)])
+        steps: int = 0
 
-            if cur_state in self.accept_states:
-                if (cur_state, cur_symbol) not in self.transitions or \
-                        len(self.transitions[(cur_state, cur_symbol)]) == 0:
-                    return True
+        if resume is not None:
+            if resume.word != list(word):
+                raise ValueError('Checkpoint was saved by a run on another word')
+            queue = deque(
+                (state, ZipperTape.from_cells(pool, [codes[x] for x in cells], pos))
+                for state, cells, pos in resume.configurations
+            )
+            steps = resume.steps
+
+        visited: Set[Tuple[str, int, int, int]] = {(state, *tape.key()) for state, tape in queue}
+
+        meter: Meter = budget.start()
+        checkpoint: int = meter.next_check(steps)
+
+        while len(queue) != 0:
+            cur_state, cur_tape = queue.popleft()
+            moves = transitions.get((cur_state, cur_tape.symbol))
 
-            if (cur_state, cur_symbol) not in self.transitions:
+            if not moves:
+                if cur_state in self.accept_states:
+                    return Outcome(Verdict.ACCEPT, steps)
                 continue
 
-            for next_state, next_symbol, shift in self.transitions[(cur_state, cur_symbol)]:
-                new_word: List[str] = \
-                    [x if i != cur_pos else next_symbol[:] for i, x in enumerate(cur_word)]
-                new_pos: int = cur_pos
+            if steps >= checkpoint:
+                if meter.exhausted(steps, len(queue) + 1):
+                    if writer is not None:
+                        queue.appendleft((cur_state, cur_tape))
+                        writer.save(self.__save(word, symbols, queue, steps))
+                    return Outcome(Verdict.UNKNOWN, steps)
+                if writer is not None and writer.due():
+                    queue.appendleft((cur_state, cur_tape))
+                    writer.save(self.__save(word, symbols, queue, steps))
+                    if writer.stopped:
+                        return Outcome(Verdict.UNKNOWN, steps)
+                    queue.popleft()
+                checkpoint = meter.next_check(steps)
+            steps += 1
+
+            for next_state, next_symbol, shift in moves:
+                new_tape: ZipperTape = cur_tape.write_move(next_symbol, shift)
+
+                configuration = (next_state, new_tape.left, new_tape.symbol, new_tape.right)
+                if configuration in visited:
+                    continue
+                if max_visited is None or len(visited) < max_visited:
+                    visited.add(configuration)
+
+                queue.append((next_state, new_tape))
+
+        return Outcome(Verdict.REJECT, steps)
+
+    @staticmethod
+    def __save(
+            word: Sequence[str]
+            , symbols: List[str]
+            , queue: Deque[Tuple[str, ZipperTape]]
+            , steps: int
+    ) -> Checkpoint:
+        """
+        Returns the Checkpoint of a non-deterministic run with the given frontier
+        :param word: Sequence of variables from sigma the run was started on
+        :param symbols: List of tape symbols, the index of a symbol is its code
+        :param queue: Frontier of the run
+        :param steps: The number of steps done
+        :return: Checkpoint instance
+        """
+
+        configurations: List[Tuple[str, List[str], int]] = list()
+        for state, tape in queue:
+            cells, pos = tape.cells()
+            configurations.append((state, [symbols[x] for x in cells], pos))
+        return Checkpoint(list(word), steps, configurations)
+
+    def computation(
+            self
+            , word: Sequence[str]
+            , budget: Optional[Budget] = None
+    ) -> Tuple[Verdict, List[Tuple[int, str, str, str, str, str]]]:
+        """
+        Runs the deterministic Turing Machine on the given word recording every move,
+            the run stops as soon as an accepting state is entered
+        :param word: Sequence of variables from sigma
+        :param budget: Limits of the run, DEFAULT_BUDGET if None
+        :return: Tuple(ACCEPT if an accepting state is entered, REJECT if the machine halts before,
+            UNKNOWN if the limits are exceeded
+            , moves (head position, state, read symbol, next state, written symbol, shift)),
+            the first symbol of the word is at position 0
+        """
+
+        if not self.is_deterministic():
+            raise ValueError('Only the computation of a deterministic Turing Machine is recorded')
+
+        meter: Meter = (budget or DEFAULT_BUDGET).start()
+        checkpoint: int = meter.next_check(0)
+
+        tape: Dict[int, str] = dict(enumerate(word))
+        pos: int = 0
+        state: str = self.init_state
+        moves: List[Tuple[int, str, str, str, str, str]] = list()
 
-                if (shift == '<') and (new_pos == 0):
-                    new_word = ['_'] + new_word
-                elif (shift == '>') and (new_pos == len(new_word) - 1):
-                    new_word = new_word + ['_']
-                    new_pos += 1
-                elif shift == '<':
-                    new_pos -= 1
-                elif shift == '>':
-                    new_pos += 1
+        while state not in self.accept_states:
+            symbol: str = tape.get(pos, '_')
+            options = self.transitions.get((state, symbol))
+            if not options:
+                return Verdict.REJECT, moves
+            if len(moves) >= checkpoint:
+                if meter.exhausted(len(moves), 1):
+                    return Verdict.UNKNOWN, moves
+                checkpoint = meter.next_check(len(moves))
+            next_state, next_symbol, shift = next(iter(options))
+            moves.append((pos, state, symbol, next_state, next_symbol, shift))
+            tape[pos] = next_symbol
+            pos += SHIFTS.get(shift, 0)
+            state = next_state
 
-                new_state: str = next_state[:]
-                new_symbol: str = new_word[new_pos][:]
+        return Verdict.ACCEPT, moves
 
-                queue.append((new_word, new_pos, new_state, new_symbol))
+    def to_lines(self) -> List[str]:
+        """
+        Returns the Turing Machine in the format of from_txt
+        :return: List of lines without line breaks
+        """
 
-        return False
+        lines: List[str] = [
+            f'init: {self.init_state}'
+            , f'accept: {" ".join(sorted(self.accept_states))}'
+            , f'sigma: {{{",".join(sorted(self.sigma))}}}'
+            , f'gamma: {{{",".join(sorted(self.gamma))}}}'
+            , ''
+        ]
+        for (cur_state, cur_symbol), moves in self.transitions.items():
+            for next_state, next_symbol, shift in sorted(moves):
+                lines.extend([f'{cur_state},{cur_symbol}', f'{next_state},{next_symbol},{shift}', ''])
+        return lines
 
     @classmethod
     def from_txt(cls, path):
@@ -82,57 +445,65 @@ class TuringMachine:
             at fourth line --- set of tape symbols
             Other lines contain the transition function of the Turing Machine
             , one transition per two lines
+            , a repeated (state, symbol) pair adds a non-deterministic choice
         :param path: The path to the txt file with a Turing Machine
         :return: Turing Machine instance
         """
 
-        turing_machine = TuringMachine()
-
         with open(path, 'r') as input_file:
-            turing_machine.init_state = \
-                input_file \
-                    .readline() \
-                    .replace('init: ', '') \
-                    .strip()
-
-            turing_machine.accept_states = set(
-                input_file
-                    .readline()
-                    .replace('accept: ', '')
-                    .strip()
-                    .split()
-            )
+            return cls.from_lines(input_file.readlines())
 
-            turing_machine.sigma = set(
-                input_file
-                    .readline()
-                    .replace('sigma: {', '')
-                    .replace('}', '')
-                    .strip()
-                    .split(',')
-            )
+    @classmethod
+    def from_lines(cls, lines: Sequence[str]):
+        """
+        Reads Turing Machine from the lines of the format of from_txt
+        :param lines: Lines of a txt file with a Turing Machine
+        :return: Turing Machine instance
+        """
 
-            turing_machine.gamma = set(
-                input_file
-                    .readline()
-                    .replace('gamma: {', '')
-                    .replace('}', '')
-                    .strip()
-                    .split(',')
-            )
+        turing_machine = cls()
+
+        turing_machine.init_state = \
+            lines[0] \
+                .replace('init: ', '') \
+                .strip()
+
+        turing_machine.accept_states = set(
+            lines[1]
+                .replace('accept: ', '')
+                .strip()
+                .split()
+        )
+
+        turing_machine.sigma = set(
+            lines[2]
+                .replace('sigma: {', '')
+                .replace('}', '')
+                .strip()
+                .split(',')
+        )
+
+        turing_machine.gamma = set(
+            lines[3]
+                .replace('gamma: {', '')
+                .replace('}', '')
+                .strip()
+                .split(',')
+        )
 
-            if not turing_machine.sigma.issubset(turing_machine.gamma):
-                turing_machine.gamma |= turing_machine.sigma
+        if not turing_machine.sigma.issubset(turing_machine.gamma):
+            turing_machine.gamma |= turing_machine.sigma
 
-            transitions = list(filter(lambda x: x != '\n', input_file.readlines()))
-            turing_machine.transitions = dict(map(
-                lambda p: (tuple(p[0].strip().split(',')), {tuple(p[1].strip().split(','))}),
-                zip(transitions[::2], transitions[1::2])
-            ))
+        transitions = list(filter(lambda x: x.strip() != '', lines[4:]))
+        for cur, nxt in zip(transitions[::2], transitions[1::2]):
+            turing_machine.transitions.setdefault(
+                tuple(cur.strip().split(','))
+                , set()
+            ).add(tuple(nxt.strip().split(',')))
 
-            for cur_state, cur_symbol in turing_machine.transitions:
-                turing_machine.states.add(cur_state)
-                for next_state, _, _ in turing_machine.transitions[(cur_state, cur_symbol)]:
-                    turing_machine.states.add(next_state)
+        for cur_state, cur_symbol in turing_machine.transitions:
+            turing_machine.states.add(cur_state)
+            for next_state, _, _ in turing_machine.transitions[(cur_state, cur_symbol)]:
+                turing_machine.states.add(next_state)
 
         return turing_machine
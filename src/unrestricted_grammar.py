@@ -1,11 +1,17 @@
 """ Unrestricted Grammar module """
 
 import itertools
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
 
 from pyformlang import cfg
 
+from src.compiled_turing_machine import SHIFTS
 from src.grammar import Grammar
 from src.my_production import Production
+from src.provenance import Provenance
 from src.turing_machine import TuringMachine
 
 
@@ -156,11 +162,103 @@ class UnrestrictedGrammar(Grammar):
                     (cfg.Terminal(sigma_symbol),)
                 ))
 
+    def _replay(
+            self
+            , word: str
+            , moves: List[Tuple[int, str, str, str, str, str]]
+    ) -> Optional[List[Tuple[Production, int]]]:
+        """
+        Builds the derivation of the word following the accepting computation of the Turing Machine
+            in the symbols of from_turing_machine before the optimizations
+        The tape is initialized with a blank cell for every cell visited outside the word,
+            the moves are simulated, then the word is restored sweeping the cells to the left
+            of the accepting state, then to the right of it, and the copies of the state are erased
+        :param word: Non-empty word accepted by the Turing Machine
+        :param moves: Moves of the computation from TuringMachine.computation
+        :return: List of (production, position of its head in the sentence), None if it is not built
+        """
+
+        if len(word) == 0 or any(move[5] not in SHIFTS for move in moves):
+            return None
+
+        visited: List[int] = [0, len(word) - 1]
+        for pos, _, _, _, _, shift in moves:
+            visited.extend([pos, pos + SHIFTS[shift]])
+        left: int = max(1, -min(visited))
+        right: int = max(1, max(visited) - len(word) + 1)
+
+        steps: List[Tuple[Production, int]] = list()
+        sentence: List[Union[cfg.Variable, cfg.Terminal]] = [cfg.Variable('S1')]
+
+        def _apply(
+                head: List[Union[cfg.Variable, cfg.Terminal]]
+                , body: List[Union[cfg.Variable, cfg.Terminal]]
+                , i: int
+        ):
+            steps.append((Production(tuple(head), tuple(body)), i))
+            sentence[i:i + len(head)] = body
+
+        cells: List[List[str]] = [['', '_'] for _ in range(left)] \
+            + [[x, x] for x in word] \
+            + [['', '_'] for _ in range(right)]
+
+        def _cell(k: int) -> cfg.Variable:
+            return cfg.Variable(f'[{cells[k][0]},{cells[k][1]}]')
+
+        blank = cfg.Variable('[,_]')
+        init_state: str = self.provenance.machine.init_state
+        _apply([cfg.Variable('S1')], [blank, cfg.Variable(init_state), cfg.Variable('S2'), blank], 0)
+        for k, sigma_symbol in enumerate(word):
+            _apply([cfg.Variable('S2')], [cfg.Variable(f'[{sigma_symbol},{sigma_symbol}]'), cfg.Variable('S2')], 2 + k)
+        _apply([cfg.Variable('S2')], [], 2 + len(word))
+        for _ in range(left - 1):
+            _apply([blank], [blank, blank], 0)
+        for _ in range(right - 1):
+            _apply([blank], [blank, blank], len(sentence) - 1)
+
+        for pos, cur_state, cur_symbol, next_state, next_symbol, shift in moves:
+            h: int = left + pos
+            cur: cfg.Variable = _cell(h)
+            cells[h][1] = next_symbol
+            if shift == '>':
+                _apply([cfg.Variable(cur_state), cur], [_cell(h), cfg.Variable(next_state)], h)
+            else:
+                _apply([_cell(h - 1), cfg.Variable(cur_state), cur], [cfg.Variable(next_state), _cell(h - 1), _cell(h)], h - 1)
+
+        h: int = left + (moves[-1][0] + SHIFTS[moves[-1][5]] if len(moves) != 0 else 0)
+        accept = cfg.Variable(moves[-1][3] if len(moves) != 0 else init_state)
+
+        for k in range(h - 1, -1, -1):
+            if cells[k][0] == '':
+                _apply([_cell(k), accept], [accept], k)
+            else:
+                _apply([_cell(k), accept], [accept, cfg.Terminal(cells[k][0]), accept], k)
+
+        r: int = len(sentence) - (len(cells) - h) - 1
+        for k in range(h, len(cells)):
+            if cells[k][0] == '':
+                _apply([accept, _cell(k)], [accept], r)
+            else:
+                _apply([accept, _cell(k)], [accept, cfg.Terminal(cells[k][0]), accept], r)
+                r += 2
+
+        while accept in sentence:
+            i: int = sentence.index(accept)
+            if i + 1 < len(sentence) and isinstance(sentence[i + 1], cfg.Terminal):
+                _apply([accept, sentence[i + 1]], [sentence[i + 1]], i)
+            elif i > 0 and isinstance(sentence[i - 1], cfg.Terminal):
+                _apply([sentence[i - 1], accept], [sentence[i - 1]], i - 1)
+            else:
+                return None
+
+        return steps
+
     @classmethod
-    def from_turing_machine(cls, turing_machine: TuringMachine):
+    def from_turing_machine(cls, turing_machine: TuringMachine, optimize: bool = True):
         """
         Build a Unrestricted Grammar by a Turing Machine
         :param turing_machine: The Turing Machine from which the Unrestricted Grammar is built
+        :param optimize: Whether useless productions and simple substitutions are removed
         :return: The Unrestricted Grammar builded by lba
         """
 
@@ -172,12 +270,13 @@ class UnrestrictedGrammar(Grammar):
 
         grammar.terminals = {cfg.Terminal(x) for x in turing_machine.sigma}
         grammar.start_symbol = cfg.Variable('S1')
+        grammar.provenance = Provenance(turing_machine)
 
         grammar = grammar.nonterminals_optimization()
 
-        while True:
+        while optimize:
             prev = len(grammar.productions)
-            grammar = grammar.deep_optimization(max_cnt=4)
+            grammar = grammar.useful_optimization()
             grammar = grammar.substitutions_optimization()
             if prev == len(grammar.productions):
                 break
@@ -0,0 +1,168 @@
+""" Two-stack zipper tape module """
+
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+EMPTY: int = 0
+
+
+class StackPool:
+    """ Class representing a pool of persistent stacks of tape symbols
+        A stack is an integer id of its top node, equal stacks have equal ids,
+        so stacks are shared between tapes and compared in O(1)
+        The empty stack stands for the endless blank part of the tape """
+
+    def __init__(self, blank: int):
+        """
+        Constructor of StackPool instance
+        nodes - list of (symbol, id of the rest of the stack) by node id, node 0 is the empty stack
+        ids - dictionary matching (symbol, id of the rest of the stack) to node id
+        :param blank: Code of the blank symbol
+        """
+
+        self.blank: int = blank
+        self.nodes: List[Tuple[int, int]] = [(blank, EMPTY)]
+        self.ids: Dict[Tuple[int, int], int] = dict()
+
+    def push(self, stack: int, symbol: int) -> int:
+        """
+        Returns the stack with the symbol put on top of the given stack
+        A blank put on the empty stack leaves it empty
+        :param stack: Id of the stack
+        :param symbol: Code of the symbol
+        :return: Id of the new stack
+        """
+
+        if stack == EMPTY and symbol == self.blank:
+            return EMPTY
+
+        node = (symbol, stack)
+        res = self.ids.get(node)
+        if res is None:
+            res = len(self.nodes)
+            self.ids[node] = res
+            self.nodes.append(node)
+        return res
+
+    def pop(self, stack: int) -> Tuple[int, int]:
+        """
+        Returns the top symbol and the rest of the given stack
+        The empty stack yields a blank and stays empty
+        :param stack: Id of the stack
+        :return: Tuple(code of the top symbol, id of the rest of the stack)
+        """
+
+        return self.nodes[stack]
+
+    def to_list(self, stack: int) -> List[int]:
+        """
+        Returns the symbols of the stack from its top to its bottom
+        :param stack: Id of the stack
+        :return: List of symbol codes
+        """
+
+        res: List[int] = list()
+        while stack != EMPTY:
+            symbol, stack = self.nodes[stack]
+            res.append(symbol)
+        return res
+
+
+class ZipperTape:
+    """ Class representing an immutable tape as the symbol under the head
+        and two persistent stacks with the symbols to the left and to the right of it
+        Reads, writes, moves and blank extension cost O(1),
+        tapes derived from one tape share all unchanged cells """
+
+    __slots__ = ('pool', 'left', 'symbol', 'right')
+
+    def __init__(self, pool: StackPool, left: int, symbol: int, right: int):
+        """
+        Constructor of ZipperTape instance
+        :param pool: Pool of the stacks
+        :param left: Id of the stack of symbols to the left of the head, nearest on top
+        :param symbol: Code of the symbol under the head
+        :param right: Id of the stack of symbols to the right of the head, nearest on top
+        """
+
+        self.pool: StackPool = pool
+        self.left: int = left
+        self.symbol: int = symbol
+        self.right: int = right
+
+    @classmethod
+    def from_word(cls, pool: StackPool, word: Sequence[int]):
+        """
+        Builds a tape with the given word, the head is on its first symbol
+        :param pool: Pool of the stacks
+        :param word: Codes of the word symbols
+        :return: ZipperTape instance
+        """
+
+        return cls.from_cells(pool, word, 0)
+
+    @classmethod
+    def from_cells(cls, pool: StackPool, cells: Sequence[int], pos: int):
+        """
+        Builds a tape with the given cells, the head is on the cell at the given position
+        :param pool: Pool of the stacks
+        :param cells: Codes of the symbols in the cells
+        :param pos: Index of the cell under the head, it may be out of the cells
+        :return: ZipperTape instance
+        """
+
+        left: int = EMPTY
+        right: int = EMPTY
+        for symbol in cells[:max(pos, 0)]:
+            left = pool.push(left, symbol)
+        for _ in range(len(cells), pos):
+            left = pool.push(left, pool.blank)
+        for symbol in reversed(cells[max(pos + 1, 0):]):
+            right = pool.push(right, symbol)
+        for _ in range(pos + 1, 0):
+            right = pool.push(right, pool.blank)
+        return cls(pool, left, cells[pos] if 0 <= pos < len(cells) else pool.blank, right)
+
+    def key(self) -> Tuple[int, int, int]:
+        """
+        Returns a hashable value equal for tapes with equal contents and head positions
+        :return: Tuple(left stack id, symbol under the head, right stack id)
+        """
+
+        return self.left, self.symbol, self.right
+
+    def write_move(self, symbol: int, shift: int):
+        """
+        Returns the tape with the symbol written under the head and the head moved
+        :param symbol: Code of the written symbol
+        :param shift: -1 to move left, 1 to move right, 0 to stay
+        :return: ZipperTape instance
+        """
+
+        pool = self.pool
+        if shift > 0:
+            next_symbol, right = pool.pop(self.right)
+            return ZipperTape(pool, pool.push(self.left, symbol), next_symbol, right)
+        if shift < 0:
+            next_symbol, left = pool.pop(self.left)
+            return ZipperTape(pool, left, next_symbol, pool.push(self.right, symbol))
+        return ZipperTape(pool, self.left, symbol, self.right)
+
+    def to_list(self) -> List[int]:
+        """
+        Returns the non-blank part of the tape with the cell under the head
+        :return: List of symbol codes
+        """
+
+        return self.cells()[0]
+
+    def cells(self) -> Tuple[List[int], int]:
+        """
+        Returns the non-blank part of the tape with the cell under the head and the head position in it
+        :return: Tuple(list of symbol codes, index of the cell under the head)
+        """
+
+        left: List[int] = self.pool.to_list(self.left)
+        return left[::-1] + [self.symbol] + self.pool.to_list(self.right), len(left)
@@ -1,6 +1,19 @@
 """ Context Sensitive Grammar Tests module """
 
+import multiprocessing
+import os
+
+import pytest
+from pyformlang import cfg
+
+from src.budget import Verdict
+from src.compiled_grammar import CompiledGrammar
 from src.context_sensitive_grammar import ContextSensitiveGrammar
+from src.lazy_context_sensitive_grammar import LazyContextSensitiveGrammar
+from src.linear_bounded_automaton import LinearBoundedAutomaton
+from src.my_production import Production
+from src import sharded_search
+from src.turing_machine import TuringMachine
 
 from src.utils import is_prime
 
@@ -18,3 +31,355 @@ def test_csg_manual(suite):
     word = suite['word']
 
     assert (grammar.accepts(word) != tuple()) == is_prime(len(word))
+
+
+def test_csg_accepts_many():
+    """
+    Checks that the batch check over worker processes agrees with the single word check
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+    words = ['a' * p for p in range(12)]
+
+    results = dict(grammar.accepts_many(words, workers=2))
+
+    assert {word: res != tuple() for word, res in results.items()} == {word: is_prime(len(word)) for word in words}
+
+
+def test_csg_bounded():
+    """
+    Checks that a non-contracting grammar is recognized at load time
+        and its search bounded by the word length ends with an exact verdict
+        in fewer steps than the unbounded one
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+    assert grammar.non_contracting
+
+    unbounded = CompiledGrammar(grammar)
+    for p in range(14, 24):
+        outcome = grammar.run('a' * p)
+        assert outcome.verdict is (Verdict.ACCEPT if is_prime(p) else Verdict.REJECT)
+        if p < 18:
+            assert outcome.steps <= unbounded.run('a' * p).steps
+
+
+def test_csg_bidirectional(suite):
+    """
+    Checks that the bidirectional search agrees with the forward one
+        and its joined derivation leads from the start symbol to the word
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the grammar
+        Dict['word'] - word generated by the grammar
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt(suite['path'])
+    word = suite['word']
+
+    res = grammar.accepts(word, search='bidirectional')
+
+    assert (res != tuple()) == is_prime(len(word))
+    if res != tuple():
+        productions, sentences = res
+        assert len(sentences) == len(productions) + 1
+        assert sentences[0] == (grammar.start_symbol,)
+        assert ''.join(x.value for x in sentences[-1]) == word
+
+
+@pytest.mark.parametrize('search', ['best_first', 'astar'])
+@pytest.mark.parametrize('heuristic', ['length', 'terminals', 'blocked'])
+def test_csg_informed(suite, search, heuristic):
+    """
+    Checks that informed searches of the bounded grammar agree with the forward one
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the grammar
+        Dict['word'] - word generated by the grammar
+    :param search: Search strategy
+    :param heuristic: Name of the heuristic
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt(suite['path'])
+    word = suite['word']
+
+    assert (grammar.accepts(word, search=search, heuristic=heuristic) != tuple()) == is_prime(len(word))
+
+
+@pytest.mark.parametrize('p', [7, 11, 13])
+def test_csg_astar(p):
+    """
+    Checks that the astar search with the default weight finds derivations of primes
+        in fewer steps than the forward one
+    :param p: A prime length of the word
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+
+    outcome = grammar.run('a' * p, search='astar', heuristic='length')
+
+    assert outcome.verdict is Verdict.ACCEPT
+    assert outcome.steps < grammar.run('a' * p).steps
+
+
+def test_csg_sharded(suite):
+    """
+    Checks that the search sharded over worker processes agrees with the forward one
+        and its derivation gathered from the shards leads from the start symbol to the word
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the grammar
+        Dict['word'] - word generated by the grammar
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt(suite['path'])
+    word = suite['word']
+
+    res = grammar.accepts(word, search='sharded', workers=3)
+
+    assert (res != tuple()) == is_prime(len(word))
+    if res != tuple():
+        productions, sentences = res
+        assert len(sentences) == len(productions) + 1
+        assert sentences[0] == (grammar.start_symbol,)
+        assert ''.join(x.value for x in sentences[-1]) == word
+
+
+def test_csg_sharded_dead_worker(monkeypatch):
+    """
+    Checks that the sharded search whose worker dies mid-search raises the error of the lost pipe
+        and still ends the other workers
+    :param monkeypatch: Fixture replacing the worker with one whose first shard exits in the first round
+    :return: None
+    """
+
+    serve = sharded_search._serve
+
+    def dying_serve(grammar, target, shard, shards, connection, accepted):
+        if shard == 0:
+            connection.recv()
+            os._exit(1)
+        serve(grammar, target, shard, shards, connection, accepted)
+
+    monkeypatch.setattr(sharded_search, '_serve', dying_serve)
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+
+    with pytest.raises(EOFError):
+        grammar.run('a' * 7, search='sharded', workers=3)
+
+    assert multiprocessing.active_children() == []
+
+
+def test_csg_accepts_many_sharded():
+    """
+    Checks that the batch check with the sharded search checks the words one by one and agrees with primality
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+    words = ['a' * p for p in range(8)]
+
+    results = list(grammar.accepts_many(words, workers=2, search='sharded'))
+
+    assert [word for word, _ in results] == words
+    assert all((res != tuple()) == is_prime(len(word)) for word, res in results)
+
+
+def test_csg_enumerate():
+    """
+    Checks that the enumeration yields exactly the words of prime lengths in the order of their lengths
+        with derivations leading from the start symbol to them
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+
+    res = list(grammar.enumerate(19))
+
+    assert [word for word, _ in res] == ['a' * p for p in range(20) if is_prime(p)]
+    for word, (productions, sentences) in res:
+        assert len(sentences) == len(productions) + 1
+        assert sentences[0] == (grammar.start_symbol,)
+        assert ''.join(x.value for x in sentences[-1]) == word
+
+
+def test_csg_shared_bounded():
+    """
+    Checks that the shared search and the enumeration of a non-contracting Grammar
+        do not reject a word because a longer word is derived first
+    :return: None
+    """
+
+    s, b, c = (cfg.Variable(x) for x in 'SBC')
+    a = cfg.Terminal('a')
+    grammar = ContextSensitiveGrammar()
+    grammar.terminals = {a}
+    grammar.productions = [
+        Production((s,), (a, a, a))
+        , Production((s,), (b,))
+        , Production((b,), (c,))
+        , Production((c,), (a, a))
+    ]
+    grammar.non_contracting = grammar.is_non_contracting()
+
+    assert grammar.non_contracting
+    assert grammar.run('aa').verdict == Verdict.ACCEPT
+    assert {word: res != tuple() for word, res in grammar.accepts_many(['aa', 'aaa', 'a'])} == {
+        'aa': True, 'aaa': True, 'a': False
+    }
+    assert [word for word, _ in grammar.enumerate(5)] == ['aa', 'aaa']
+    assert [word for word, _ in grammar.enumerate(2)] == ['aa']
+
+
+def test_csg_accepts_many_shared():
+    """
+    Checks that the batch check sharing one search agrees with the single word check
+    :return: None
+    """
+
+    grammar = ContextSensitiveGrammar.from_txt('resources/primality_check_csg.txt')
+    words = ['a' * p for p in range(14)] + ['b']
+
+    results = dict(grammar.accepts_many(words))
+
+    assert {word: res != tuple() for word, res in results.items()} == {word: is_prime(len(word)) for word in words}
+    assert {word: res for word, res in results.items() if res != tuple()} == {
+        word: grammar.accepts(word) for word in words if is_prime(len(word))
+    }
+
+
+def test_csg_replay(tmp_path):
+    """
+    Checks that the Context Sensitive Grammar built from the Linear Bounded Automaton keeps its provenance
+        in the txt file and replays the automaton with verified derivations
+    :param tmp_path: Directory for the txt file
+    :return: None
+    """
+
+    lba = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    ContextSensitiveGrammar.from_lba(lba).names_optimization().to_txt(tmp_path / 'csg.txt')
+    grammar = ContextSensitiveGrammar.from_txt(tmp_path / 'csg.txt')
+
+    for word in ['a' * p for p in range(30)] + ['b']:
+        outcome = grammar.replay(word)
+        assert outcome is not None
+        assert (outcome.verdict == Verdict.ACCEPT) == is_prime(len(word))
+        if outcome.verdict == Verdict.ACCEPT:
+            assert grammar.verify_derivation(word, outcome.trace)
+            assert not grammar.verify_derivation(word + 'a', outcome.trace)
+            assert grammar.accepts(word) == outcome.trace
+
+
+def test_csg_replay_turing_machine():
+    """
+    Checks that the Context Sensitive Grammar built from the Linear Bounded Automaton read as a Turing Machine
+        replays it on the words between end markers and falls back to the search on words failing their checks
+    :return: None
+    """
+
+    lba = TuringMachine.from_txt('resources/primality_check_lba.txt')
+    grammar = ContextSensitiveGrammar.from_lba(lba)
+
+    assert isinstance(grammar.provenance.machine, LinearBoundedAutomaton)
+    for p in range(14):
+        outcome = grammar.replay('a' * p)
+        assert outcome is not None
+        assert (outcome.verdict == Verdict.ACCEPT) == is_prime(p)
+        assert (grammar.run('a' * p).verdict == Verdict.ACCEPT) == is_prime(p)
+
+    assert grammar.replay('a#a') is None
+    assert grammar.run('a#a').verdict == Verdict.REJECT
+
+
+def test_csg_stale_provenance(tmp_path):
+    """
+    Checks that the Context Sensitive Grammar is not loaded with a provenance of other productions
+    :param tmp_path: Directory for the txt file
+    :return: None
+    """
+
+    lba = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    ContextSensitiveGrammar.from_lba(lba).to_txt(tmp_path / 'csg.txt')
+    lines = (tmp_path / 'csg.txt').read_text().splitlines(keepends=True)
+    (tmp_path / 'csg.txt').write_text(''.join(lines[:3] + lines[4:]))
+
+    with pytest.raises(ValueError):
+        ContextSensitiveGrammar.from_txt(tmp_path / 'csg.txt')
+
+
+def test_csg_from_lba():
+    """
+    Checks that the Context Sensitive Grammar built from the Linear Bounded Automaton
+        with the static pass generates exactly the words of prime lengths
+    :return: None
+    """
+
+    lba = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    grammar = ContextSensitiveGrammar.from_lba(lba)
+
+    assert grammar.non_contracting
+    for p in range(14):
+        assert (grammar.compile().run('a' * p).verdict == Verdict.ACCEPT) == is_prime(p)
+
+
+def test_csg_lazy():
+    """
+    Checks that the Lazy Context Sensitive Grammar generates the productions of the built Grammar
+        before the optimizations and exactly the words of prime lengths, also with a small cache
+    :return: None
+    """
+
+    lba = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    built = ContextSensitiveGrammar.from_lba(lba, optimize=False)
+    grammar = LazyContextSensitiveGrammar.from_lba(lba)
+
+    expected = dict()
+    for production in built.productions:
+        expected.setdefault(production.head[0], set()).add((production.head, production.body))
+    for symbol in built.nonterminals | built.terminals:
+        productions = [(x.head, x.body) for x in grammar.productions_for(symbol)]
+        assert len(productions) == len(set(productions))
+        assert set(productions) == expected.get(symbol, set())
+
+    for cache_size in (4, 1 << 12):
+        compiled = LazyContextSensitiveGrammar.from_lba(lba, cache_size).compile()
+        for p in range(10):
+            assert (compiled.run('a' * p).verdict == Verdict.ACCEPT) == is_prime(p)
+        assert len(compiled.cache) <= cache_size
+
+    assert grammar.accepts('a' * 5)[1][-1] == tuple(built.terminals) * 5
+    with pytest.raises(ValueError):
+        grammar.accepts('a' * 5, search='bidirectional')
+
+
+def test_csg_lazy_productions(tmp_path):
+    """
+    Checks that derivations of the Lazy Context Sensitive Grammar are verified against the generated productions
+        and the methods needing the stored productions raise ValueError
+    :param tmp_path: Directory for the txt file
+    :return: None
+    """
+
+    lba = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    grammar = LazyContextSensitiveGrammar.from_lba(lba)
+
+    trace = grammar.accepts('a' * 5)
+    assert grammar.verify_derivation('a' * 5, trace)
+    assert not grammar.verify_derivation('a' * 7, trace)
+    assert grammar.copy().verify_derivation('a' * 5, trace)
+
+    with pytest.raises(ValueError):
+        grammar.to_txt(tmp_path / 'csg.txt')
+    for optimization in (
+            grammar.nonterminals_optimization
+            , grammar.names_optimization
+            , grammar.super_names_optimization
+            , grammar.deep_optimization
+            , grammar.useful_optimization
+            , grammar.substitutions_optimization
+    ):
+        with pytest.raises(ValueError):
+            optimization()
@@ -0,0 +1,59 @@
+""" Linear Bounded Automaton Tests module """
+
+import pytest
+
+from src.budget import Verdict
+from src.linear_bounded_automaton import LinearBoundedAutomaton
+
+from src.utils import is_prime
+
+
+def test_linear_bounded_automaton(suite):
+    """
+    Checks that the given Linear Bounded Automaton accepts the given word
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the Linear Bounded Automaton
+        Dict['word'] - accepted by the Linear Bounded Automaton
+    :return: None
+    """
+
+    linear_bounded_automaton = LinearBoundedAutomaton.from_txt(suite['path'])
+    word = suite['word']
+
+    assert linear_bounded_automaton.accepts(word) == is_prime(len(word) - 2)
+
+
+def test_linear_bounded_automaton_markers():
+    """
+    Checks that words and transitions which do not respect the end markers are refused,
+        also by the bounded engine of a Linear Bounded Automaton changed after it was read
+    :return: None
+    """
+
+    linear_bounded_automaton = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+
+    with pytest.raises(ValueError):
+        linear_bounded_automaton.accepts('aaa')
+
+    linear_bounded_automaton.transitions[('q0', '$')] = {('q0', '$', '<')}
+    with pytest.raises(ValueError):
+        linear_bounded_automaton.check_markers()
+    with pytest.raises(ValueError):
+        linear_bounded_automaton.run('$aa#', engine='bounded')
+    with pytest.raises(ValueError):
+        list(linear_bounded_automaton.accepts_many(['$aa#'], workers=2))
+
+
+def test_linear_bounded_automaton_loop():
+    """
+    Checks that a looping run is rejected as diverging without any budget
+    :return: None
+    """
+
+    linear_bounded_automaton = LinearBoundedAutomaton.from_txt('resources/primality_check_lba.txt')
+    linear_bounded_automaton.transitions[('q2', '#')] = {('q2', '#', '<')}
+    linear_bounded_automaton.transitions[('q2', 'B')] = {('q2', 'B', '>')}
+
+    outcome = linear_bounded_automaton.run('$aa#')
+    assert outcome.verdict is Verdict.REJECT
+    assert outcome.diverges
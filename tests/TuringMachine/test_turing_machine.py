@@ -1,6 +1,17 @@
 """ Turing Machine Tests module """
 
+import os
+import sys
+
+import pytest
+
+import pctm
+from src.budget import Budget
+from src.budget import Verdict
+from src.checkpoint import Checkpoint
 from src.turing_machine import TuringMachine
+from src.zipper_tape import StackPool
+from src.zipper_tape import ZipperTape
 
 from src.utils import is_prime
 
@@ -18,3 +29,235 @@ def test_turing_machine(suite):
     word = suite['word']
 
     assert turing_machine.accepts(word) == is_prime(len(word) - 2)
+
+
+@pytest.mark.parametrize('n', range(20))
+def test_non_deterministic_turing_machine(n):
+    """
+    Checks that a non-deterministic Turing Machine whose branches
+    reach the same configurations by different paths accepts the given word
+    Every transition gets a twin leading to a copy of the next state,
+    so without merging of visited configurations the search is exponential
+    :param n: Length of the unary word
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_lba.txt')
+    for cur_state, cur_symbol in list(turing_machine.transitions):
+        for next_state, next_symbol, shift in list(turing_machine.transitions[(cur_state, cur_symbol)]):
+            turing_machine.transitions[(cur_state, cur_symbol)].add((f'{next_state}\'', next_symbol, shift))
+            if next_state in turing_machine.accept_states:
+                turing_machine.accept_states.add(f'{next_state}\'')
+    for cur_state, cur_symbol in list(turing_machine.transitions):
+        turing_machine.transitions[(f'{cur_state}\'', cur_symbol)] = turing_machine.transitions[(cur_state, cur_symbol)]
+
+    assert not turing_machine.is_deterministic()
+    assert turing_machine.accepts(f'${"a" * n}#') == is_prime(n)
+
+
+def test_turing_machine_budget():
+    """
+    Checks that a run which exceeds its budget is reported as unknown, not as rejected
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
+
+    outcome = turing_machine.run('a' * 97, Budget(max_steps=1000))
+    assert outcome.verdict is Verdict.UNKNOWN
+    assert outcome.steps == 1000
+
+    outcome = turing_machine.run('a' * 97, Budget(max_steps=10 ** 9))
+    assert outcome.verdict is Verdict.ACCEPT
+    assert outcome.steps < 10 ** 9
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'run_length', 'bfs'])
+def test_turing_machine_engines(suite, engine):
+    """
+    Checks that every simulation engine accepts the given word
+        iff the Turing Machine accepts it
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the Turing Machine
+        Dict['word'] - accepted by the Turing Machine
+    :param engine: Simulation engine
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt(suite['path'])
+    word = suite['word']
+
+    assert turing_machine.accepts(word, engine=engine) == is_prime(len(word) - 2)
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'run_length'])
+def test_turing_machine_loop(engine):
+    """
+    Checks that a looping run is rejected as diverging instead of running out of time
+    :param engine: Simulation engine
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_lba.txt')
+    turing_machine.transitions[('q2', 'a')] = {('q9', 'a', '>')}
+    turing_machine.transitions[('q9', 'a')] = {('q9', 'a', '>')}
+    turing_machine.transitions[('q9', '#')] = {('q10', '#', '<')}
+    turing_machine.transitions[('q10', 'a')] = {('q10', 'a', '<')}
+    turing_machine.transitions[('q10', 'B')] = {('q9', 'B', '>')}
+    turing_machine.states |= {'q9', 'q10'}
+
+    outcome = turing_machine.run('$aaaaa#', Budget(max_time=60), engine=engine, detect_loops=True)
+    assert outcome.verdict is Verdict.REJECT
+    assert outcome.diverges
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'run_length', 'bfs'])
+@pytest.mark.parametrize('word, steps', [('', 12), ('aa', 13)])
+def test_turing_machine_tape_growth(word, steps, engine, tmp_path):
+    """
+    Checks that the tape grows past both ends of the word, the empty one included,
+        the machine writes x on four cells to the left of the word,
+        walks right and writes x on three cells to the right of it,
+        the tape is checked in the checkpoint of the engines saving runs
+    :param word: Word on the tape
+    :param steps: The number of steps of the run, the empty word is a single blank cell
+    :param engine: Simulation engine
+    :param tmp_path: Temporary directory for the checkpoint file
+    :return: None
+    """
+
+    turing_machine = TuringMachine()
+    turing_machine.init_state = 'l0'
+    turing_machine.states = {'l0', 'l1', 'l2', 'l3', 'l4', 'r0', 'r1', 'r2'}
+    turing_machine.accept_states = {'accept'}
+    turing_machine.sigma = {'a'}
+    turing_machine.gamma = {'a', 'x', '_'}
+    for i in range(4):
+        for symbol in 'a_':
+            turing_machine.transitions[(f'l{i}', symbol)] = {(f'l{i + 1}', 'x', '<')}
+    turing_machine.transitions[('l4', '_')] = {('r0', 'x', '>')}
+    for symbol in 'ax':
+        turing_machine.transitions[('r0', symbol)] = {('r0', symbol, '>')}
+    turing_machine.transitions[('r0', '_')] = {('r1', 'x', '>')}
+    turing_machine.transitions[('r1', '_')] = {('r2', 'x', '>')}
+    turing_machine.transitions[('r2', '_')] = {('accept', 'x', '>')}
+
+    outcome = turing_machine.run(word, engine=engine)
+    assert outcome.verdict is Verdict.ACCEPT
+    assert outcome.steps == steps
+
+    if engine == 'run_length':
+        return
+    path = str(tmp_path / 'run.ckpt')
+    outcome = turing_machine.run(word, Budget(max_steps=11, check_every=1), engine=engine, checkpoint=path)
+    assert outcome.verdict is Verdict.UNKNOWN
+    (state, tape, pos), = Checkpoint.from_file(path).configurations
+    cells = ''.join(tape)
+    assert cells.strip('_') == ('xxxxxax' if word else 'x' * 7)
+    assert pos - (len(cells) - len(cells.lstrip('_'))) == 7
+
+
+def test_zipper_tape_key():
+    """
+    Checks that zipper tapes with equal contents and head positions have equal keys and hashes
+        whatever moves built them, and tapes with other contents or head positions have other keys
+    :return: None
+    """
+
+    pool = StackPool(0)
+    tape = ZipperTape.from_word(pool, [1, 2])
+
+    moved = tape.write_move(1, 1).write_move(2, -1)
+    extended = tape.write_move(1, -1).write_move(0, 1).write_move(1, 1).write_move(2, 1).write_move(0, -1)
+    extended = extended.write_move(2, -1)
+    for other in (moved, extended, ZipperTape.from_cells(pool, [0, 1, 2, 0], 1)):
+        assert other.key() == tape.key()
+        assert hash(other.key()) == hash(tape.key())
+        assert other.to_list() == [1, 2]
+
+    for other in (
+            ZipperTape.from_word(pool, [1, 3])
+            , ZipperTape.from_cells(pool, [1, 2], 1)
+            , tape.write_move(1, -1).write_move(1, 1)
+    ):
+        assert other.key() != tape.key()
+
+
+def test_turing_machine_accepts_many():
+    """
+    Checks that the batch check over worker processes agrees with the single word check
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_lba.txt')
+    words = [f'${"a" * n}#' for n in range(100)]
+
+    results = dict(turing_machine.accepts_many(words, workers=2))
+
+    assert results == {word: is_prime(len(word) - 2) for word in words}
+
+
+def test_turing_machine_accepts_many_lockstep():
+    """
+    Checks that the lockstep simulation agrees with the single word check
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_lba.txt')
+    words = [f'${"a" * n}#' for n in range(100)]
+
+    results = dict(turing_machine.accepts_many(words, engine='lockstep'))
+
+    assert results == {word: is_prime(len(word) - 2) for word in words}
+    with pytest.raises(ValueError):
+        dict(turing_machine.accepts_many(words, workers=2, engine='lockstep'))
+
+
+@pytest.mark.parametrize('engine', ['compiled', 'bfs'])
+def test_turing_machine_checkpoint(engine, tmp_path):
+    """
+    Checks that a run stopped by its budget is saved and continued to the same outcome
+    :param engine: Simulation engine
+    :param tmp_path: Temporary directory for the checkpoint file
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
+    word = 'a' * 23
+    path = str(tmp_path / 'run.ckpt')
+
+    expected = turing_machine.run(word, engine=engine)
+
+    outcome = turing_machine.run(word, Budget(max_steps=1000, check_every=100), engine=engine, checkpoint=path)
+    while outcome.verdict is Verdict.UNKNOWN:
+        budget = Budget(max_steps=outcome.steps + 1000, check_every=100)
+        outcome = turing_machine.run(word, budget, engine=engine, checkpoint=path, resume_from=path)
+
+    assert outcome.verdict is expected.verdict
+    assert engine == 'bfs' or outcome.steps == expected.steps
+
+    with pytest.raises(ValueError):
+        turing_machine.run('a' * 24, engine=engine, resume_from=path)
+
+
+def test_turing_machine_cli_checkpoint(tmp_path, monkeypatch, capsys):
+    """
+    Checks that the command-line tool starts afresh from a checkpoint saved on another word
+        and removes the checkpoint of a check which ended with a verdict
+    :param tmp_path: Temporary directory for the checkpoint files
+    :param monkeypatch: Fixture replacing the command-line arguments
+    :param capsys: Fixture capturing the output
+    :return: None
+    """
+
+    checkpoint = str(tmp_path / 'ck')
+
+    monkeypatch.setattr(sys, 'argv', ['pctm.py', '-tm', '-w', 'a' * 7, '--checkpoint', checkpoint, '--max_steps', '100'])
+    pctm.main()
+    assert 'Unknown' in capsys.readouterr().out
+    assert os.path.exists(f'{checkpoint}.tm')
+
+    monkeypatch.setattr(sys, 'argv', ['pctm.py', '-tm', '-w', 'aaa', '--checkpoint', checkpoint])
+    pctm.main()
+    assert 'Check by Turing Machine: True' in capsys.readouterr().out
+    assert not os.path.exists(f'{checkpoint}.tm')
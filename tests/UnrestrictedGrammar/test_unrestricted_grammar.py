@@ -1,5 +1,17 @@
 """ Unrestricted Grammar Tests module """
 
+import functools
+
+import pytest
+from pyformlang import cfg
+
+from src.budget import Budget
+from src.budget import Verdict
+from src.disk_hash_table import DiskHashTable
+from src.lazy_unrestricted_grammar import LazyUnrestrictedGrammar
+from src.my_production import Production
+from src.spilling_frontier import SpillingFrontier
+from src.turing_machine import TuringMachine
 from src.unrestricted_grammar import UnrestrictedGrammar
 
 from src.utils import is_prime
@@ -18,3 +30,250 @@ def test_csg_manual(suite):
     word = suite['word']
 
     assert (grammar.accepts(word) != tuple()) == is_prime(len(word))
+
+
+def test_ug_bidirectional(suite):
+    """
+    Checks that the bidirectional search agrees with the forward one
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the grammar
+        Dict['word'] - word generated by the grammar
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt(suite['path'])
+    word = suite['word']
+
+    assert (grammar.accepts(word, search='bidirectional') != tuple()) == is_prime(len(word))
+
+
+@pytest.mark.parametrize('search, p', [
+    ('best_first', 7)
+    , ('best_first', 11)
+    , ('best_first', 13)
+    , ('astar', 11)
+    , ('astar', 13)
+])
+def test_ug_best_first(search, p):
+    """
+    Checks that the informed searches find derivations of primes in fewer steps than the forward one,
+        the astar search with the default weight
+    :param search: Search strategy
+    :param p: A prime length of the word
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt('resources/primality_check_ug.txt')
+
+    outcome = grammar.run('a' * p, Budget(max_steps=10 ** 5), search=search, heuristic='length')
+
+    assert outcome.verdict is Verdict.ACCEPT
+    assert outcome.steps <= grammar.run('a' * p).steps
+
+
+@pytest.mark.parametrize('search', ['best_first', 'astar'])
+@pytest.mark.parametrize('n', [0, 1, 4, 6, 8, 9, 10, 12])
+def test_ug_informed_composite(search, n):
+    """
+    Checks that the informed searches reject composite words as the forward search does
+    :param search: Search strategy
+    :param n: A non-prime length of the word
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt('resources/primality_check_ug.txt')
+
+    assert grammar.run('a' * n, Budget(max_steps=10 ** 5), search=search).verdict is Verdict.REJECT
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.parametrize('n', [0, 1, 4, 6, 8, 9, 10])
+def test_ug_sharded_composite(workers, n):
+    """
+    Checks that the sharded search rejects composite words as the forward search does
+    :param workers: The number of worker processes
+    :param n: A non-prime length of the word
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt('resources/primality_check_ug.txt')
+
+    assert grammar.run('a' * n, Budget(max_steps=10 ** 5), search='sharded', workers=workers).verdict \
+        is Verdict.REJECT
+
+
+@pytest.mark.parametrize('canonical', [False, True])
+@pytest.mark.parametrize('p', range(2, 12))
+def test_ug_out_of_core(p, canonical, tmp_path, monkeypatch):
+    """
+    Checks that the out-of-core search with tiny memory limits visits sentences in the order
+        of the in-memory one and removes its files
+    :param p: The length of the word
+    :param canonical: Whether only canonical derivations are followed
+    :param tmp_path: Temporary directory for the files of the search
+    :param monkeypatch: Fixture shrinking the memory limits
+    :return: None
+    """
+
+    monkeypatch.setattr('src.compiled_grammar.SpillingFrontier', functools.partial(SpillingFrontier, capacity=16))
+    monkeypatch.setattr('src.compiled_grammar.DiskHashTable', functools.partial(DiskHashTable, capacity=8))
+    monkeypatch.setattr('src.spilling_frontier.MAX_RUNS', 4)
+    monkeypatch.setattr('src.disk_hash_table.BUFFER', 256)
+
+    grammar = UnrestrictedGrammar.from_txt('resources/primality_check_ug.txt')
+
+    outcome = grammar.run('a' * p, spill_dir=tmp_path, canonical=canonical)
+    expected = grammar.run('a' * p, canonical=canonical)
+
+    assert (outcome.verdict, outcome.steps, outcome.trace) == (expected.verdict, expected.steps, expected.trace)
+    assert list(tmp_path.iterdir()) == list()
+
+
+def test_ug_canonical(suite):
+    """
+    Checks that the search following only canonical derivations agrees with the forward one
+        and every step of its derivation rewrites an occurrence of the production head
+    :param suite: Dictionary with test suite
+        Dict['path'] - path to the file with the grammar
+        Dict['word'] - word generated by the grammar
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt(suite['path'])
+    word = suite['word']
+
+    res = grammar.accepts(word, canonical=True)
+
+    assert (res != tuple()) == is_prime(len(word))
+    if res != tuple():
+        productions, sentences = res
+        assert sentences[0] == (grammar.start_symbol,)
+        assert ''.join(x.value for x in sentences[-1]) == word
+        for production, sentence, new_sentence in zip(productions, sentences, sentences[1:]):
+            size = len(production.head)
+            assert any(
+                sentence[i:i + size] == production.head
+                and sentence[:i] + production.body + sentence[i + size:] == new_sentence
+                for i in range(len(sentence) - size + 1)
+            )
+
+
+def test_ug_replay(tmp_path):
+    """
+    Checks that the Unrestricted Grammar built from the Turing Machine keeps its provenance
+        in the txt file and replays the machine with verified derivations
+    :param tmp_path: Directory for the txt file
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
+    UnrestrictedGrammar.from_turing_machine(turing_machine).super_names_optimization().to_txt(tmp_path / 'ug.txt')
+    grammar = UnrestrictedGrammar.from_txt(tmp_path / 'ug.txt')
+
+    for word in ['a' * p for p in range(30)] + ['b']:
+        outcome = grammar.replay(word)
+        assert outcome is not None
+        assert (outcome.verdict == Verdict.ACCEPT) == is_prime(len(word))
+        if outcome.verdict == Verdict.ACCEPT:
+            productions, sentences = outcome.trace
+            assert grammar.verify_derivation(word, outcome.trace)
+            assert not grammar.verify_derivation(word, (productions[1:], sentences[1:]))
+            assert grammar.accepts(word) == outcome.trace
+
+
+def test_ug_replay_many():
+    """
+    Checks that the workers of a pool replay the Turing Machine of the Unrestricted Grammar
+        as the derivation of a single word does
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
+    grammar = UnrestrictedGrammar.from_turing_machine(turing_machine).super_names_optimization()
+    words = ['a' * p for p in range(12)]
+
+    res = dict(grammar.accepts_many(words, workers=2))
+
+    assert res == {word: grammar.accepts(word) for word in words}
+    assert all((res[word] != tuple()) == is_prime(len(word)) for word in words)
+
+
+def test_ug_useful_optimization():
+    """
+    Checks that the static pass keeps the productions of the given Unrestricted Grammar
+        and removes unproductive, unreachable and never adjacent ones
+    :return: None
+    """
+
+    grammar = UnrestrictedGrammar.from_txt('resources/primality_check_ug.txt')
+    assert grammar.useful_optimization().productions == grammar.productions
+
+    s, a, b, c, d = (cfg.Variable(x) for x in 'SABCD')
+    x, y = cfg.Terminal('x'), cfg.Terminal('y')
+    grammar = UnrestrictedGrammar()
+    grammar.terminals = {x, y}
+    grammar.productions = [
+        Production((s,), (a, b))
+        , Production((a, b), (x,))
+        , Production((a,), (c,))
+        , Production((b, a), (y,))
+        , Production((d,), (x,))
+    ]
+
+    assert grammar.useful_optimization().productions == grammar.productions[:2]
+    assert grammar.useful_optimization(adjacency=False).productions == [
+        grammar.productions[0], grammar.productions[1], grammar.productions[3]
+    ]
+
+
+def test_ug_substitutions_optimization():
+    """
+    Checks that chains of simple substitutions are removed in one pass
+        and symbols with several productions are kept
+    :return: None
+    """
+
+    s, a, b, c, d, e = (cfg.Variable(x) for x in 'SABCDE')
+    x, y, z = cfg.Terminal('x'), cfg.Terminal('y'), cfg.Terminal('z')
+    grammar = UnrestrictedGrammar()
+    grammar.terminals = {x, y, z}
+    grammar.productions = [
+        Production((s,), (a, b))
+        , Production((a,), (c,))
+        , Production((c,), (x,))
+        , Production((b,), (y,))
+        , Production((b,), (z,))
+        , Production((d, e), (a,))
+    ]
+
+    assert grammar.substitutions_optimization().productions == [
+        Production((s,), (x, b))
+        , Production((b,), (y,))
+        , Production((b,), (z,))
+        , Production((d, e), (x,))
+    ]
+
+
+def test_ug_lazy():
+    """
+    Checks that the Lazy Unrestricted Grammar generates the productions of the built Grammar
+        before the optimizations and the words of prime lengths generating few of them
+    :return: None
+    """
+
+    turing_machine = TuringMachine.from_txt('resources/primality_check_tm.txt')
+    built = UnrestrictedGrammar.from_turing_machine(turing_machine, optimize=False)
+    grammar = LazyUnrestrictedGrammar.from_turing_machine(turing_machine)
+
+    expected = dict()
+    for production in built.productions:
+        expected.setdefault(production.head[0], set()).add((production.head, production.body))
+    for symbol in built.nonterminals | built.terminals:
+        productions = [(x.head, x.body) for x in grammar.productions_for(symbol)]
+        assert len(productions) == len(set(productions))
+        assert set(productions) == expected.get(symbol, set())
+
+    compiled = grammar.compile()
+    for p in range(4):
+        assert (compiled.run('a' * p).verdict == Verdict.ACCEPT) == is_prime(p)
+    assert compiled.generated < len(expected)